@@ -0,0 +1,67 @@
+# accounts.py
+"""User provisioning for self-registration and admin-created staff accounts.
+
+Before hashing the password, one query checks whether the username or the
+email is taken. That query is only for a friendly early error. The unique
+constraints on user.username and user.email are what make duplicates
+impossible: if a concurrent request wins the race, the INSERT fails with
+IntegrityError, which is mapped back to the conflicting field(s). Both cases
+raise DuplicateUserError, and the caller shows it on the form.
+"""
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import User
+
+UNIQUE_FIELDS = ('username', 'email')
+
+
+class DuplicateUserError(ValueError):
+    def __init__(self, fields):
+        super().__init__(f"Already taken: {', '.join(sorted(fields))}")
+        self.fields = fields
+
+
+def taken_fields(username, email):
+    """Returns which of `username` and `email` already belong to an account, in one query."""
+    rows = db.session.execute(db.select(User.username, User.email)
+                              .where(or_(User.username == username, User.email == email))
+                              .limit(2)).all()
+    taken = set()
+    for row in rows:
+        if row.username == username:
+            taken.add('username')
+        if row.email == email:
+            taken.add('email')
+    return taken
+
+
+def _conflicting_fields(error, username, email):
+    # SQLite: "UNIQUE constraint failed: user.email"; PostgreSQL: "Key (email)=(...) already exists"
+    message = str(error.orig)
+    fields = {field for field in UNIQUE_FIELDS if f'user.{field}' in message or f'({field})' in message}
+    return fields or taken_fields(username, email)
+
+
+def create_user(username, email, password, role):
+    """Creates and commits a user; raises DuplicateUserError if the username or email is taken."""
+    taken = taken_fields(username, email)
+    if taken:
+        raise DuplicateUserError(taken)
+    user = User(username=username, email=email, role=role, image_file='default.jpg')
+    user.set_password(password)
+    db.session.add(user)
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise DuplicateUserError(_conflicting_fields(e, username, email)) from e
+    return user
+
+
+def show_duplicate_errors(form, error):
+    """Adds the form's message for each taken field to that field's errors."""
+    for field in UNIQUE_FIELDS:
+        if field in error.fields:
+            form[field].errors.append(form.duplicate_messages[field])
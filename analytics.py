@@ -0,0 +1,302 @@
+# analytics.py
+"""Incrementally maintained rollup tables for the admin dashboard.
+
+Registrations, events and hall/bus bookings feed four rollup tables
+(AnalyticsCounter, EventStats, HallUsageWeek, BusUsageDay). An after_flush
+hook turns every ORM insert, delete or relevant update of those models into
++/- deltas and applies them with one upsert per affected rollup row, inside
+the same transaction as the write. The dashboard then reads a handful of
+precomputed rows instead of aggregating the base tables.
+
+Registrations only touch their event's EventStats row: campus-wide
+registration totals are summed from event_stats when read, since a single
+counter row would serialize every concurrent registration on PostgreSQL.
+
+Bulk Core statements (query.update(), insert() executemany) bypass the hook,
+so rebuild_rollups() recomputes everything from scratch; it runs on a schedule
+(ANALYTICS_REBUILD_SECONDS) and via `flask rebuild-analytics`.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, literal, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm.base import NO_VALUE
+
+from exports import stream_csv
+from extensions import db, scheduler
+from models import (Event, Registration, Hall, HallBooking, Bus, BusBooking,
+                    AnalyticsCounter, EventStats, HallUsageWeek, BusUsageDay)
+from replica import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _minutes(start_time, end_time):
+    return max(0, (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute))
+
+
+# --- Contributions: the rollup rows one base row counts towards ---
+# Each function takes an attribute getter and returns (model, key, deltas) tuples
+# for a single row in that state; inserts add them, deletes subtract them and
+# updates subtract the old state's and add the new state's.
+
+def _registration_rollups(get):
+    paid = int(get('payment_status') == 'paid')
+    # No campus-wide counter: dashboard_summary() sums EventStats
+    return [(EventStats, {'event_id': get('event_id')}, {'registrations': 1, 'paid_registrations': paid})]
+
+
+def _event_rollups(get):
+    return [(AnalyticsCounter, {'name': f"events:{get('status')}"}, {'value': 1})]
+
+
+def _hall_booking_rollups(get):
+    rollups = [(AnalyticsCounter, {'name': f"hall_bookings:{get('status')}"}, {'value': 1})]
+    if get('status') == 'Approved':
+        rollups.append((HallUsageWeek, {'hall_id': get('hall_id'), 'week_start': week_start(get('requested_date'))},
+                        {'approved_bookings': 1, 'booked_minutes': _minutes(get('start_time'), get('end_time'))}))
+    return rollups
+
+
+def _bus_booking_rollups(get):
+    rollups = [(AnalyticsCounter, {'name': f"bus_bookings:{get('status')}"}, {'value': 1})]
+    if get('status') == 'Approved':
+        rollups.append((BusUsageDay, {'bus_id': get('bus_id'), 'day': get('requested_date')},
+                        {'approved_bookings': 1, 'passengers': get('number_of_passengers') or 1}))
+    return rollups
+
+
+TRACKED = {
+    Registration: (('event_id', 'payment_status'), _registration_rollups),
+    Event: (('status',), _event_rollups),
+    HallBooking: (('hall_id', 'status', 'requested_date', 'start_time', 'end_time'), _hall_booking_rollups),
+    BusBooking: (('bus_id', 'status', 'requested_date', 'number_of_passengers'), _bus_booking_rollups),
+}
+
+
+def _current(obj):
+    return lambda attr: getattr(obj, attr)
+
+
+def _committed(obj):
+    # Values as of the last load/commit: changed attributes keep their old value in committed_state
+    state = inspect(obj)
+    return lambda attr: state.committed_state.get(attr, state.dict.get(attr))
+
+
+def _add(deltas, rollups, sign):
+    for model, key, values in rollups:
+        bucket = deltas[(model, tuple(sorted(key.items())))]
+        for column, value in values.items():
+            bucket[column] += sign * value
+
+
+def collect_deltas(db_session):
+    """Returns {(model, key items): Counter(column -> delta)} for the session's pending changes."""
+    deltas = defaultdict(Counter)
+    for obj in db_session.new:
+        if type(obj) in TRACKED:
+            _add(deltas, TRACKED[type(obj)][1](_current(obj)), +1)
+    for obj in db_session.deleted:
+        if type(obj) in TRACKED:
+            _add(deltas, TRACKED[type(obj)][1](_committed(obj)), -1)
+    for obj in db_session.dirty:
+        if type(obj) not in TRACKED:
+            continue
+        fields, rollups = TRACKED[type(obj)]
+        committed_state = inspect(obj).committed_state
+        changed = [field for field in fields if field in committed_state]
+        if not changed:
+            continue
+        if any(committed_state[field] is NO_VALUE for field in changed):
+            # Overwritten without being loaded first: the old value is unknown
+            logger.warning("Skipping rollup update for %r; the next rebuild will correct it", obj)
+            continue
+        _add(deltas, rollups(_committed(obj)), -1)
+        _add(deltas, rollups(_current(obj)), +1)
+    return deltas
+
+
+def _upsert(connection, model, key, values):
+    table = model.__table__
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        stmt = dialect_insert(table).values(**key, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=list(key),
+                                          set_={column: table.c[column] + stmt.excluded[column] for column in values})
+        connection.execute(stmt)
+        return
+    result = connection.execute(
+        update(table).where(and_(*(table.c[column] == value for column, value in key.items())))
+        .values({column: table.c[column] + delta for column, delta in values.items()}))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**key, **values))
+
+
+def apply_deltas(connection, deltas):
+    for (model, key), values in deltas.items():
+        values = {column: delta for column, delta in values.items() if delta}
+        if values:
+            _upsert(connection, model, dict(key), values)
+
+
+def record_bulk_insert(connection, model, rows):
+    """Applies the rollup deltas for rows inserted with Core insert(), which the hook below never sees."""
+    if model not in TRACKED:
+        return
+    deltas = defaultdict(Counter)
+    for row in rows:
+        _add(deltas, TRACKED[model][1](row.get), +1)
+    apply_deltas(connection, deltas)
+
+
+def record_bulk_update(connection, model, changes):
+    """Applies the rollup deltas for rows changed with a Core UPDATE; `changes` holds (old, new) value dicts."""
+    if model not in TRACKED:
+        return
+    deltas = defaultdict(Counter)
+    for old, new in changes:
+        _add(deltas, TRACKED[model][1](old.get), -1)
+        _add(deltas, TRACKED[model][1](new.get), +1)
+    apply_deltas(connection, deltas)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _update_rollups(db_session, flush_context):
+    deltas = collect_deltas(db_session)
+    if deltas:
+        # Same connection and transaction as the flush (always the primary)
+        apply_deltas(db_session.connection(), deltas)
+
+
+# --- Full recomputation ---
+
+def rebuild_rollups():
+    """Recomputes every rollup table from the base tables and commits."""
+    session = db.session
+    for model in (AnalyticsCounter, EventStats, HallUsageWeek, BusUsageDay):
+        session.execute(delete(model))
+
+    paid = func.sum(case((Registration.payment_status == 'paid', 1), else_=0))
+    session.execute(insert(EventStats).from_select(
+        ['event_id', 'registrations', 'paid_registrations'],
+        db.select(Registration.event_id, func.count(), paid).group_by(Registration.event_id)))
+
+    counters = Counter()
+    for model, prefix in ((Event, 'events'), (HallBooking, 'hall_bookings'), (BusBooking, 'bus_bookings')):
+        for status, count in session.execute(db.select(model.status, func.count()).group_by(model.status)):
+            counters[f'{prefix}:{status}'] = count
+
+    # Time arithmetic is dialect-specific in SQL, so minutes are summed here over
+    # distinct (hall, day, slot) groups rather than individual bookings
+    hall_weeks = defaultdict(Counter)
+    for hall_id, day, start_time, end_time, count in session.execute(
+            db.select(HallBooking.hall_id, HallBooking.requested_date, HallBooking.start_time, HallBooking.end_time, func.count())
+            .filter_by(status='Approved')
+            .group_by(HallBooking.hall_id, HallBooking.requested_date, HallBooking.start_time, HallBooking.end_time)):
+        bucket = hall_weeks[(hall_id, week_start(day))]
+        bucket['approved_bookings'] += count
+        bucket['booked_minutes'] += count * _minutes(start_time, end_time)
+
+    if counters:
+        session.execute(insert(AnalyticsCounter), [dict(name=name, value=value) for name, value in counters.items()])
+    if hall_weeks:
+        session.execute(insert(HallUsageWeek), [dict(hall_id=hall_id, week_start=week, **values)
+                                                for (hall_id, week), values in hall_weeks.items()])
+    session.execute(insert(BusUsageDay).from_select(
+        ['bus_id', 'day', 'approved_bookings', 'passengers'],
+        db.select(BusBooking.bus_id, BusBooking.requested_date, func.count(),
+                  func.sum(func.coalesce(BusBooking.number_of_passengers, 1)))
+        .filter_by(status='Approved').group_by(BusBooking.bus_id, BusBooking.requested_date)))
+    session.commit()
+
+
+def scheduled_rebuild():
+    with scheduler.app.app_context():
+        started = datetime.now()
+        rebuild_rollups()
+        logger.info("Rebuilt analytics rollups in %.2fs", (datetime.now() - started).total_seconds())
+
+
+# --- Reads ---
+
+def dashboard_summary(hall_hours_per_week, today=None):
+    """Everything the admin dashboard shows, from the rollup tables only (4 queries)."""
+    today = today or date.today()
+    # Plus the campus-wide registration totals, summed from EventStats
+    counters = dict(db.session.execute(db.select(AnalyticsCounter.name, AnalyticsCounter.value).union_all(
+        db.select(literal('registrations'), func.coalesce(func.sum(EventStats.registrations), 0)),
+        db.select(literal('registrations:paid'), func.coalesce(func.sum(EventStats.paid_registrations), 0)))).all())
+
+    top_events = db.session.execute(
+        db.select(Event.id, Event.name, Event.capacity, EventStats.registrations, EventStats.paid_registrations)
+        .join(EventStats, EventStats.event_id == Event.id)
+        .where(EventStats.registrations > 0)
+        .order_by(EventStats.registrations.desc()).limit(10)).all()
+
+    this_week = week_start(today)
+    halls = db.session.execute(
+        db.select(Hall.name, HallUsageWeek.approved_bookings, HallUsageWeek.booked_minutes)
+        .join(HallUsageWeek, and_(HallUsageWeek.hall_id == Hall.id, HallUsageWeek.week_start == this_week), isouter=True)
+        .order_by(HallUsageWeek.booked_minutes.desc(), Hall.name)).all()
+
+    bus_days = dict((row.day, row) for row in db.session.execute(
+        db.select(BusUsageDay.day, func.sum(BusUsageDay.approved_bookings).label('bookings'),
+                  func.sum(BusUsageDay.passengers).label('passengers'))
+        .where(BusUsageDay.day >= today, BusUsageDay.day < today + timedelta(days=7))
+        .group_by(BusUsageDay.day)))
+
+    return {
+        'counters': counters,
+        'top_events': [dict(row._mapping, fill_rate=(row.registrations / row.capacity * 100) if row.capacity else None)
+                       for row in top_events],
+        'week_start': this_week,
+        'halls': [dict(name=name, bookings=bookings or 0, hours=(minutes or 0) / 60,
+                       utilization=(minutes or 0) / 60 / hall_hours_per_week * 100)
+                  for name, bookings, minutes in halls],
+        'bus_days': [dict(day=day, bookings=bus_days[day].bookings if day in bus_days else 0,
+                          passengers=bus_days[day].passengers if day in bus_days else 0)
+                     for day in (today + timedelta(days=offset) for offset in range(7))],
+    }
+
+
+# --- CSV export ---
+
+EXPORTS = {
+    'counters': (('name', 'value'),
+                 lambda: db.select(AnalyticsCounter.name, AnalyticsCounter.value).order_by(AnalyticsCounter.name)),
+    'events': (('event_id', 'event_name', 'event_date', 'capacity', 'registrations', 'paid_registrations'),
+               lambda: db.select(Event.id, Event.name, Event.date, Event.capacity,
+                                 EventStats.registrations, EventStats.paid_registrations)
+               .join(EventStats, EventStats.event_id == Event.id).order_by(Event.id)),
+    'halls': (('hall_id', 'hall_name', 'week_start', 'approved_bookings', 'booked_minutes'),
+              lambda: db.select(Hall.id, Hall.name, HallUsageWeek.week_start,
+                                HallUsageWeek.approved_bookings, HallUsageWeek.booked_minutes)
+              .join(HallUsageWeek, HallUsageWeek.hall_id == Hall.id).order_by(HallUsageWeek.week_start, Hall.id)),
+    'buses': (('bus_id', 'bus_identifier', 'day', 'approved_bookings', 'passengers'),
+              lambda: db.select(Bus.id, Bus.identifier, BusUsageDay.day,
+                                BusUsageDay.approved_bookings, BusUsageDay.passengers)
+              .join(BusUsageDay, BusUsageDay.bus_id == Bus.id).order_by(BusUsageDay.day, Bus.id)),
+}
+
+
+def export_csv(name):
+    """Yields the rollup `name` as CSV text, a batch of rows at a time."""
+    header, statement = EXPORTS[name]
+    return stream_csv(header, db.session.execute(statement().execution_options(yield_per=1000)))
+
+
+def init_app(app):
+    @app.cli.command('rebuild-analytics')
+    def rebuild_analytics_command():
+        """Recompute the analytics rollup tables from scratch."""
+        rebuild_rollups()
+        print("Analytics rollups rebuilt.")
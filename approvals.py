@@ -0,0 +1,118 @@
+# approvals.py
+"""The event approval workflow as a state machine.
+
+States are Event.status values. TRANSITIONS lists every allowed move: its
+source and target state, the role allowed to make it, the approver column
+it stamps and what the event's creator is told. Nothing else in the app
+changes an event's status once it has been submitted.
+
+apply() moves a batch of events with one conditional UPDATE
+(... WHERE id IN (...) AND status = :source RETURNING id, ...), so the
+guard and the write are a single statement: when two approvers act on the
+same event at once, exactly one of them moves it and the other sees it
+skipped. In the same transaction it appends one event_audit row per moved
+event (one executemany INSERT), adds the creators' notifications, and
+applies what the ORM hooks would have done for a Core UPDATE: the analytics
+rollups, and reminders for newly approved events. RETURNING needs SQLite
+3.35+ or PostgreSQL.
+
+event_audit is append-only: flushing a change to, or a delete of, an
+EventAudit row raises.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import event as sa_event, insert, update
+
+import analytics
+import reminders
+from extensions import db
+from models import Event, EventAudit, Notification
+from replica import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+PENDING_DSA = 'Pending DSA Approval'
+PENDING_VC = 'Pending VC Office Approval'
+APPROVED = 'Approved'
+
+
+@dataclass(frozen=True)
+class Transition:
+    name: str
+    source: str
+    target: str
+    role: str
+    approver_column: str
+    flash: str          # for one event; formatted with name=
+    notification: str   # to the creator; formatted with name=
+
+
+TRANSITIONS = {t.name: t for t in (
+    Transition('dsa_approve', PENDING_DSA, PENDING_VC, 'dsa', 'dsa_approver_id',
+               "Event '{name}' approved and sent for VC Office approval.",
+               "Your event '{name}' has been approved by DSA and sent to VC Office."),
+    Transition('dsa_reject', PENDING_DSA, 'DSA Rejected', 'dsa', 'dsa_approver_id',
+               "Event '{name}' has been rejected.",
+               "Your event '{name}' has been rejected by DSA."),
+    Transition('vc_approve', PENDING_VC, APPROVED, 'vc_office', 'vc_approver_id',
+               "Event '{name}' has been fully approved and is now live.",
+               "Your event '{name}' has been fully APPROVED and is now live!"),
+    Transition('vc_reject', PENDING_VC, 'VC Rejected', 'vc_office', 'vc_approver_id',
+               "Event '{name}' has been rejected by the VC Office.",
+               "Your event '{name}' has been rejected by the VC Office."),
+)}
+
+
+@dataclass
+class Result:
+    transition: Transition
+    moved: list = field(default_factory=list)    # (id, name, created_by) rows
+    skipped: list = field(default_factory=list)  # ids no longer in the source state (or missing)
+
+
+def apply(name, event_ids, actor, now=None):
+    """Moves every listed event that is still in the transition's source state, and commits."""
+    transition = TRANSITIONS[name]
+    if actor.role != transition.role:
+        raise PermissionError(f"{actor.role} may not {name} events")
+    ids = sorted(set(event_ids))
+    result = Result(transition)
+    if not ids:
+        return result
+
+    result.moved = db.session.execute(
+        update(Event)
+        .where(Event.id.in_(ids), Event.status == transition.source)
+        .values({'status': transition.target, transition.approver_column: actor.id})
+        .returning(Event.id, Event.name, Event.created_by)
+        .execution_options(synchronize_session=False)).all()
+    moved_ids = {row.id for row in result.moved}
+    result.skipped = [event_id for event_id in ids if event_id not in moved_ids]
+    if not result.moved:
+        db.session.rollback()
+        return result
+
+    now = now or datetime.utcnow()
+    db.session.execute(insert(EventAudit), [
+        dict(event_id=row.id, transition=name, from_status=transition.source, to_status=transition.target,
+             actor_id=actor.id, timestamp=now) for row in result.moved])
+    # ORM objects, so push.py publishes them on commit
+    db.session.add_all(Notification(user_id=row.created_by, message=transition.notification.format(name=row.name),
+                                    notification_type='event_status_update', related_id=row.id, timestamp=now)
+                       for row in result.moved)
+    analytics.record_bulk_update(db.session.connection(), Event,
+                                 [({'status': transition.source}, {'status': transition.target})] * len(moved_ids))
+    if APPROVED in (transition.source, transition.target):
+        reminders.sync_events(moved_ids)
+    db.session.commit()
+    logger.info("%s: %d events moved by user %s, %d skipped", name, len(result.moved), actor.id, len(result.skipped))
+    return result
+
+
+@sa_event.listens_for(RoutingSession, 'before_flush')
+def _append_only(db_session, flush_context, instances):
+    for obj in list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, EventAudit) and (obj in db_session.deleted or db_session.is_modified(obj)):
+            raise ValueError("event_audit rows are append-only")
@@ -0,0 +1,176 @@
+# benchmarks/analytics_rollups.py
+"""Analytics rollup check: incremental updates match a full rebuild.
+
+Drives a random mix of writes through the real routes (registrations,
+cancellations, hall/bus booking requests and admin decisions, DSA/VC event
+decisions), then checks that the incrementally maintained rollup tables equal
+what rebuild_rollups() computes from the base tables. It also times the admin
+dashboard, which reads the rollups, against the same stats aggregated live
+from the base tables.
+
+Usage: python -m benchmarks.analytics_rollups [--operations 400] [--students 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+from analytics import rebuild_rollups
+from extensions import db
+from models import (Event, Registration, HallBooking, BusBooking,
+                    AnalyticsCounter, EventStats, HallUsageWeek, BusUsageDay)
+from query_budget import count_queries
+
+ROLLUPS = (AnalyticsCounter, EventStats, HallUsageWeek, BusUsageDay)
+
+
+def snapshot():
+    """Rollup contents as {model name: {primary key: values}}, ignoring all-zero rows."""
+    tables = {}
+    for model in ROLLUPS:
+        columns = model.__table__.columns
+        keys = [column.name for column in columns if column.primary_key]
+        values = [column.name for column in columns if not column.primary_key]
+        rows = {}
+        for row in db.session.execute(db.select(*columns)).mappings():
+            counts = tuple(row[name] for name in values)
+            if any(counts):
+                rows[tuple(row[name] for name in keys)] = counts
+        tables[model.__name__] = rows
+    return tables
+
+
+def live_summary():
+    # What the dashboard would cost without rollups: aggregations over the base tables
+    db.session.execute(db.select(Registration.event_id, func.count()).group_by(Registration.event_id)
+                       .order_by(func.count().desc()).limit(10)).all()
+    for model in (Event, HallBooking, BusBooking):
+        db.session.execute(db.select(model.status, func.count()).group_by(model.status)).all()
+    week = date.today() - timedelta(days=date.today().weekday())
+    db.session.execute(db.select(HallBooking.hall_id, func.count()).filter_by(status='Approved')
+                       .where(HallBooking.requested_date >= week, HallBooking.requested_date < week + timedelta(days=7))
+                       .group_by(HallBooking.hall_id)).all()
+    db.session.execute(db.select(BusBooking.requested_date, func.sum(BusBooking.number_of_passengers))
+                       .filter_by(status='Approved').group_by(BusBooking.requested_date)).all()
+
+
+def run_workload(app, seeded, operations, rng):
+    student_ids, event_ids = seeded['student_ids'], seeded['event_ids']
+    user_ids = seeded['user_ids']
+    admin = login_as(app.test_client(), user_ids['admin'])
+    dsa = login_as(app.test_client(), user_ids['dsa'])
+    vc = login_as(app.test_client(), user_ids['vc'])
+    students = {}
+
+    def student(user_id):
+        if user_id not in students:
+            students[user_id] = login_as(app.test_client(), user_id)
+        return students[user_id]
+
+    def pending(model):
+        with app.app_context():
+            return db.session.execute(db.select(model.id).filter_by(status='Pending')).scalars().all()
+
+    def event_with(status):
+        with app.app_context():
+            return db.session.execute(db.select(Event.id).filter_by(status=status)).scalars().all()
+
+    day = lambda: (date.today() + timedelta(days=rng.randint(0, 6))).isoformat()
+    actions = {
+        'register': lambda: student(rng.choice(student_ids)).post(f'/event/{rng.choice(event_ids)}/register'),
+        'cancel': lambda: student(rng.choice(student_ids[:50])).post(f'/cancel_rsvp/{rng.choice(event_ids)}'),
+        'book hall': lambda: student(rng.choice(student_ids)).post(f"/hall/book/{rng.choice(seeded['hall_ids'])}", data={
+            'requested_date': day(), 'start_time': '09:00', 'end_time': f'{rng.randint(10, 16)}:30', 'purpose': 'Meeting'}),
+        'book bus': lambda: student(rng.choice(student_ids)).post(f"/bus/book/{rng.choice(seeded['bus_ids'])}", data={
+            'requested_date': day(), 'pickup_time': '07:30', 'pickup_location': 'Gate', 'destination': 'Town',
+            'number_of_passengers': rng.randint(1, 20), 'purpose': 'Trip'}),
+        'decide hall': lambda: (ids := pending(HallBooking)) and admin.post(
+            f"/admin/hall_booking/{rng.choice(('approve', 'reject'))}/{rng.choice(ids)}"),
+        'reject bus': lambda: (ids := pending(BusBooking)) and admin.post(f'/admin/bus_booking/reject/{rng.choice(ids)}'),
+        'dsa decision': lambda: (ids := event_with('Pending DSA Approval')) and dsa.post(
+            f"/dsa/{rng.choice(('approve', 'reject'))}_event/{rng.choice(ids)}"),
+        'vc decision': lambda: (ids := event_with('Pending VC Office Approval')) and vc.post(
+            f"/vc/{rng.choice(('approve', 'reject'))}_event/{rng.choice(ids)}"),
+    }
+    names = list(actions)
+    for _ in range(operations):
+        actions[rng.choice(names)]()
+    # Bus approvals render a PDF ticket each, so only a few
+    for _ in range(5):
+        actions['decide hall']()
+        ids = pending(BusBooking)
+        if ids:
+            admin.post(f'/admin/bus_booking/approve/{rng.choice(ids)}')
+    return admin
+
+
+def time_it(fn, repeat):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operations', type=int, default=400)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-analytics-'), 'analytics.db')
+    app = make_app('sqlite:///' + path, TESTING=False)
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        # Paid events keep registrations free of PDF/email work
+        seeded = seed_campus(students=args.students, events=200, halls=20, buses=10, hall_bookings=args.students * 5,
+                             bus_bookings=args.students * 5, registrations_per_event=min(args.students, 200),
+                             notifications_per_user=0)
+        db.session.execute(db.update(Event).values(price=10.0))
+        db.session.commit()
+        rebuild_rollups()
+
+    admin = run_workload(app, seeded, args.operations, rng)
+    failures = []
+    with app.app_context():
+        incremental = snapshot()
+        rebuild_rollups()
+        rebuilt = snapshot()
+        for table in incremental:
+            wrong = {key for key in incremental[table].keys() | rebuilt[table].keys()
+                     if incremental[table].get(key) != rebuilt[table].get(key)}
+            print(f"{'ok  ' if not wrong else 'FAIL'} {table}: {len(rebuilt[table])} rows, {len(wrong)} differ from a rebuild")
+            if wrong:
+                failures.append(table)
+                for key in sorted(wrong, key=str)[:5]:
+                    print(f'     {key}: incremental {incremental[table].get(key)} rebuilt {rebuilt[table].get(key)}')
+        live_ms = time_it(live_summary, args.repeat)
+
+    with count_queries() as counter:
+        response = admin.get('/admin/dashboard')
+    if response.status_code != 200:
+        failures.append(f'dashboard HTTP {response.status_code}')
+    dashboard_ms = time_it(lambda: admin.get('/admin/dashboard'), args.repeat)
+    export = admin.get('/admin/analytics/events.csv')
+    export_rows = export.data.count(b'\n') - 1
+    print(f'admin dashboard: {counter.count} queries, {dashboard_ms:.1f} ms per page (incl. rendering)')
+    print(f'same stats aggregated live from the base tables: {live_ms:.1f} ms of SQL per page')
+    print(f"events.csv export: HTTP {export.status_code}, {export_rows} rows")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
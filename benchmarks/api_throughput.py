@@ -0,0 +1,156 @@
+# benchmarks/api_throughput.py
+"""Throughput of the JSON API against the HTML pages showing the same data.
+
+Seeds a synthetic campus, logs one student in through the login form and
+through POST /api/v1/tokens, and requests each HTML page and its API
+counterpart repeatedly for --seconds. For each it reports requests/s, rows
+per response, SQL statements, and the response size plain and gzipped (the
+API compresses when the client sends Accept-Encoding: gzip; the HTML pages
+are measured uncompressed, as served). The HTML events page lists every
+event while the API pages through them, so rows/s is the fairer figure
+there.
+
+It also times serializing the same events through ORM objects and
+jsonify() against the API's column select and orjson, walks every page of
+/api/v1/events by cursor and checks that it returns each approved event
+exactly once, in order, and checks that ?fields= narrows the response.
+
+Usage: python -m benchmarks.api_throughput [--events 2000] [--seconds 1]
+"""
+import argparse
+import gzip
+import sys
+import time
+
+import orjson
+from flask import jsonify
+
+from benchmarks.common import api_login, login, make_app
+from benchmarks.seed import seed_campus
+import analytics
+from extensions import db
+from models import Event
+from query_budget import count_queries
+from routes.api import EVENT
+from serializers import json_response
+
+# (label, HTML url, API url); the API requests ask for gzip
+PAIRS = [
+    ('events', '/events', '/api/v1/events?limit=200'),
+    ('event details', '/event/{event_id}', '/api/v1/events/{event_id}'),
+    ('halls', '/halls', '/api/v1/halls'),
+    ('my registrations', '/my_event_registrations', '/api/v1/registrations'),
+    ('my hall bookings', '/my_hall_bookings', '/api/v1/bookings/halls'),
+    ('my bus bookings', '/my_bus_bookings', '/api/v1/bookings/buses'),
+    ('notifications', '/notifications?before=1000000000', '/api/v1/notifications'),
+    ('dashboard', '/dashboard', '/api/v1/dashboard'),
+]
+
+
+def measure(client, url, seconds, headers=None):
+    with count_queries() as counter:
+        response = client.get(url, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {url}: HTTP {response.status_code}')
+    requests = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        client.get(url, headers=headers)
+        requests += 1
+    rate = requests / (time.perf_counter() - started)
+    body = response.get_data()
+    plain = gzip.decompress(body) if response.headers.get('Content-Encoding') == 'gzip' else body
+    rows = None
+    if response.is_json:
+        payload = orjson.loads(plain)
+        rows = len(payload['data']) if 'data' in payload else 1
+    return {'rate': rate, 'queries': counter.count, 'bytes': len(plain), 'sent': len(body), 'rows': rows}
+
+
+def serialization(app, count, repeat=5):
+    """Best-of-`repeat` milliseconds to serialize `count` events both ways."""
+    fields = ('id', 'name', 'date', 'location', 'price', 'capacity')
+    timings = {'ORM objects + jsonify': [], 'column select + orjson': []}
+    with app.test_request_context(f'/api/v1/events?limit={count}'):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            events = db.session.scalars(db.select(Event).filter_by(status='Approved')
+                                        .order_by(Event.date, Event.id).limit(count)).all()
+            jsonify([{name: getattr(event, name) for name in fields} for event in events]).get_data()
+            timings['ORM objects + jsonify'].append((time.perf_counter() - started) * 1000)
+            db.session.expunge_all()
+
+            started = time.perf_counter()
+            page = EVENT.page(EVENT.select(fields).where(Event.status == 'Approved'), fields, count)
+            json_response(page.items).get_data()
+            timings['column select + orjson'].append((time.perf_counter() - started) * 1000)
+    return {label: min(values) for label, values in timings.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=1.0, help='Time spent on each URL.')
+    args = parser.parse_args(argv)
+
+    app = make_app(API_MAX_PAGE_SIZE=1000)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=args.students, events=args.events, halls=20, buses=20,
+                             hall_bookings=args.students * 10, bus_bookings=args.students * 10,
+                             registrations_per_event=20, notifications_per_user=40)
+        analytics.rebuild_rollups()
+        approved = db.session.scalars(db.select(Event.id).filter_by(status='Approved')
+                                      .order_by(Event.date, Event.id)).all()
+    event_id = seeded['approved_event_ids'][0]
+    html = login(app.test_client(), 'student0')
+    api = api_login(app.test_client(), 'student0')
+    gzip_header = {'Accept-Encoding': 'gzip'}
+    failures = []
+
+    print(f"{'':18} {'HTML req/s':>10} {'API req/s':>10} {'rows':>5} {'HTML rows/s':>11} {'API rows/s':>10} "
+          f"{'queries':>8} {'HTML KiB':>9} {'API KiB':>8} {'gzipped':>8}")
+    for label, html_url, api_url in PAIRS:
+        page = measure(html, html_url.format(event_id=event_id), args.seconds)
+        data = measure(api, api_url.format(event_id=event_id), args.seconds, gzip_header)
+        # The HTML events page lists every event, awaiting approval too, so its rows/s is if anything understated
+        html_rows = len(approved) if label == 'events' else data['rows']
+        print(f"{label:18} {page['rate']:>10.0f} {data['rate']:>10.0f} {data['rows']:>5} "
+              f"{page['rate'] * html_rows:>11.0f} {data['rate'] * data['rows']:>10.0f} "
+              f"{page['queries']:>3} /{data['queries']:>3} {page['bytes'] / 1024:>9.1f} {data['bytes'] / 1024:>8.1f} "
+              f"{data['sent'] / 1024:>8.1f}")
+        if data['queries'] > page['queries']:
+            failures.append(f'{api_url} runs {data["queries"]} queries, the page {page["queries"]}')
+
+    print(f'\nSerializing {min(200, len(approved))} events, best of 5:')
+    for label, ms in serialization(app, min(200, len(approved))).items():
+        print(f'  {label:24} {ms:7.2f} ms')
+
+    # --- Cursor pagination and field selection ---
+    walked, cursor, pages = [], None, 0
+    while True:
+        response = api.get('/api/v1/events?limit=37&fields=id' + (f'&cursor={cursor}' if cursor else ''))
+        payload = response.get_json()
+        walked += [item['id'] for item in payload['data']]
+        pages += 1
+        cursor = payload['next_cursor']
+        if not cursor:
+            break
+    print(f'\nWalked {len(walked)} approved events in {pages} pages of 37')
+    if walked != approved:
+        failures.append(f'the cursor walk returned {len(walked)} events ({len(set(walked))} distinct), '
+                        f'expected {len(approved)} in date order')
+    narrow = api.get('/api/v1/events?limit=200&fields=id,name').get_data()
+    wide = api.get('/api/v1/events?limit=200&fields=id,name,description,date,location,price,capacity,registrations').get_data()
+    print(f'200 events with ?fields=id,name: {len(narrow) / 1024:.1f} KiB; with every field: {len(wide) / 1024:.1f} KiB')
+    if len(narrow) >= len(wide):
+        failures.append('?fields= did not narrow the response')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
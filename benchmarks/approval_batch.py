@@ -0,0 +1,138 @@
+# benchmarks/approval_batch.py
+"""Event approvals one at a time vs in batches, and concurrent approvers.
+
+Seeds events pending DSA approval, then:
+
+- approves half of them with one POST per event and the other half with a
+  single batch POST from the DSA dashboard, and reports time and SQL
+  statements per event for each;
+- has two VC Office sessions batch-approve the same events at the same
+  moment, and checks that every event moved once: one audit row and one
+  creator notification per transition, reminders for each approved event,
+  and analytics counters that match a full rebuild;
+- checks that audit rows cannot be changed through the ORM.
+
+Usage: python -m benchmarks.approval_batch [--events 400]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import analytics
+import approvals
+from extensions import db
+from models import AnalyticsCounter, Event, EventAudit, EventReminder, Notification
+from query_budget import count_queries
+
+
+def counters():
+    return dict(db.session.execute(db.select(AnalyticsCounter.name, AnalyticsCounter.value)
+                                   .where(AnalyticsCounter.name.like('events:%'))).all())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=400)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-approvals-'), 'approvals.db')
+    app = make_app('sqlite:///' + path, REMINDER_LEADS='24h,1h')
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=10, events=0, hall_bookings=0, bus_bookings=0, notifications_per_user=0)
+        now = datetime.now()
+        db.session.execute(insert(Event), [
+            dict(name=f'Event {i}', description='', date=now + timedelta(days=2 + i % 30), location='Main hall',
+                 price=0.0, created_by=seeded['user_ids']['admin'], status=approvals.PENDING_DSA)
+            for i in range(args.events)])
+        analytics.rebuild_rollups()
+        event_ids = db.session.scalars(db.select(Event.id).order_by(Event.id)).all()
+    half = len(event_ids) // 2
+    failures = []
+
+    dsa = login_as(app.test_client(), seeded['user_ids']['dsa'])
+    with count_queries() as counter:
+        started = time.perf_counter()
+        for event_id in event_ids[:half]:
+            dsa.post(f'/dsa/approve_event/{event_id}')
+        single_ms = (time.perf_counter() - started) * 1000
+    single_queries = counter.count
+    with count_queries() as counter:
+        started = time.perf_counter()
+        dsa.post('/dsa/events/batch', data={'action': 'approve', 'event_ids': event_ids[half:]})
+        batch_ms = (time.perf_counter() - started) * 1000
+    batch_queries = counter.count
+    print(f'DSA approval of {args.events} events (one creator notification and audit row each):')
+    print(f'  one POST per event  {single_ms:8.1f} ms  {single_ms / half:6.2f} ms/event  '
+          f'{single_queries / half:5.1f} statements/event')
+    print(f'  one batch POST      {batch_ms:8.1f} ms  {batch_ms / (len(event_ids) - half):6.2f} ms/event  '
+          f'{batch_queries / (len(event_ids) - half):5.1f} statements/event')
+
+    # Two VC Office sessions approve the same events at once
+    barrier = threading.Barrier(2)
+    flashes = []
+
+    def approve_all():
+        client = login_as(app.test_client(), seeded['user_ids']['vc'])
+        barrier.wait()
+        client.post('/vc/events/batch', data={'action': 'approve', 'event_ids': event_ids})
+        with client.session_transaction() as session:
+            flashes.append([message for _, message in session.get('_flashes', [])])
+
+    threads = [threading.Thread(target=approve_all) for _ in range(2)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f'Two concurrent VC batch approvals of {len(event_ids)} events: {(time.perf_counter() - started) * 1000:.1f} ms')
+    for messages in flashes:
+        print(f'  {" / ".join(messages)}')
+
+    with app.app_context():
+        statuses = dict(db.session.execute(db.select(Event.status, func.count()).group_by(Event.status)).all())
+        audit = db.session.execute(db.select(EventAudit.transition, func.count(), func.count(EventAudit.event_id.distinct()))
+                                   .group_by(EventAudit.transition)).all()
+        notified = db.session.scalar(db.select(func.count()).select_from(Notification)
+                                     .filter_by(notification_type='event_status_update'))
+        reminded = db.session.scalar(db.select(func.count(EventReminder.event_id.distinct())))
+        incremental = counters()
+        analytics.rebuild_rollups()
+        rebuilt = counters()
+        print(f'Statuses {statuses}; audit rows {[tuple(row) for row in audit]}; '
+              f'{notified} notifications; {reminded} events with reminders')
+        if statuses != {approvals.APPROVED: len(event_ids)}:
+            failures.append('not every event ended up Approved')
+        if sorted(tuple(row) for row in audit) != [('dsa_approve', len(event_ids), len(event_ids)),
+                                                   ('vc_approve', len(event_ids), len(event_ids))]:
+            failures.append('an event was transitioned twice or not at all')
+        if notified != 2 * len(event_ids):
+            failures.append('creators did not get exactly one notification per transition')
+        if reminded != len(event_ids):
+            failures.append('approved events are missing reminders')
+        if {k: v for k, v in incremental.items() if v} != {k: v for k, v in rebuilt.items() if v}:
+            failures.append(f'analytics counters drifted: {incremental} vs rebuilt {rebuilt}')
+
+        entry = db.session.scalars(db.select(EventAudit).limit(1)).one()
+        entry.to_status = 'Pending DSA Approval'
+        try:
+            db.session.flush()
+            failures.append('an audit row was modified')
+        except ValueError:
+            db.session.rollback()
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
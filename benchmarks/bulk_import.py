@@ -0,0 +1,128 @@
+# benchmarks/bulk_import.py
+"""Bulk CSV import: throughput, idempotency and per-row errors.
+
+Generates CSV files of users, halls, buses and events (with a few invalid and
+duplicate rows mixed in), uploads them through /admin/import, and checks
+that the counts are right, that re-importing the same files inserts nothing,
+and that the bad rows are reported by line number. User imports are timed
+once with password hashing in-process and once across the process pool.
+
+Usage: python -m benchmarks.bulk_import [--users 5000] [--events 5000] [--workers N]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_app, login_as
+from extensions import db
+from models import User, Hall, Bus, Event
+import importer
+
+BAD_ROWS = 3  # per file, see make_csv
+
+
+def make_csv(kind, count, offset=0):
+    """Returns CSV text with `count` valid rows followed by an invalid row and two duplicates."""
+    lines = []
+    if kind == 'users':
+        lines.append('username,email,password,role')
+        lines += [f'import{offset + i},import{offset + i}@campus.edu,secret{i},student' for i in range(count)]
+        lines += ['x,not-an-email,secret,student', 'import0,other@campus.edu,secret,student',
+                  f'someone,import{offset}@campus.edu,secret,student']
+    elif kind == 'halls':
+        lines.append('name,capacity,location_details')
+        lines += [f'Import Hall {offset + i},{50 + i % 400},Block {i % 12}' for i in range(count)]
+        lines += ['Bad Hall,-5,Nowhere', f'Import Hall {offset},100,Dup', f'Import Hall {offset},100,Dup']
+    elif kind == 'buses':
+        lines.append('identifier,capacity,driver_contact,route_details')
+        lines += [f'IMP-{offset + i},{20 + i % 40},080{i:08d},Route {i % 9}' for i in range(count)]
+        lines += ['Bad Bus,lots,,', f'IMP-{offset},30,,', f'IMP-{offset},30,,']
+    elif kind == 'events':
+        lines.append('name,description,date,location,price,capacity')
+        lines += [f'Imported Event {offset + i},Description {i},2030-{1 + i % 12:02d}-{1 + i % 28:02d} 14:00,'
+                  f'Hall {i % 20},{i % 3 * 500},{100 + i % 200}' for i in range(count)]
+        lines += ['Bad Event,No date,tomorrow,Hall 1,0,10',
+                  f'Imported Event {offset},Dup,2030-01-01 14:00,Hall 0,0,100',
+                  f'Imported Event {offset},Dup,2030-01-01 14:00,Hall 0,0,100']
+    return '\n'.join(lines) + '\n'
+
+
+def upload(client, kind, text):
+    started = time.perf_counter()
+    response = client.post('/admin/import', data={'kind': kind, 'file': (io.BytesIO(text.encode()), f'{kind}.csv')},
+                           content_type='multipart/form-data')
+    elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f'import {kind}: HTTP {response.status_code}')
+    return elapsed
+
+
+def table_count(app, model):
+    with app.app_context():
+        return db.session.scalar(db.select(db.func.count()).select_from(model))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--halls', type=int, default=500)
+    parser.add_argument('--buses', type=int, default=500)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=None, help='Hashing processes for the pooled run.')
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-import-'), 'import.db')
+    app = make_app('sqlite:///' + path, TESTING=False, IMPORT_HASH_WORKERS=args.workers)
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@campus.edu', role='admin')
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+    client = login_as(app.test_client(), admin_id)
+
+    failures = []
+    counts = {'users': args.users, 'halls': args.halls, 'buses': args.buses, 'events': args.events}
+    models = {'users': User, 'halls': Hall, 'buses': Bus, 'events': Event}
+    print(f"{'import':<26} {'rows':>7} {'seconds':>8} {'rows/s':>8}")
+    for kind, count in counts.items():
+        text = make_csv(kind, count)
+        before = table_count(app, models[kind])
+        elapsed = upload(client, kind, text)
+        added = table_count(app, models[kind]) - before
+        print(f'{kind:<26} {count:>7} {elapsed:>8.2f} {count / elapsed:>8.0f}')
+        if added != count:
+            failures.append(f'{kind}: {added} rows added, expected {count}')
+
+        # Same file again: nothing new, and the bad rows reported again by line number
+        with app.app_context():
+            result = importer.import_csv(kind, io.StringIO(text), extra_values=importer.event_defaults(admin_id)
+                                         if kind == 'events' else None, hash_workers=1)
+        if result.inserted or result.updated:
+            failures.append(f'{kind}: re-import inserted {result.inserted}, updated {result.updated}')
+        if result.unchanged != count or [line for line, _ in result.errors] != [count + 2, count + 3, count + 4]:
+            failures.append(f'{kind}: re-import reported {result.unchanged} unchanged, errors {result.errors}')
+
+    # Hashing in-process vs across the pool, on fresh usernames
+    for label, workers in (('users, hashing inline', 1), ('users, hashing pool', args.workers)):
+        offset = args.users * (2 if workers == 1 else 3)
+        text = make_csv('users', args.users, offset=offset)
+        with app.app_context():
+            started = time.perf_counter()
+            result = importer.import_csv('users', io.StringIO(text), hash_workers=workers)
+            elapsed = time.perf_counter() - started
+        print(f'{label:<26} {result.inserted:>7} {elapsed:>8.2f} {result.inserted / elapsed:>8.0f}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if not failures:
+        print('ok   counts match, re-imports are no-ops and bad rows are reported by line')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# benchmarks/calendar_feeds.py
+"""Cost of polling the iCalendar feeds, cold vs cached vs conditional.
+
+Seeds a campus with many approved events, then polls the public feed and a
+student's personal feed the way calendar apps do: a cold build (caches
+cleared before every request, i.e. re-query and re-serialize everything), a
+warm poll without If-None-Match, a conditional poll that gets a 304, and a
+poll right after one event changed. It also checks the output: CRLF line
+endings, no line over 75 octets, one VEVENT per expected row, and that the
+change shows up.
+
+Usage: python -m benchmarks.calendar_feeds [--events 5000] [--repeat 20]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import calendar_feeds
+from extensions import db
+from models import Event, HallBooking, BusBooking, Registration
+from query_budget import count_queries
+
+
+def poll(client, url, repeat, headers=None, before=None):
+    """Returns (mean ms, queries of the last request, last response)."""
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = client.get(url, headers=headers or {})
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(timings), counter.count, response
+
+
+def check_body(body, expected_vevents):
+    problems = []
+    if b'\n' in body.replace(b'\r\n', b''):
+        problems.append('bare LF line ending')
+    longest = max(len(line) for line in body.split(b'\r\n'))
+    if longest > 75:
+        problems.append(f'line of {longest} octets')
+    found = body.count(b'BEGIN:VEVENT')
+    if found != expected_vevents:
+        problems.append(f'{found} VEVENTs, expected {expected_vevents}')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-calendar-'), 'calendar.db')
+    app = make_app('sqlite:///' + path, TESTING=False)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=500, events=args.events, halls=20, buses=10, hall_bookings=5000,
+                             bus_bookings=5000, registrations_per_event=20, notifications_per_user=0)
+        # Make the first student's bookings approved so they appear in their feed
+        student_id = seeded['student_ids'][0]
+        for model in (HallBooking, BusBooking):
+            db.session.execute(db.update(model).where(model.student_id == student_id).values(status='Approved'))
+        db.session.commit()
+        since = db.func.datetime('now', '-30 days')
+        public_count = db.session.scalar(db.select(db.func.count()).select_from(Event)
+                                         .where(Event.status == 'Approved', Event.date >= since))
+        user_count = len(db.session.execute(calendar_feeds.user_versions(student_id)).all())
+        changed_event = db.session.scalar(db.select(Registration.event_id).join(Event)
+                                          .where(Registration.user_id == student_id, Event.status == 'Approved'))
+
+    client = login_as(app.test_client(), student_id)
+    page = client.get('/my_event_registrations').data.decode()
+    user_url = re.search(r'href="http://localhost(/calendar/[^"]+\.ics)"', page).group(1)
+
+    failures = []
+    print(f"{'feed':<10} {'poll':<22} {'status':>6} {'queries':>7} {'ms':>8}")
+    for label, url, expected in (('public', '/calendar/events.ics', public_count), ('personal', user_url, user_count)):
+        results = [('cold (no caching)',) + poll(client, url, args.repeat, before=calendar_feeds.clear_cache)]
+        results.append(('warm',) + poll(client, url, args.repeat))
+        etag = results[-1][3].headers['ETag']
+        results.append(('conditional',) + poll(client, url, args.repeat, headers={'If-None-Match': etag}))
+        for name, ms, queries, response in results:
+            print(f'{label:<10} {name:<22} {response.status_code:>6} {queries:>7} {ms:>8.2f}')
+        problems = check_body(results[1][3].data, expected)
+        if results[2][3].status_code != 304:
+            problems.append('conditional poll did not get 304')
+        failures += [f'{label}: {problem}' for problem in problems]
+
+    # One event changes: only its VEVENT is reserialized, and the old ETag no longer matches
+    with app.app_context():
+        event = db.session.get(Event, changed_event)
+        event.name = 'Rescheduled, with a new name'
+        db.session.commit()
+    with count_queries() as counter:
+        started = time.perf_counter()
+        response = client.get(user_url, headers={'If-None-Match': etag})
+        elapsed = (time.perf_counter() - started) * 1000
+    print(f"{'personal':<10} {'after 1 event changed':<22} {response.status_code:>6} {counter.count:>7} {elapsed:>8.2f}")
+    if response.status_code != 200 or b'SUMMARY:Rescheduled\\, with a new name' not in response.data:
+        failures.append('personal: the changed event is not in the feed')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
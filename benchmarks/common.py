@@ -0,0 +1,56 @@
+# benchmarks/common.py
+"""Shared setup for the benchmark scripts."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app
+from benchmarks.seed import PASSWORD
+
+
+def make_app(database_uri='sqlite://', **overrides):
+    """Builds an isolated app: throwaway database, no CSRF, no outgoing mail, no rate limits, no scheduled jobs."""
+    workdir = tempfile.mkdtemp(prefix='campus-bench-')
+    config = dict(
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SECRET_KEY='benchmark',
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        MAIL_SUPPRESS_SEND=True,
+        MAIL_DEFAULT_SENDER='bench@campus.test',
+        RATELIMIT_ENABLED=False,
+        SCHEDULER_ENABLED=False,
+        CERTIFICATES_FOLDER=os.path.join(workdir, 'certificates'),
+        PROFILE_DIR=os.path.join(workdir, 'profiles'),
+        JWT_SECRET_KEY='benchmark-api-token-signing-key-0123456789',
+    )
+    config.update(overrides)
+    return create_app(**config)
+
+
+def login(client, username, password=PASSWORD):
+    response = client.post('/login', data={'username': username, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f"Login failed for {username}: HTTP {response.status_code}")
+    return client
+
+
+def login_as(client, user_id):
+    """Authenticates a test client through the session cookie, skipping password hashing."""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def api_login(client, username, password=PASSWORD):
+    """Gets an API access token and sends it with every later request of `client`."""
+    response = client.post('/api/v1/tokens', json={'username': username, 'password': password})
+    if response.status_code != 201:
+        raise RuntimeError(f"API login failed for {username}: HTTP {response.status_code}")
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {response.get_json()['access_token']}"
+    return client
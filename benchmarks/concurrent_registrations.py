@@ -0,0 +1,96 @@
+# benchmarks/concurrent_registrations.py
+"""Concurrent event-registration throughput against a real database backend.
+
+Every worker thread logs in as its own student and POSTs to
+/event/<id>/register, so each request does the duplicate check, the capacity
+COUNT and an INSERT. The event is paid, which keeps PDF/email work out of the
+measurement.
+
+Usage:
+    python -m benchmarks.concurrent_registrations                      # SQLite file (WAL)
+    python -m benchmarks.concurrent_registrations --database-url postgresql://localhost/campus_bench
+The target database is dropped and recreated.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+from extensions import db
+from models import Event, Registration
+
+
+def run(database_url, threads, registrations):
+    app = make_app(database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seeded = seed_campus(students=registrations, events=1, halls=0, buses=0, hall_bookings=0, bus_bookings=0,
+                    registrations_per_event=0, notifications_per_user=0)
+        event = db.session.execute(db.select(Event)).scalar_one()
+        event.status, event.price, event.capacity = 'Approved', 10.0, None
+        db.session.commit()
+        event_id = event.id
+    student_ids = seeded['student_ids']
+
+    local = threading.local()
+    errors = []
+
+    def register(index):
+        # One client per thread, switched to the next student through the session
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        login_as(client, student_ids[index])
+        started = time.perf_counter()
+        response = client.post(f'/event/{event_id}/register')
+        elapsed = time.perf_counter() - started
+        if response.status_code != 302:
+            errors.append(response.status_code)
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(register, range(registrations)))
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        stored = db.session.execute(db.select(db.func.count(Registration.id))).scalar()
+        backend = db.engine.dialect.name
+
+    return {
+        'backend': backend,
+        'threads': threads,
+        'registrations': stored,
+        'errors': len(errors),
+        'wall_seconds': round(wall, 3),
+        'registrations_per_second': round(stored / wall, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=None,
+                        help='Defaults to a temporary SQLite file.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--registrations', type=int, default=400)
+    args = parser.parse_args(argv)
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='campus-bench-'), 'bench.db')
+    for threads in args.threads:
+        result = run(url, threads, args.registrations)
+        print(' '.join(f'{key}={value}' for key, value in result.items()))
+        if result['errors']:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# benchmarks/dashboard_summary.py
+"""The per-user dashboard summary: cost and cache correctness.
+
+Seeds a synthetic campus and, for a sample of students, compares:
+
+- loading the three pages a student would otherwise open to see the same
+  things (My Event Registrations, My Hall Bookings, My Bus Bookings; the
+  unread count is on every page);
+- GET /dashboard.json with the cache off, i.e. the two summary statements;
+- GET /dashboard.json served from the per-user cache.
+
+Then, with the cache on, it has one student register for an event, request
+a hall, open their notifications and receive a notification from an admin
+approving their hall booking, and after each write checks that
+/dashboard.json matches a summary read straight from the database.
+
+Usage: python -m benchmarks.dashboard_summary [--students 2000] [--sample 50]
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import dashboard
+from extensions import db
+from models import HallBooking, Registration
+from query_budget import count_queries
+
+PAGES = ('/my_event_registrations', '/my_hall_bookings', '/my_bus_bookings')
+
+
+def timed(client, urls):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        for url in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {url}: HTTP {response.status_code}')
+        elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, counter.count
+
+
+def report(label, samples):
+    timings = sorted(sample[0] for sample in samples)
+    print(f"{label:34} median {statistics.median(timings):7.2f} ms   "
+          f"p95 {timings[int(len(timings) * 0.95)]:7.2f} ms   {samples[0][1]:>3} queries")
+    return statistics.median(timings)
+
+
+def fresh(app, user_id):
+    with app.app_context():
+        summary = dashboard.build_summary(user_id).as_dict()
+    summary.pop('generated_at')
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=300)
+    parser.add_argument('--bookings', type=int, default=20000, help='Hall bookings, and as many bus bookings.')
+    parser.add_argument('--sample', type=int, default=50, help='Students whose dashboards are timed.')
+    args = parser.parse_args(argv)
+
+    app = make_app(DASHBOARD_CACHE_SECONDS=60)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=args.students, events=args.events, halls=20, buses=20,
+                             hall_bookings=args.bookings, bus_bookings=args.bookings,
+                             registrations_per_event=50, notifications_per_user=20)
+    students = seeded['student_ids'][:args.sample]
+    client = app.test_client()
+    failures = []
+
+    pages, cold, warm = [], [], []
+    for student_id in students:
+        login_as(client, student_id)
+        pages.append(timed(client, PAGES))
+        app.config['DASHBOARD_CACHE_SECONDS'] = 0
+        cold.append(timed(client, ['/dashboard.json']))
+        app.config['DASHBOARD_CACHE_SECONDS'] = 60
+        timed(client, ['/dashboard.json'])  # fills the cache
+        warm.append(timed(client, ['/dashboard.json']))
+    print(f'{args.sample} students, {args.bookings} hall and {args.bookings} bus bookings:')
+    pages_ms = report('three pages', pages)
+    cold_ms = report('/dashboard.json, uncached', cold)
+    warm_ms = report('/dashboard.json, cached', warm)
+    print(f'The uncached summary costs {cold_ms / pages_ms:.0%} of the pages, the cached one {warm_ms / pages_ms:.0%}')
+    if warm[0][1] > 1:
+        failures.append(f'a cached summary ran {warm[0][1]} queries')
+
+    # --- Writes invalidate the writer's cached summary ---
+    student_id = students[0]
+    login_as(client, student_id)
+    with app.app_context():
+        registered = set(db.session.scalars(db.select(Registration.event_id).filter_by(user_id=student_id)))
+    event_id = next(i for i in seeded['approved_event_ids'] if i not in registered)
+    admin = login_as(app.test_client(), seeded['user_ids']['admin'])
+    form = {'requested_date': (date.today() + timedelta(days=7)).isoformat(), 'start_time': '10:00',
+            'end_time': '12:00', 'purpose': 'Dashboard benchmark', 'event_id': ''}
+
+    def approve_latest_hall_booking():
+        with app.app_context():
+            booking_id = db.session.scalar(db.select(HallBooking.id).filter_by(student_id=student_id)
+                                           .order_by(HallBooking.id.desc()).limit(1))
+        return admin.post(f'/admin/hall_booking/approve/{booking_id}')
+
+    writes = [
+        ('register for an event', lambda: client.post(f'/event/{event_id}/register')),
+        ('request a hall', lambda: client.post(f"/hall/book/{seeded['hall_ids'][0]}", data=form)),
+        ('open notifications', lambda: client.get('/notifications')),
+        ('admin approves the hall booking', approve_latest_hall_booking),
+    ]
+    client.get('/dashboard.json')
+    for label, write in writes:
+        before = client.get('/dashboard.json').get_json()
+        status = write().status_code
+        after = client.get('/dashboard.json').get_json()
+        before.pop('generated_at'), after.pop('generated_at')
+        expected = fresh(app, student_id)
+        changed = sorted(key for key in after if after[key] != before[key])
+        print(f"{label:34} HTTP {status}; changed: {', '.join(changed) or 'nothing'}")
+        if after != expected:
+            failures.append(f'after "{label}" the dashboard served {after}, the database has {expected}')
+        if not changed:
+            failures.append(f'"{label}" did not change the summary')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
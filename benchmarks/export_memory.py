@@ -0,0 +1,89 @@
+# benchmarks/export_memory.py
+"""Peak memory of the streaming attendee export.
+
+Seeds about `--registrations` registrations (1M by default) into a temporary
+SQLite file, then downloads /admin/export/attendees through the test client
+while tracemalloc tracks the peak. The full export and a single-event export
+must have roughly the same peak memory, i.e. memory does not grow with the
+number of rows.
+
+Usage: python -m benchmarks.export_memory [--registrations 1000000] [--xlsx] [--max-growth 2.0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+from extensions import db
+
+
+def download(client, url):
+    """Streams the response body and returns (bytes, rows, seconds, peak bytes)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    size = rows = 0
+    for chunk in response.response:
+        chunk = chunk.encode() if isinstance(chunk, str) else chunk
+        size += len(chunk)
+        rows += chunk.count(b'\n')
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if response.status_code != 200:
+        raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    return size, rows, elapsed, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registrations', type=int, default=1_000_000)
+    parser.add_argument('--xlsx', action='store_true', help='Also export the full dataset as XLSX (slow).')
+    parser.add_argument('--max-growth', type=float, default=2.0,
+                        help='Maximum ratio of full-export to single-event-export peak memory.')
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-export-'), 'export.db')
+    app = make_app('sqlite:///' + path, TESTING=False)
+    students, approved_events = 5000, 200
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seeded = seed_campus(students=students, events=approved_events * 2, halls=0, buses=0, hall_bookings=0,
+                             bus_bookings=0, registrations_per_event=min(students, args.registrations // approved_events),
+                             notifications_per_user=0)
+        print(f'seeded in {time.perf_counter() - started:.1f}s')
+
+    client = login_as(app.test_client(), seeded['user_ids']['admin'])
+    one_event = seeded['approved_event_ids'][0]
+    exports = [
+        ('single event, CSV', f'/admin/export/attendees?event_id={one_event}'),
+        ('everything, CSV', '/admin/export/attendees'),
+        ('everything, 3 columns, CSV', '/admin/export/attendees?columns=username,email,ticket_id'),
+    ]
+    if args.xlsx:
+        exports.append(('everything, XLSX', '/admin/export/attendees?format=xlsx'))
+
+    print(f"{'export':<28} {'rows':>9} {'MB':>8} {'seconds':>8} {'peak MB':>8}")
+    peaks = {}
+    for label, url in exports:
+        size, rows, elapsed, peak = download(client, url)
+        peaks[label] = peak
+        # XLSX is zipped: count rows from the CSV runs only
+        print(f"{label:<28} {rows - 1 if 'CSV' in label else '-':>9} {size / 1e6:>8.1f} {elapsed:>8.1f} {peak / 1e6:>8.1f}")
+
+    growth = peaks['everything, CSV'] / peaks['single event, CSV']
+    print(f'peak memory, full vs single-event export: {growth:.2f}x')
+    if growth > args.max_growth:
+        print(f'FAIL memory grows with the number of exported rows (over {args.max_growth}x)')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# benchmarks/helper_functions.py
+"""Microbenchmarks of the per-request helpers, checked against a stored baseline.
+
+Times generate_pdf_from_template, generate_qr_code_base64,
+send_confirmation_email and the nl2br filter in isolation, on typical
+inputs and on large ones (long event descriptions for nl2br; a certificate
+with a long event name and location, and a bus ticket with a long purpose,
+for the PDFs). Each case runs for at least --seconds after one warm-up
+call; its median and p95 are reported, along with the peak and retained
+memory of a single call under tracemalloc. Mail is suppressed; the email
+case serializes each message as an SMTP send would, without the network.
+
+Timings are also divided by a fixed pure-Python calibration loop timed in
+the same run, so a baseline recorded on one machine stays meaningful on
+another of a different speed. The run fails if a case's normalized median
+exceeds the baseline's by more than --max-slowdown, or its peak memory
+grows by more than --max-memory-growth. The baseline is
+benchmarks/baselines/helper_functions.json; refresh it with
+--update-baseline after an intended change.
+
+Usage: python -m benchmarks.helper_functions [--seconds 1] [--case qr_ticket] [--update-baseline]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, time as clock, timedelta, UTC
+from types import SimpleNamespace
+
+from flask_mail import email_dispatched
+from jinja2.nodes import EvalContext
+
+from benchmarks.common import ROOT, make_app
+from helpers import generate_pdf_from_template, generate_qr_code_base64, nl2br, send_confirmation_email
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'helper_functions.json')
+LOREM = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor <incididunt> & labore. '
+
+
+def calibrate():
+    """Median milliseconds of a fixed pure-Python workload."""
+    def workload():
+        total = 0
+        for i in range(200_000):
+            total += i % 7
+        return total
+    timings = []
+    for _ in range(7):
+        started = time.perf_counter()
+        workload()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def fixtures():
+    now = datetime.now()
+    user = SimpleNamespace(username='student42', email='student42@campus.test')
+    event = SimpleNamespace(name='Faculty of Science Welcome Night', date=now + timedelta(days=14),
+                            location='Main Auditorium', price=10.0)
+    big_event = SimpleNamespace(name='International Conference on ' + 'Renewable Energy and Sustainable Cities ' * 4,
+                                date=now + timedelta(days=60), location='Block ' + 'C, Engineering Complex, ' * 8,
+                                price=120.0)
+    registration = SimpleNamespace(id=42, ticket_id='0b9e6c1e-3f5a-4b8e-9d0c-5c2f3a1e7d42', user=user,
+                                   registration_date=now, payment_status='paid')
+    booking = SimpleNamespace(id=7, requester=user, bus=SimpleNamespace(identifier='BUS-007'),
+                              requested_date=now.date(), pickup_time=clock(7, 30), pickup_location='Main gate',
+                              destination='Town', number_of_passengers=18, purpose=LOREM * 60)
+    return user, event, big_event, registration, booking
+
+
+def cases(app):
+    user, event, big_event, registration, booking = fixtures()
+    eval_ctx = EvalContext(app.jinja_env)
+    eval_ctx.autoescape = True
+    short_text = 'Bring your student ID.\nDoors open at 6pm.\n\nSee you there!'
+    long_text = '\n\n'.join('\n'.join([LOREM * 3] * 4) for _ in range(200))  # ~250 KB, 200 paragraphs
+    ticket_qr = f"Event: {event.name}\nAttendee: {user.username}\nTicket ID: {registration.ticket_id}"
+
+    def certificate(for_event):
+        return lambda: generate_pdf_from_template('event_certificate_template.html', 'bench_certificate.pdf', {
+            'user': user, 'event': for_event, 'registration': registration,
+            'qr_code_base64': generate_qr_code_base64(ticket_qr), 'now': datetime.now(UTC)})
+
+    return {
+        'nl2br_short': lambda: nl2br(eval_ctx, short_text),
+        'nl2br_long_description': lambda: nl2br(eval_ctx, long_text),
+        'qr_ticket': lambda: generate_qr_code_base64(ticket_qr),
+        'qr_long_payload': lambda: generate_qr_code_base64(ticket_qr + '\n' + LOREM * 8),
+        'email_confirmation': lambda: send_confirmation_email(user.email, event, registration),
+        'pdf_certificate': certificate(event),
+        'pdf_certificate_large_event': certificate(big_event),
+        'pdf_bus_ticket_long_purpose': lambda: generate_pdf_from_template('bus_ticket_template.html', 'bench_ticket.pdf', {
+            'booking': booking, 'qr_code_base64': generate_qr_code_base64(ticket_qr), 'now': datetime.now(UTC)}),
+    }
+
+
+def measure(function, seconds, min_runs=5):
+    function()  # warm-up: lazy imports, template compilation
+    tracemalloc.start()
+    function()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    deadline = time.perf_counter() + seconds
+    while len(timings) < min_runs or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'runs': len(timings),
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'peak_kib': round(peak / 1024, 1),
+        'retained_kib': round(retained / 1024, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=1.0, help='Minimum timing per case.')
+    parser.add_argument('--case', action='append', help='Run only these cases (repeatable).')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--max-slowdown', type=float, default=1.5)
+    parser.add_argument('--max-memory-growth', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    app = make_app()
+    email_dispatched.connect(lambda app, message: message.as_bytes(), weak=False)
+    logging.getLogger('xhtml2pdf').setLevel(logging.CRITICAL)  # complains about the templates' CSS on every render
+    logging.getLogger('helpers').setLevel(logging.WARNING)     # one INFO line per PDF and email
+    calibration_ms = calibrate()
+    results = {}
+    # The certificate templates call url_for(), which needs a request
+    with app.test_request_context():
+        for name, function in cases(app).items():
+            if args.case and name not in args.case:
+                continue
+            results[name] = measure(function, args.seconds)
+            results[name]['normalized'] = round(results[name]['median_ms'] / calibration_ms, 5)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    print(f'Calibration loop: {calibration_ms:.2f} ms')
+    print(f"{'case':30} {'runs':>6} {'median ms':>10} {'p95 ms':>9} {'peak KiB':>9} {'kept KiB':>9} {'vs baseline':>12}")
+    failures = []
+    for name, result in results.items():
+        before = (baseline or {}).get('cases', {}).get(name)
+        change = ''
+        if before:
+            slowdown = result['normalized'] / before['normalized']
+            change = f'{(slowdown - 1) * 100:+.0f}%'
+            if slowdown > args.max_slowdown:
+                failures.append(f'{name} is {slowdown:.2f}x slower than the baseline')
+            if result['peak_kib'] > max(before['peak_kib'] * args.max_memory_growth, before['peak_kib'] + 64):
+                failures.append(f"{name} peaks at {result['peak_kib']} KiB, baseline {before['peak_kib']} KiB")
+        print(f"{name:30} {result['runs']:>6} {result['median_ms']:>10.3f} {result['p95_ms']:>9.3f} "
+              f"{result['peak_kib']:>9.1f} {result['retained_kib']:>9.1f} {change:>12}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as handle:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'calibration_ms': round(calibration_ms, 4), 'cases': results}, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(f'Baseline written to {args.baseline}')
+    elif baseline is None:
+        print(f'No baseline at {args.baseline}; run with --update-baseline to record one')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# benchmarks/load_test.py
+"""Concurrent load test of the critical routes, with results saved as JSON.
+
+Seeds a synthetic campus of the given size with bulk inserts, then starts
+--users virtual students and --admins virtual admins, each a thread with its
+own test client that logs in through POST /login. Students pick requests at
+random according to MIX: browsing events, opening an event, registering
+for it, requesting a hall, reading notifications and logging in again.
+Admins approve pending bus bookings, one POST each, which renders the bus
+ticket PDF.
+
+For every route it reports requests, errors, throughput over the whole
+run, p50/p95/p99 latency and SQL statements per request. The same figures
+are written to --output (default benchmarks/results/load_test-<commit>.json)
+with the commit, data volume and settings. Pass --compare with the JSON of
+an earlier run to print the change in p95 and queries per route.
+
+The load generator and the app share one process (and its GIL), so
+absolute latencies are pessimistic; compare runs made on the same machine.
+A request answered with HTTP 4xx/5xx counts as an error and fails the run.
+
+Usage:
+    python -m benchmarks.load_test [--users 16] [--admins 2] [--requests 100] [--students 2000] [--events 300]
+    python -m benchmarks.load_test --compare benchmarks/results/load_test-abc1234.json
+    python -m benchmarks.load_test --database-url postgresql://localhost/campus_bench
+The target database is dropped and recreated.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import ROOT, make_app
+from benchmarks.seed import PASSWORD, seed_campus
+from extensions import db
+from models import BusBooking
+from query_budget import count_queries
+
+# Route -> relative weight of a student's next request
+MIX = {
+    'list_events': 20,
+    'event_details': 30,
+    'register_for_event': 10,
+    'book_hall_request': 10,
+    'notifications': 25,
+    'login': 5,
+}
+ROUTES = ('login', *[name for name in MIX if name != 'login'], 'admin_approve_bus_booking')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def commit_id():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Recorder:
+    """Collects (latency, status, queries) samples per route from every thread."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def request(self, route, send):
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = send()
+            elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.samples[route].append((elapsed, response.status_code, counter.count))
+        return response
+
+    def summary(self, wall_seconds):
+        routes = {}
+        for route in ROUTES:
+            samples = self.samples.get(route)
+            if not samples:
+                continue
+            latencies = [sample[0] for sample in samples]
+            queries = [sample[2] for sample in samples]
+            routes[route] = {
+                'requests': len(samples),
+                'errors': sum(1 for sample in samples if sample[1] >= 400),
+                'throughput_rps': round(len(samples) / wall_seconds, 1),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'queries_mean': round(sum(queries) / len(queries), 2),
+                'queries_max': max(queries),
+            }
+        return routes
+
+
+def student(app, username, seeded, requests, recorder, rng):
+    client = app.test_client()
+    login = lambda: client.post('/login', data={'username': username, 'password': PASSWORD})
+    recorder.request('login', login)
+    routes, weights = list(MIX), list(MIX.values())
+    for _ in range(requests):
+        route = rng.choices(routes, weights)[0]
+        event_id = rng.choice(seeded['approved_event_ids'])
+        if route == 'login':
+            recorder.request(route, login)
+        elif route == 'list_events':
+            recorder.request(route, lambda: client.get('/events'))
+        elif route == 'event_details':
+            recorder.request(route, lambda: client.get(f'/event/{event_id}'))
+        elif route == 'register_for_event':
+            recorder.request(route, lambda: client.post(f'/event/{event_id}/register'))
+        elif route == 'book_hall_request':
+            start = rng.randint(8, 18)
+            form = {'requested_date': (date.today() + timedelta(days=rng.randint(1, 60))).isoformat(),
+                    'start_time': f'{start:02d}:00', 'end_time': f'{start + 2:02d}:00',
+                    'purpose': 'Load test booking', 'event_id': ''}
+            hall_id = rng.choice(seeded['hall_ids'])
+            recorder.request(route, lambda: client.post(f'/hall/book/{hall_id}', data=form))
+        else:
+            recorder.request(route, lambda: client.get('/notifications'))
+
+
+def admin(app, pending, requests, recorder):
+    client = app.test_client()
+    recorder.request('login', lambda: client.post('/login', data={'username': 'admin', 'password': PASSWORD}))
+    for _ in range(requests):
+        try:
+            booking_id = pending.get_nowait()
+        except queue.Empty:
+            return
+        recorder.request('admin_approve_bus_booking',
+                         lambda: client.post(f'/admin/bus_booking/approve/{booking_id}'))
+
+
+def run(args):
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='campus-load-'), 'load.db')
+    # TESTING off so a failing view is recorded as an HTTP 500 instead of ending its thread
+    app = make_app(url, TESTING=False)
+    logging.getLogger('xhtml2pdf').setLevel(logging.CRITICAL)  # complains about the templates' CSS on every render
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        seeded = seed_campus(students=args.students, events=args.events, halls=args.halls, buses=args.buses,
+                             hall_bookings=args.bookings, bus_bookings=args.bookings,
+                             registrations_per_event=args.registrations_per_event,
+                             notifications_per_user=args.notifications_per_user)
+        seed_seconds = time.perf_counter() - started
+        pending = queue.Queue()
+        for booking_id in db.session.scalars(db.select(BusBooking.id).filter_by(status='Pending').order_by(BusBooking.id)):
+            pending.put(booking_id)
+        backend = db.engine.dialect.name
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    usernames = rng.sample([f'student{i}' for i in range(args.students)], args.users)
+    threads = [threading.Thread(target=student, args=(app, username, seeded, args.requests, recorder,
+                                                      random.Random(rng.random())))
+               for username in usernames]
+    threads += [threading.Thread(target=admin, args=(app, pending, args.requests, recorder))
+                for _ in range(args.admins)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    routes = recorder.summary(wall)
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'commit': commit_id(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'backend': backend,
+        'settings': {name: getattr(args, name) for name in (
+            'users', 'admins', 'requests', 'students', 'events', 'halls', 'buses', 'bookings',
+            'registrations_per_event', 'notifications_per_user', 'seed')},
+        'seed_seconds': round(seed_seconds, 2),
+        'wall_seconds': round(wall, 2),
+        'throughput_rps': round(total / wall, 1),
+        'routes': routes,
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"{result['backend']} at {result['commit']}: {result['settings']['users']} students, "
+          f"{result['settings']['admins']} admins; seeded in {result['seed_seconds']}s, "
+          f"{result['throughput_rps']} requests/s over {result['wall_seconds']}s")
+    header = f"{'route':28} {'reqs':>6} {'errs':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}"
+    if baseline:
+        header += f" {'p95 change':>11} {'queries was':>12}"
+    print(header)
+    for route, stats in result['routes'].items():
+        line = (f"{route:28} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>7.1f} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['queries_mean']:>8.1f}")
+        before = (baseline or {}).get('routes', {}).get(route)
+        if before:
+            change = (stats['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0.0
+            line += f" {change:>+10.0f}% {before['queries_mean']:>12.1f}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file.')
+    parser.add_argument('--users', type=int, default=16, help='Concurrent virtual students.')
+    parser.add_argument('--admins', type=int, default=2, help='Concurrent virtual admins approving bus bookings.')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per virtual user after logging in.')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=300)
+    parser.add_argument('--halls', type=int, default=20)
+    parser.add_argument('--buses', type=int, default=20)
+    parser.add_argument('--bookings', type=int, default=2000, help='Hall bookings, and as many bus bookings.')
+    parser.add_argument('--registrations-per-event', type=int, default=50)
+    parser.add_argument('--notifications-per-user', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Where to write the JSON results.')
+    parser.add_argument('--compare', default=None, help='JSON results of an earlier run to compare with.')
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"load_test-{result['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as handle:
+        json.dump(result, handle, indent=2)
+    print(f'Results written to {output}')
+
+    server_errors = {route: stats['errors'] for route, stats in result['routes'].items() if stats['errors']}
+    if server_errors:
+        print(f'FAIL requests answered with an error: {server_errors}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
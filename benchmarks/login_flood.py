@@ -0,0 +1,148 @@
+# benchmarks/login_flood.py
+"""Legitimate login latency under a credential-stuffing flood.
+
+Attacker threads POST /login at a combined --attack-rate, each from its own
+IP, trying wrong passwords against real accounts. (They share this process's
+CPU with the server, so the rate is capped rather than flat out.) Meanwhile one legitimate user
+at a time logs in with the right password, from a separate IP and a different
+account. Once the attackers have used up their initial bursts, legitimate
+latency is measured three ways: with no flood, with the
+flood and rate limits on, and with the flood and rate limits off. With the
+limits on, attackers get a cheap 429 instead of a password hash, so the
+legitimate median should stay close to the no-flood baseline. The attempts
+the limits still allow (RATELIMITS['login']['ip'] per attacker IP) do hash,
+which shows up in the p95 on a machine with few cores.
+
+Usage: python -m benchmarks.login_flood [--seconds 20] [--attackers 4] [--attack-rate 100] [--max-slowdown 1.5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import make_app
+from benchmarks.seed import seed_campus, PASSWORD
+from extensions import db
+
+
+def attack(app, ip, usernames, rate, stop, counts, throttled, lock):
+    """Sends `rate` attempts per second (or as many as the server answers, if fewer)."""
+    client = app.test_client()
+    rng = random.Random(ip)
+    seen = Counter()
+    started, sent = time.perf_counter(), 0
+    while not stop.is_set():
+        delay = started + sent / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sent += 1
+        response = client.post('/login', data={'username': rng.choice(usernames), 'password': 'hunter2'},
+                               environ_base={'REMOTE_ADDR': ip})
+        seen[response.status_code] += 1
+        if response.status_code == 429 and ip not in throttled:
+            with lock:
+                throttled.add(ip)
+    with lock:
+        counts.update(seen)
+
+
+def wait_for_steady_state(throttled, lock, attackers, timeout):
+    """Waits until every attacker has used up its burst and is being throttled."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        with lock:
+            if len(throttled) >= attackers:
+                return
+        time.sleep(0.1)
+
+
+def legitimate_logins(app, usernames, seconds, pause):
+    """Logs in as a different user every `pause` seconds; returns (latencies in ms, failures)."""
+    latencies, failures = [], 0
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        username = usernames[i % len(usernames)]
+        ip = f'10.1.{i // 250 % 250}.{i % 250 + 1}'
+        started = time.perf_counter()
+        response = app.test_client().post('/login', data={'username': username, 'password': PASSWORD},
+                                          environ_base={'REMOTE_ADDR': ip})
+        latencies.append((time.perf_counter() - started) * 1000)
+        failures += response.status_code != 302
+        i += 1
+        time.sleep(pause)
+    return latencies, failures
+
+
+def phase(app, label, attackers, attack_rate, legit_users, targets, seconds, pause, limited, warmup):
+    app.config['RATELIMIT_ENABLED'] = limited
+    app.extensions['ratelimit'].clear()
+    stop, lock, counts, throttled = threading.Event(), threading.Lock(), Counter(), set()
+    per_attacker = attack_rate / max(attackers, 1)
+    threads = [threading.Thread(target=attack, args=(app, f'203.0.113.{n + 1}', targets, per_attacker,
+                                                     stop, counts, throttled, lock))
+               for n in range(attackers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        if limited and attackers:
+            wait_for_steady_state(throttled, lock, attackers, warmup)
+        latencies, failures = legitimate_logins(app, legit_users, seconds, pause)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    answered = sum(counts.values()) / (time.perf_counter() - started)
+    p50 = statistics.median(latencies)
+    p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+    print(f'{label:<22} {len(latencies):>6} {failures:>6} {p50:>8.1f} {p95:>8.1f} '
+          f'{answered:>10.1f} {counts[429]:>8} {counts[200]:>7}')
+    return p50, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=20.0, help='Duration of each phase.')
+    parser.add_argument('--attackers', type=int, default=4, help='Attacker threads, one IP each.')
+    parser.add_argument('--attack-rate', type=float, default=100.0, help='Attempts per second, all attackers together.')
+    parser.add_argument('--pause', type=float, default=0.2, help='Seconds between legitimate logins.')
+    parser.add_argument('--warmup', type=float, default=120.0,
+                        help='Longest wait for the attackers to exhaust their bursts before measuring.')
+    parser.add_argument('--max-slowdown', type=float, default=1.5,
+                        help='Maximum ratio of flooded (rate-limited) to baseline legitimate median latency.')
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-flood-'), 'flood.db')
+    app = make_app('sqlite:///' + path, TESTING=False, RATELIMIT_ENABLED=True)
+    with app.app_context():
+        db.create_all()
+        seed_campus(students=400, events=0, halls=0, buses=0, hall_bookings=0, bus_bookings=0,
+                    registrations_per_event=0, notifications_per_user=0)
+    # Attackers stuff half the accounts; legitimate users own the other half
+    targets = [f'student{i}' for i in range(200)]
+    legit_users = [f'student{i}' for i in range(200, 400)]
+
+    print(f"{'phase':<22} {'logins':>6} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'answered/s':>10} {'429s':>8} {'hashed':>7}")
+    run = lambda label, attackers, limited: phase(app, label, attackers, args.attack_rate, legit_users, targets,
+                                                  args.seconds, args.pause, limited, args.warmup)
+    baseline, _ = run('no flood', 0, True)
+    limited, failures = run('flood, limits on', args.attackers, True)
+    run('flood, limits off', args.attackers, False)
+
+    slowdown = limited / baseline
+    print(f'legitimate median latency under flood with limits on: {slowdown:.2f}x the baseline')
+    if failures or slowdown > args.max_slowdown:
+        print(f'FAIL legitimate logins were rejected or slowed down more than {args.max_slowdown}x')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
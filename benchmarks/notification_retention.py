@@ -0,0 +1,199 @@
+# benchmarks/notification_retention.py
+"""Archiving a year of notifications while the app keeps writing.
+
+Seeds a campus whose notification table holds a year of history (one
+student owning a large share of it), then:
+
+- times that student's notifications page, and the unbounded query the page
+  used to run, before archiving;
+- archives read notifications past the retention period batch by batch,
+  while a writer thread keeps creating notifications, and reports each
+  batch's duration (how long it holds the write lock) and the writer's
+  commit latency compared with a run without archiving;
+- times the page again, and pages through the student's whole history with
+  ?before= to check that every notification is still reachable.
+
+Usage: python -m benchmarks.notification_retention [--notifications 200000] [--batch-size 1000]
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import retention
+from extensions import db
+from helpers import create_notification
+from models import Notification, NotificationArchive
+from query_budget import count_queries
+
+RETENTION_DAYS = 90
+
+
+def seed_notifications(count, student_ids, heavy_share, rng):
+    now = datetime.utcnow()
+    heavy = student_ids[0]
+    rows = []
+    for n in range(count):
+        age = timedelta(days=365) * (1 - n / count)  # oldest first, so ids follow time
+        user_id = heavy if rng.random() < heavy_share else rng.choice(student_ids[1:])
+        rows.append(dict(user_id=user_id, message=f'Your booking request #{n} was approved.',
+                         timestamp=now - age, is_read=rng.random() < 0.95 or age < timedelta(days=7),
+                         notification_type='booking_status_update', related_id=n))
+        if len(rows) == 10_000:
+            db.session.execute(insert(Notification), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Notification), rows)
+    db.session.commit()
+
+
+def page_ms(client, url, repeat=10):
+    timings = []
+    for _ in range(repeat):
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), counter.count, response
+
+
+class Writer(threading.Thread):
+    """Creates a notification every few milliseconds and records each commit's latency."""
+
+    def __init__(self, app, user_id):
+        super().__init__(daemon=True)
+        self.app, self.user_id = app, user_id
+        self.latencies = []
+        self.stop = threading.Event()
+
+    def run(self):
+        with self.app.app_context():
+            while not self.stop.is_set():
+                started = time.perf_counter()
+                create_notification(self.user_id, 'Your hall booking was approved.', 'booking_status_update')
+                self.latencies.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.005)
+
+
+def write_latency(app, user_id, work):
+    writer = Writer(app, user_id)
+    writer.start()
+    work()
+    writer.stop.set()
+    writer.join()
+    latencies = sorted(writer.latencies)
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    return f'{len(latencies)} writes, p50 {statistics.median(latencies):.1f} ms, p99 {p99:.1f} ms, max {latencies[-1]:.1f} ms'
+
+
+def count_user(user_id):
+    return sum(db.session.scalar(db.select(func.count()).select_from(model).filter_by(user_id=user_id))
+               for model in (Notification, NotificationArchive))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notifications', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--heavy-share', type=float, default=0.05, help="share of notifications owned by one student")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-retention-'), 'retention.db')
+    app = make_app('sqlite:///' + path, TESTING=False, NOTIFICATION_RETENTION_DAYS=RETENTION_DAYS,
+                   NOTIFICATION_ARCHIVE_PAUSE_SECONDS=0.01)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=500, events=20, hall_bookings=0, bus_bookings=0, registrations_per_event=0,
+                             notifications_per_user=0)
+        student_ids = seeded['student_ids']
+        heavy, writer_id = student_ids[0], student_ids[1]
+        seed_notifications(args.notifications, student_ids, args.heavy_share, random.Random(0))
+        heavy_total = count_user(heavy)
+        # Opening the page marks the heavy student's notifications read; the writer's are new
+        others = Notification.user_id.not_in((heavy, writer_id))
+        unread_before = db.session.scalar(db.select(func.count()).select_from(Notification)
+                                          .filter_by(is_read=False).where(others))
+        started = time.perf_counter()
+        Notification.query.filter_by(user_id=heavy).order_by(Notification.timestamp.desc()).all()
+        unbounded_ms = (time.perf_counter() - started) * 1000
+        db.session.remove()
+
+    client = login_as(app.test_client(), heavy)
+    failures = []
+    print(f'{args.notifications} notifications, {heavy_total} of them for one student; '
+          f'read ones older than {RETENTION_DAYS} days are archived')
+    print(f'Unbounded history query (previous page): {unbounded_ms:.1f} ms')
+    ms, queries, _ = page_ms(client, '/notifications')
+    print(f'Notifications page before archiving: {ms:.1f} ms, {queries} queries')
+
+    with app.app_context():
+        baseline = write_latency(app, writer_id, lambda: time.sleep(3))
+    print(f'Writer alone: {baseline}')
+
+    batches = []
+
+    def archive():
+        with app.app_context():
+            cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+            while True:
+                started = time.perf_counter()
+                moved = retention.archive_batch(cutoff, args.batch_size)
+                batches.append((moved, (time.perf_counter() - started) * 1000))
+                if moved < args.batch_size:
+                    return
+                time.sleep(app.config['NOTIFICATION_ARCHIVE_PAUSE_SECONDS'])
+
+    started = time.perf_counter()
+    during = write_latency(app, writer_id, archive)
+    elapsed = time.perf_counter() - started
+    archived = sum(moved for moved, _ in batches)
+    durations = sorted(ms for _, ms in batches)
+    print(f'Archived {archived} rows in {len(batches)} batches, {elapsed:.1f}s ({archived / elapsed:.0f} rows/s); '
+          f'batch p50 {statistics.median(durations):.1f} ms, max {durations[-1]:.1f} ms')
+    print(f'Writer during archiving: {during}')
+
+    with app.app_context():
+        live = db.session.scalar(db.select(func.count()).select_from(Notification))
+        unread_after = db.session.scalar(db.select(func.count()).select_from(Notification)
+                                         .filter_by(is_read=False).where(others))
+        if count_user(heavy) != heavy_total:
+            failures.append('the heavy student lost notifications')
+        if unread_after != unread_before:
+            failures.append('unread notifications were archived')
+    print(f'Live table: {live} rows')
+
+    ms, queries, _ = page_ms(client, '/notifications')
+    print(f'Notifications page after archiving: {ms:.1f} ms, {queries} queries')
+
+    # Walk the whole history, live and archived, newest first
+    seen, pages, url, page_times = [], 0, '/notifications', []
+    while url:
+        started = time.perf_counter()
+        body = client.get(url).data.decode()
+        page_times.append((time.perf_counter() - started) * 1000)
+        pages += 1
+        seen += [int(n) for n in re.findall(r'request #(\d+) was', body)]
+        older = re.search(r'href="(/notifications\?before=\d+)"', body)
+        url = older.group(1) if older else None
+    print(f'History: {pages} pages, {len(seen)} notifications, '
+          f'median {statistics.median(page_times):.1f} ms, max {max(page_times):.1f} ms per page')
+    if len(seen) != heavy_total or len(set(seen)) != len(seen) or seen != sorted(seen, reverse=True):
+        failures.append(f'history paging returned {len(seen)} notifications, expected {heavy_total} in order')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
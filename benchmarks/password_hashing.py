@@ -0,0 +1,87 @@
+# benchmarks/password_hashing.py
+"""Logins per second per core for each password hashing setting.
+
+For every PASSWORD_HASHER/PASSWORD_HASH_COST pair it builds an app, creates
+a user whose hash is from an older, cheaper setting, logs in once (which must
+transparently rehash the password to the configured setting), then drives
+POST /login in a single thread for `--seconds`. Since hash verification is
+CPU-bound, logins/s here is roughly what one gunicorn worker per core can do.
+
+Usage: python -m benchmarks.password_hashing [--seconds 3] [--settings scrypt:16384 bcrypt:12 ...]
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.common import make_app
+from extensions import db
+from models import User
+import passwords
+
+DEFAULT_SETTINGS = ('scrypt:16384', 'scrypt:32768', 'pbkdf2:600000', 'pbkdf2:1000000',
+                    'bcrypt:10', 'bcrypt:12', 'argon2:2', 'argon2:3')
+PASSWORD = 'correct horse'
+# What the user's hash starts as, so the first login has to upgrade it
+OLD_SETTING = ('pbkdf2', 1000)
+
+
+def login(client):
+    response = client.post('/login', data={'username': 'hasher', 'password': PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f'login failed: HTTP {response.status_code}')
+
+
+def measure(algorithm, cost, seconds):
+    """Returns (rehashed on first login, logins/s, verifications/s)."""
+    app = make_app(PASSWORD_HASHER=algorithm, PASSWORD_HASH_COST=cost)
+    with app.app_context():
+        db.create_all()
+        user = User(username='hasher', email='hasher@campus.edu', role='student',
+                    password_hash=passwords.make_hasher(*OLD_SETTING).hash(PASSWORD))
+        db.session.add(user)
+        db.session.commit()
+
+    login(app.test_client())
+    with app.app_context():
+        stored = db.session.scalar(db.select(User.password_hash).filter_by(username='hasher'))
+        rehashed = not passwords.needs_rehash(stored) and passwords.verify_password(stored, PASSWORD)
+
+    logins, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        login(app.test_client())
+        logins += 1
+    login_rate = logins / (time.perf_counter() - started)
+
+    checks, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        passwords.verify_password(stored, PASSWORD)
+        checks += 1
+    return rehashed, login_rate, checks / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help='Measuring time per setting.')
+    parser.add_argument('--settings', nargs='+', default=DEFAULT_SETTINGS, metavar='HASHER:COST')
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'setting':<18} {'rehashed':>8} {'logins/s':>9} {'verify/s':>9} {'ms/login':>9}")
+    for setting in args.settings:
+        algorithm, _, cost = setting.partition(':')
+        try:
+            rehashed, login_rate, verify_rate = measure(algorithm, int(cost or 0), args.seconds)
+        except RuntimeError as e:
+            print(f'{setting:<18} skipped: {e}')
+            continue
+        print(f"{setting:<18} {'yes' if rehashed else 'NO':>8} {login_rate:>9.1f} {verify_rate:>9.1f} {1000 / login_rate:>9.1f}")
+        if not rehashed:
+            failures.append(setting)
+
+    for setting in failures:
+        print(f'FAIL {setting}: the first login did not rehash the password')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
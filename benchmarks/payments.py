@@ -0,0 +1,226 @@
+# benchmarks/payments.py
+"""Checkout, webhooks and deferred ticket issuance, end to end.
+
+Seeds students and two approved events, one free and one paid, then:
+
+- RSVPs to the free event with tickets issued inline (TICKET_WORKERS=0, as
+  before) and in the background, and compares request latency;
+- registers every student for the paid event and starts a checkout through
+  the "Pay now" route; the fake provider pays most of them and declines a
+  few. Its webhooks are posted to /payments/webhook/fake from several
+  threads; some are dropped and some delivered twice at the same moment;
+- times the webhook requests, waits for the ticket workers, and runs the
+  bulk reconciliation that settles the checkouts whose webhook was lost.
+
+It checks that every paid registration ended up paid once, with one
+certificate and exactly one confirmation email; that declined ones are
+'failed'; that redeliveries and bad signatures change nothing; and that
+the analytics rollups match a full rebuild.
+
+Usage: python -m benchmarks.payments [--students 200]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_mail import email_dispatched
+from sqlalchemy import func
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import analytics
+import payments
+import tickets
+from extensions import db
+from models import Event, EventStats, Payment, PaymentWebhookEvent, Registration, User
+
+DECLINE_EVERY = 20    # every 20th checkout is declined
+DROP_EVERY = 10       # every 10th webhook never arrives
+DUPLICATE_EVERY = 7   # every 7th webhook arrives twice, concurrently
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def registration_rollups():
+    return db.session.execute(db.select(EventStats.event_id, EventStats.registrations, EventStats.paid_registrations)
+                              .order_by(EventStats.event_id)).all()
+
+
+def wait_for_tickets(expected, timeout=300):
+    """Waits until `expected` confirmations have been claimed; returns how long that took."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        db.session.rollback()
+        sent = db.session.scalar(db.select(func.count()).where(Registration.confirmation_sent_at.is_not(None)))
+        if sent >= expected:
+            return time.perf_counter() - started
+        time.sleep(0.05)
+    raise TimeoutError(f'only {sent} of {expected} tickets issued')
+
+
+def rsvp_latencies(app, student_ids, event_id):
+    client = app.test_client()
+    timings = []
+    for student_id in student_ids:
+        login_as(client, student_id)
+        started = time.perf_counter()
+        client.post(f'/rsvp/{event_id}')
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--rsvps', type=int, default=10, help='Free-event RSVPs per issuing mode.')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent webhook deliveries.')
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-payments-'), 'payments.db')
+    app = make_app('sqlite:///' + path, PAYMENT_PROVIDER='fake', TICKET_WORKERS=2)
+    logging.getLogger('xhtml2pdf').setLevel(logging.CRITICAL)  # complains about the template's CSS on every render
+    emails = Counter()
+    email_dispatched.connect(lambda app, message: emails.update(message.recipients), weak=False)
+    random.seed(7)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=args.students, events=2, halls=0, buses=0, hall_bookings=0, bus_bookings=0,
+                             registrations_per_event=0, notifications_per_user=0)
+        free, paid = db.session.scalars(db.select(Event).order_by(Event.id)).all()
+        free.status = paid.status = 'Approved'
+        free.price, paid.price = 0.0, 25.0
+        free.capacity = paid.capacity = None
+        db.session.commit()
+        free_id, paid_id = free.id, paid.id
+    student_ids = seeded['student_ids']
+    failures = []
+
+    # --- Free RSVPs: ticket on the request path vs enqueued ---
+    app.config['TICKET_WORKERS'] = 0
+    inline = rsvp_latencies(app, student_ids[:args.rsvps], free_id)
+    app.config['TICKET_WORKERS'] = 2
+    deferred = rsvp_latencies(app, student_ids[args.rsvps:2 * args.rsvps], free_id)
+    with app.app_context():
+        wait_for_tickets(2 * args.rsvps)
+    print(f'Free RSVP, median ms: {statistics.median(inline):.1f} with the ticket issued inline, '
+          f'{statistics.median(deferred):.1f} with it enqueued')
+
+    # --- Paid registrations and checkouts ---
+    client = app.test_client()
+    refs = []
+    for student_id in student_ids:
+        login_as(client, student_id)
+        client.post(f'/event/{paid_id}/register')
+        with app.app_context():
+            registration_id = db.session.scalar(db.select(Registration.id).filter_by(user_id=student_id, event_id=paid_id))
+        location = client.post(f'/payments/checkout/{registration_id}').headers['Location']
+        refs.append(location.rsplit('/', 1)[1])
+
+    provider = app.extensions['payment_provider']
+    deliveries, dropped = [], []
+    for i, ref in enumerate(refs):
+        webhook = provider.complete(ref, 'failed' if i % DECLINE_EVERY == 0 else 'paid')
+        if i % DROP_EVERY == 0:
+            dropped.append(ref)
+        else:
+            deliveries += [webhook] * (2 if i % DUPLICATE_EVERY == 0 else 1)
+    random.shuffle(deliveries)
+    expected_paid = sum(1 for i in range(len(refs)) if i % DECLINE_EVERY)
+    expected_failed = len(refs) - expected_paid
+
+    local = threading.local()
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def deliver(webhook):
+        webhook_client = getattr(local, 'client', None)
+        if webhook_client is None:
+            webhook_client = local.client = app.test_client()
+        body, signature = webhook
+        started = time.perf_counter()
+        response = webhook_client.post('/payments/webhook/fake', data=body,
+                                       headers={'X-Payment-Signature': signature, 'Content-Type': 'application/json'})
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            statuses[(response.status_code, response.get_json().get('processed'))] += 1
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        latencies = list(pool.map(deliver, deliveries))
+    webhook_wall = time.perf_counter() - started
+    forged = app.test_client().post('/payments/webhook/fake', data=deliveries[0][0],
+                                    headers={'X-Payment-Signature': '0' * 64}).status_code
+
+    with app.app_context():
+        delivered_paid = db.session.scalar(db.select(func.count(Registration.id)).filter_by(event_id=paid_id, payment_status='paid'))
+        ticket_wait = wait_for_tickets(2 * args.rsvps + delivered_paid)
+        started = time.perf_counter()
+        reconciled = payments.reconcile(older_than_minutes=0)
+        reconcile_ms = (time.perf_counter() - started) * 1000
+        wait_for_tickets(2 * args.rsvps + expected_paid)
+        swept = tickets.sweep(grace_seconds=0)
+
+        by_status = dict(db.session.execute(db.select(Registration.payment_status, func.count())
+                                            .filter_by(event_id=paid_id).group_by(Registration.payment_status)).all())
+        checkouts = dict(db.session.execute(db.select(Payment.status, func.count()).group_by(Payment.status)).all())
+        webhook_rows = db.session.scalar(db.select(func.count()).select_from(PaymentWebhookEvent))
+        issued = db.session.execute(
+            db.select(User.email, Registration.certificate_path)
+            .join(Registration, Registration.user_id == User.id)
+            .where(Registration.payment_status.in_(tickets.ISSUED_STATUSES))).all()
+        before = registration_rollups()
+        analytics.rebuild_rollups()
+        after = registration_rollups()
+
+    print(f'{len(refs)} checkouts: {len(deliveries)} webhook deliveries '
+          f'({len(deliveries) - len(set(deliveries))} duplicates), {len(dropped)} dropped')
+    print(f'Webhook request ms: p50 {percentile(latencies, 0.5):.1f}, p95 {percentile(latencies, 0.95):.1f}, '
+          f'p99 {percentile(latencies, 0.99):.1f}; {len(deliveries) / webhook_wall:.0f} deliveries/s '
+          f'on {args.threads} threads')
+    print(f'Responses: ' + ', '.join(f'HTTP {code} processed={processed}: {count}'
+                                     for (code, processed), count in sorted(statuses.items())))
+    print(f'Tickets for the delivered payments issued {ticket_wait:.1f}s after the last webhook')
+    print(f'Reconciliation settled {reconciled.payments} checkouts ({len(reconciled.paid)} paid, '
+          f'{len(reconciled.failed)} failed) in {reconcile_ms:.1f} ms; the sweep found {swept} left over')
+    print(f'Registrations: {by_status}; checkouts: {checkouts}')
+
+    if by_status != {'paid': expected_paid, 'failed': expected_failed}:
+        failures.append(f'expected {expected_paid} paid and {expected_failed} failed registrations, got {by_status}')
+    if checkouts != {'paid': expected_paid, 'failed': expected_failed}:
+        failures.append(f'checkouts left unsettled: {checkouts}')
+    if reconciled.payments != len(dropped):
+        failures.append(f'reconciliation settled {reconciled.payments} checkouts, {len(dropped)} webhooks were dropped')
+    if webhook_rows != len(set(deliveries)) or statuses[(200, True)] != len(set(deliveries)):
+        failures.append(f'{webhook_rows} webhook rows and {statuses[(200, True)]} processed deliveries '
+                        f'for {len(set(deliveries))} distinct webhooks')
+    if forged != 400:
+        failures.append(f'a forged signature got HTTP {forged}')
+    if swept:
+        failures.append(f'the sweep issued {swept} tickets the workers missed')
+    if len(issued) != expected_paid + 2 * args.rsvps or not all(path for _, path in issued):
+        failures.append('some issued registrations have no certificate')
+    if emails != Counter(email for email, _ in issued):
+        failures.append(f'confirmation emails: {sum(emails.values())} sent to {len(emails)} addresses '
+                        f'for {len(issued)} tickets')
+    if before != after:
+        failures.append(f'analytics rollups drifted: {before} vs rebuilt {after}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
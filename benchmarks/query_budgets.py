@@ -0,0 +1,106 @@
+# benchmarks/query_budgets.py
+"""Checks every GET route with a @query_budget against seeded data.
+
+Each route is requested at a small and a large data volume. A route fails if
+it exceeds its declared budget at either volume, or if its query count grows
+with the number of rows (an N+1 pattern), regardless of the budget.
+
+Usage: python -m benchmarks.query_budgets [--scale 10]
+"""
+import argparse
+import sys
+
+from benchmarks.common import make_app, login, api_login
+from benchmarks.seed import seed_campus
+from extensions import db
+from query_budget import budget_for, count_queries
+
+# (endpoint, user, url) -- url may use {event_id}
+ROUTES = [
+    ('auth.dashboard', 'student0', '/dashboard'),
+    ('auth.dashboard_summary', 'student0', '/dashboard.json'),
+    ('events.list_events', None, '/events'),
+    ('events.event_search', None, '/events/search?q=Event'),
+    ('calendar.public_feed', None, '/calendar/events.ics'),
+    ('events.event_details', 'student0', '/event/{event_id}'),
+    ('events.my_event_registrations', 'student0', '/my_event_registrations'),
+    ('events.dsa_dashboard', 'dsa', '/dsa/dashboard'),
+    ('events.vc_dashboard', 'vc', '/vc/dashboard'),
+    ('bookings.list_halls', 'student0', '/halls'),
+    ('bookings.list_buses', 'student0', '/buses'),
+    ('bookings.my_hall_bookings', 'student0', '/my_hall_bookings'),
+    ('bookings.my_bus_bookings', 'student0', '/my_bus_bookings'),
+    ('notifications.notifications', 'student0', '/notifications'),
+    ('admin.admin_dashboard', 'admin', '/admin/dashboard'),
+    ('admin.admin_manage_halls', 'admin', '/admin/halls'),
+    ('admin.admin_manage_buses', 'admin', '/admin/buses'),
+    ('admin.admin_manage_hall_bookings', 'admin', '/admin/hall_bookings'),
+    ('admin.admin_manage_bus_bookings', 'admin', '/admin/bus_bookings'),
+    ('api.list_events', None, '/api/v1/events?fields=id,name,date,registrations'),
+    ('api.event_details', None, '/api/v1/events/{event_id}'),
+    ('api.list_halls', None, '/api/v1/halls'),
+    ('api.list_buses', None, '/api/v1/buses'),
+    ('api.list_registrations', 'student0', '/api/v1/registrations'),
+    ('api.list_hall_bookings', 'student0', '/api/v1/bookings/halls'),
+    ('api.list_bus_bookings', 'admin', '/api/v1/bookings/buses?status=Pending'),
+    ('api.list_notifications', 'student0', '/api/v1/notifications'),
+    ('api.dashboard_summary', 'student0', '/api/v1/dashboard'),
+]
+
+
+def measure(scale):
+    # TESTING off so a broken view shows up as an HTTP 500 row instead of aborting the run
+    # and the dashboard cache off, so its queries are counted on every request
+    app = make_app(TESTING=False, DASHBOARD_CACHE_SECONDS=0)
+    counts, statuses = {}, {}
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=20 * scale, events=6 * scale, halls=2 * scale, buses=2 * scale,
+                             hall_bookings=30 * scale, bus_bookings=30 * scale,
+                             registrations_per_event=min(20, 10 * scale), notifications_per_user=scale)
+
+    # Requests run outside the seeding context so each one gets its own app context (and `g`)
+    clients = {}
+    for endpoint, user, url in ROUTES:
+        client = clients.get(user)
+        if client is None:
+            client = clients[user] = app.test_client()
+            if user:
+                login(client, user)
+                api_login(client, user)  # /api/v1 routes take the token, the others the session cookie
+        url = url.format(event_id=seeded['approved_event_ids'][0])
+        with count_queries() as counter:
+            response = client.get(url)
+        counts[endpoint] = counter.count
+        statuses[endpoint] = response.status_code
+    budgets = {endpoint: budget_for(app, endpoint) for endpoint, _, _ in ROUTES}
+    return counts, statuses, budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=10, help='Multiplier for the large data volume.')
+    args = parser.parse_args(argv)
+
+    small, small_status, budgets = measure(1)
+    large, large_status, _ = measure(args.scale)
+
+    failures = 0
+    print(f"{'endpoint':40} {'budget':>6} {'small':>6} {'large':>6}")
+    for endpoint, _, _ in ROUTES:
+        budget = budgets[endpoint]
+        problems = [f'HTTP {status}' for status in sorted({small_status[endpoint], large_status[endpoint]}) if status != 200]
+        if budget is None:
+            problems.append('no budget declared')
+        elif max(small[endpoint], large[endpoint]) > budget:
+            problems.append('over budget')
+        if large[endpoint] > small[endpoint]:
+            problems.append('grows with row count')
+        failures += bool(problems)
+        print(f"{endpoint:40} {budget if budget is not None else '-':>6} {small[endpoint]:>6} {large[endpoint]:>6}"
+              f"  {'FAIL: ' + ', '.join(problems) if problems else 'ok'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
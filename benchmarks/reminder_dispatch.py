@@ -0,0 +1,143 @@
+# benchmarks/reminder_dispatch.py
+"""How precisely reminders go out, with tens of thousands pending.
+
+Seeds many approved events with reminders pending over the next two months,
+starts the scheduler in this process (so it leads), then approves a batch
+of events through the VC route, each starting a little over an hour from
+now, so their 1-hour reminders fall due every half second. One of them is
+moved a few seconds later after approval. It reports:
+
+- the cost of the poll that loads soon-due reminders into the timer queue,
+  and how many of the pending reminders it queues;
+- how late each 1-hour reminder went out (sent_at - due_at);
+- that every attendee got each reminder once, the moved event's reminder
+  went out at its new time, and the overdue 24-hour reminders of these
+  late-approved events went out at once.
+
+Usage: python -m benchmarks.reminder_dispatch [--pending 20000] [--approvals 40]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask_mail import email_dispatched
+from sqlalchemy import func, insert
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import jobs
+import reminders
+from extensions import db
+from models import Event, EventReminder, Registration
+
+POLL_SECONDS = 2
+ATTENDEES = 3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pending', type=int, default=20_000, help='events with reminders pending later on')
+    parser.add_argument('--approvals', type=int, default=40)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-reminders-'), 'reminders.db')
+    app = make_app('sqlite:///' + path, TESTING=False, REMINDER_LEADS='24h,1h', REMINDER_POLL_SECONDS=POLL_SECONDS,
+                   SCHEDULER_LEASE_SECONDS=3)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=ATTENDEES, events=0, hall_bookings=0, bus_bookings=0, notifications_per_user=0)
+        now = datetime.now()
+        admin_id, vc_id = seeded['user_ids']['admin'], seeded['user_ids']['vc']
+        db.session.execute(insert(Event), [
+            dict(name=f'Later {i}', description='', date=now + timedelta(days=2 + i % 60, minutes=i % 1440),
+                 location='Main hall', price=0.0, created_by=admin_id, status='Approved') for i in range(args.pending)])
+        for minutes in (1440, 60):
+            db.session.execute(insert(EventReminder).from_select(
+                ['event_id', 'minutes_before', 'due_at'],
+                db.select(Event.id, minutes, func.datetime(Event.date, f'-{minutes} minutes'))))
+        pending_ids = []
+        for i in range(args.approvals):
+            event = Event(name=f'Soon {i}', description='', location='Main hall', price=0.0, created_by=admin_id,
+                          date=now, status='Pending VC Office Approval')
+            db.session.add(event)
+            db.session.flush()
+            pending_ids.append(event.id)
+            db.session.add_all(Registration(user_id=user_id, event_id=event.id, payment_status='N/A')
+                               for user_id in seeded['student_ids'])
+        db.session.commit()
+        pending = db.session.scalar(db.select(func.count()).select_from(EventReminder))
+
+    sent = Counter()
+    email_dispatched.connect(lambda app, message: sent.update([(message.subject, message.recipients[0])]), weak=False)
+
+    jobs.start(app)
+    while not jobs.is_leader():
+        time.sleep(0.05)
+    with app.app_context():
+        started = time.perf_counter()
+        queued = reminders.queue_due_reminders(app)
+        poll_ms = (time.perf_counter() - started) * 1000
+    print(f'{pending} reminders pending; the poll took {poll_ms:.2f} ms and queued {queued} due within '
+          f'{2 * POLL_SECONDS}s')
+
+    # Approve events starting just over an hour from now: their 1-hour reminders fall due every half second
+    client = login_as(app.test_client(), vc_id)
+    start = datetime.now() + timedelta(hours=1, seconds=3)
+    with app.app_context():
+        for i, event_id in enumerate(pending_ids):
+            db.session.execute(db.update(Event).filter_by(id=event_id)
+                               .values(date=start + timedelta(seconds=i / 2)))
+        db.session.commit()
+    for event_id in pending_ids:
+        client.post(f'/vc/approve_event/{event_id}')
+    moved_id = pending_ids[len(pending_ids) // 2]
+    with app.app_context():
+        moved = db.session.get(Event, moved_id)
+        moved.date += timedelta(seconds=5)
+        db.session.commit()
+        moved_due = moved.date - timedelta(hours=1)
+
+    time.sleep(3 + args.approvals / 2 + 5 + 2)
+
+    failures = []
+    with app.app_context():
+        rows = db.session.execute(db.select(EventReminder.event_id, EventReminder.minutes_before,
+                                            EventReminder.due_at, EventReminder.sent_at)
+                                  .where(EventReminder.event_id.in_(pending_ids))).all()
+        still_pending = db.session.scalar(db.select(func.count()).select_from(EventReminder)
+                                          .where(EventReminder.sent_at.is_(None)))
+    hour = [row for row in rows if row.minutes_before == 60]
+    lateness = sorted((row.sent_at - row.due_at).total_seconds() for row in hour if row.sent_at)
+    if lateness:
+        p99 = lateness[min(len(lateness) - 1, int(0.99 * len(lateness)))]
+        print(f'1-hour reminders: {len(lateness)}/{len(hour)} sent; lateness p50 {statistics.median(lateness) * 1000:.1f} ms, '
+              f'p99 {p99 * 1000:.1f} ms, max {lateness[-1] * 1000:.1f} ms')
+        if p99 > 1:
+            failures.append('1-hour reminders went out more than a second late')
+    if len(lateness) != len(hour):
+        failures.append(f'{len(hour) - len(lateness)} 1-hour reminders were not sent')
+    day = [row for row in rows if row.minutes_before == 1440]
+    if not all(row.sent_at for row in day):
+        failures.append('overdue 24-hour reminders of late-approved events were not sent')
+    moved_row = next(row for row in hour if row.event_id == moved_id)
+    if moved_row.due_at != moved_due or (moved_row.sent_at and moved_row.sent_at < moved_due):
+        failures.append('the moved event was reminded for its old time')
+    duplicates = [key for key, count in sent.items() if count > 2]  # 24-hour + 1-hour reminder
+    expected = 2 * ATTENDEES * len(pending_ids)
+    print(f'{sum(sent.values())} reminder emails to attendees (expected {expected}); '
+          f'{still_pending} reminders still pending for later events')
+    if duplicates or sum(sent.values()) != expected:
+        failures.append('attendees did not get exactly one email per reminder')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
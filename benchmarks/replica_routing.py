@@ -0,0 +1,148 @@
+# benchmarks/replica_routing.py
+"""Read-replica routing check with two local SQLite databases and simulated lag.
+
+A LaggedReplicator copies the primary onto the replica with the SQLite backup
+API every `lag` seconds, so the replica is always somewhat behind. The script
+checks that:
+
+* @use_replica pages are served by the replica when the user has not written,
+* right after a write the user's reads are pinned to the primary
+  (read-your-writes), even though the replica has not caught up,
+* once the pin expires reads go back to the replica.
+
+Usage: python -m benchmarks.replica_routing [--lag 0.5] [--cycles 30]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+from extensions import db
+from models import Event
+from replica import REPLICA_BIND
+
+
+class LaggedReplicator:
+    """Copies the primary SQLite file onto the replica every `lag` seconds."""
+
+    def __init__(self, primary_path, replica_path, lag):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.lag = lag
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sync(self):
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+
+    def _run(self):
+        while not self._stop.wait(self.lag):
+            self.sync()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class EngineTracker:
+    """Records which bind served each statement."""
+
+    def __init__(self, engines):
+        self.hits = []
+        for name, engine in engines.items():
+            event.listen(engine, 'before_cursor_execute', self._listener(name or 'primary'))
+
+    def _listener(self, name):
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.hits.append(name)
+        return record
+
+    def served_by(self, fn):
+        start = len(self.hits)
+        result = fn()
+        return result, set(self.hits[start:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lag', type=float, default=0.5, help='Replication interval in seconds.')
+    parser.add_argument('--sticky', type=float, default=1.0, help='REPLICA_STICKY_SECONDS.')
+    parser.add_argument('--cycles', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='campus-replica-')
+    primary_path, replica_path = os.path.join(workdir, 'primary.db'), os.path.join(workdir, 'replica.db')
+    app = make_app('sqlite:///' + primary_path, REPLICA_DATABASE_URL='sqlite:///' + replica_path,
+                   REPLICA_STICKY_SECONDS=args.sticky)
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines[REPLICA_BIND])
+        seeded = seed_campus(students=5, events=args.cycles + 1, halls=1, buses=1, hall_bookings=0, bus_bookings=0,
+                             registrations_per_event=0, notifications_per_user=0)
+        # Paid events: registering stays a pure DB write (no PDF/email)
+        db.session.execute(db.update(Event).values(status='Approved', price=10.0, capacity=None))
+        db.session.commit()
+        event_ids = seeded['event_ids']
+        tracker = EngineTracker(db.engines)
+
+    replicator = LaggedReplicator(primary_path, replica_path, args.lag)
+    replicator.sync()
+    client = login_as(app.test_client(), seeded['student_ids'][0])
+    failures = []
+
+    def check(label, condition):
+        print(f"{'ok  ' if condition else 'FAIL'} {label}")
+        if not condition:
+            failures.append(label)
+
+    # 1. A user with no recent writes reads from the replica
+    _, binds = tracker.served_by(lambda: client.get('/my_event_registrations'))
+    check('reads go to the replica when the user has not written', binds == {REPLICA_BIND})
+
+    # 2. Write with replication paused: the redirect target must still show it
+    client.post(f'/event/{event_ids[0]}/register')
+    response, binds = tracker.served_by(lambda: client.get('/my_event_registrations'))
+    check('read-your-writes: page after the write is served by the primary', binds == {'primary'})
+    check('read-your-writes: new registration is visible', b'Event 0<' in response.data)
+
+    # 3. After the pin expires, reads return to the (still stale) replica
+    time.sleep(args.sticky + 0.1)
+    response, binds = tracker.served_by(lambda: client.get('/my_event_registrations'))
+    check('reads return to the replica after REPLICA_STICKY_SECONDS', binds == {REPLICA_BIND})
+    check('replica is stale before replication catches up', b'Event 0<' not in response.data)
+    replicator.sync()
+    response = client.get('/my_event_registrations')
+    check('replica shows the registration after replication', b'Event 0<' in response.data)
+
+    # 4. Register/read cycles under continuous lag: no read may miss the user's own write
+    replicator.start()
+    stale = 0
+    for index in range(1, args.cycles + 1):
+        client.post(f'/event/{event_ids[index]}/register')
+        if f'Event {index}<'.encode() not in client.get('/my_event_registrations').data:
+            stale += 1
+    replicator.stop()
+    check(f'{args.cycles} register/read cycles with {args.lag}s lag: {stale} stale reads', stale == 0)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# benchmarks/scheduler_failover.py
+"""Scheduler leader election, failover and the reminder poll.
+
+Part 1 seeds many events and compares the reminder job's query before
+(scan approved, unsent events in a 24-hour date window) and after (read
+pending reminders due soon off the (sent_at, due_at) index).
+
+Part 2 starts several worker processes against one SQLite database, each
+running the scheduler with a short lease and a one-second reminder poll,
+while events become due for reminders every second. It kills the leader a
+few times and checks that:
+
+- at any moment jobs ran in one process only;
+- a new leader took over within the lease time;
+- every due event was reminded exactly once, despite the kills.
+
+Usage: python -m benchmarks.scheduler_failover [--events 100000] [--workers 3] [--kills 2]
+"""
+import argparse
+import logging
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_app
+from benchmarks.seed import seed_campus
+from extensions import db
+from models import Event, EventReminder, Registration, SchedulerLock
+
+LEASE_SECONDS = 2
+LEAD = timedelta(hours=24)
+
+
+def worker(database_uri, log_path):
+    import jobs
+    logging.basicConfig(filename=log_path, level=logging.INFO,
+                        format='%(created).3f %(process)d %(name)s %(message)s')
+    app = make_app(database_uri, TESTING=False, SCHEDULER_LEASE_SECONDS=LEASE_SECONDS, REMINDER_POLL_SECONDS=1,
+                   REMINDER_LEADS='24h')
+    jobs.start(app)
+    while True:
+        time.sleep(3600)
+
+
+def time_query(statement, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = db.session.execute(statement).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    plan = ' / '.join(row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + str(
+        statement.compile(db.engine, compile_kwargs={'literal_binds': True})))))
+    return statistics.median(timings), len(rows), plan
+
+
+def current_leader():
+    owner = db.session.scalar(db.select(SchedulerLock.owner).filter_by(name='scheduler'))
+    db.session.rollback()
+    return int(owner.split(':')[1]) if owner else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--kills', type=int, default=2)
+    parser.add_argument('--worker', nargs=2, metavar=('DATABASE_URI', 'LOG'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        return worker(*args.worker)
+
+    workdir = tempfile.mkdtemp(prefix='campus-scheduler-')
+    database_uri = 'sqlite:///' + os.path.join(workdir, 'scheduler.db')
+    app = make_app(database_uri, REMINDER_LEADS='24h')
+    run_seconds = (args.kills + 1) * 3 * LEASE_SECONDS + 4
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=50, events=0, hall_bookings=0, bus_bookings=0, notifications_per_user=0)
+        now = datetime.now()
+        # Past and far-future approved events, already reminded or not yet due
+        rows = [dict(name=f'Event {i}', description='', date=now + timedelta(days=(i % 730) - 365, minutes=i % 1440),
+                     location='Main hall', price=0.0, created_by=seeded['user_ids']['admin'], status='Approved',
+                     reminder_sent=i % 730 < 365) for i in range(args.events)]
+        db.session.execute(insert(Event), rows)
+        db.session.execute(insert(EventReminder).from_select(
+            ['event_id', 'minutes_before', 'due_at'],
+            db.select(Event.id, int(LEAD.total_seconds() // 60), db.func.datetime(Event.date, '-1 day'))
+            .where(Event.reminder_sent.is_(False), Event.date > now + LEAD)))
+        # One event becomes due every second while the workers run
+        due_ids = []
+        for second in range(run_seconds - 4):
+            event = Event(name=f'Due {second}', description='', date=now + LEAD + timedelta(seconds=second + 2),
+                          location='Main hall', price=0.0, created_by=seeded['user_ids']['admin'], status='Approved')
+            db.session.add(event)
+            db.session.flush()
+            due_ids.append(event.id)
+            db.session.add_all(Registration(user_id=user_id, event_id=event.id, payment_status='N/A')
+                               for user_id in seeded['student_ids'][:5])
+        db.session.commit()
+
+        later = now + timedelta(hours=12)
+        old = db.select(Event.id).filter(Event.status == 'Approved', Event.reminder_sent.is_(False),
+                                         Event.date >= later, Event.date <= later + LEAD)
+        new = db.select(EventReminder.due_at, EventReminder.id).where(EventReminder.sent_at.is_(None),
+                                                                      EventReminder.due_at < later + timedelta(minutes=2))
+        print(f'{args.events} events; due-reminder query 12 hours from now:')
+        for label, statement in (('date window scan', old), ('pending reminders', new)):
+            ms, count, plan = time_query(statement)
+            print(f'  {label:<18} {ms:7.2f} ms  {count:>5} rows  {plan}')
+
+    log_path = os.path.join(workdir, 'jobs.log')
+    workers = {}
+    for _ in range(args.workers):
+        process = subprocess.Popen([sys.executable, '-m', 'benchmarks.scheduler_failover',
+                                    '--worker', database_uri, log_path])
+        workers[process.pid] = process
+    failures, failovers = [], []
+    try:
+        with app.app_context():
+            started = time.time()
+            while current_leader() is None and time.time() - started < 30:
+                time.sleep(0.1)
+            print(f'\n{args.workers} workers, lease {LEASE_SECONDS}s; first leader after {time.time() - started:.1f}s')
+            for _ in range(args.kills):
+                time.sleep(2 * LEASE_SECONDS)
+                leader = current_leader()
+                workers.pop(leader).send_signal(signal.SIGKILL)
+                killed_at = time.time()
+                while current_leader() in (leader, None) and time.time() - killed_at < 5 * LEASE_SECONDS:
+                    time.sleep(0.05)
+                failovers.append(time.time() - killed_at)
+                print(f'Killed leader {leader}; process {current_leader()} took over after {failovers[-1]:.2f}s')
+            time.sleep(max(0.0, run_seconds - (time.time() - started)) + 3)
+            reminded = set(db.session.scalars(db.select(Event.id).where(Event.id.in_(due_ids),
+                                                                         Event.reminder_sent.is_(True))))
+    finally:
+        for process in workers.values():
+            process.kill()
+
+    with open(log_path) as f:
+        lines = f.read().splitlines()
+    runs = [(float(line.split()[0]), int(line.split()[1])) for line in lines if 'Job send_reminders finished' in line]
+    sent = [int(m.group(1)) for line in lines for m in [re.search(r'Sent reminders for event Due (\d+) ', line)] if m]
+    owners = [pid for _, pid in runs]
+    switches = sum(1 for a, b in zip(owners, owners[1:]) if a != b)
+    print(f'{len(runs)} reminder job runs in {len(set(owners))} processes, {switches} leader changes; '
+          f'{len(sent)} events reminded ({len(set(sent))} distinct) of {len(due_ids)} due')
+    if switches > args.kills:
+        failures.append(f'jobs alternated between processes {switches} times for {args.kills} kills')
+    if any(failover > LEASE_SECONDS * 1.5 + 0.5 for failover in failovers):
+        failures.append('failover took longer than the lease')
+    if len(sent) != len(set(sent)):
+        failures.append('an event was reminded twice')
+    if len(reminded) != len(due_ids):
+        failures.append(f'{len(due_ids) - len(reminded)} due events were never reminded')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
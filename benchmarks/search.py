@@ -0,0 +1,109 @@
+# benchmarks/search.py
+"""Full-text event search latency over a large seeded event table.
+
+Seeds `--events` events (100k by default) with Zipf-distributed text into a
+temporary SQLite file, then times search_events() for a mix of selective and
+broad queries, with and without a date range. Fails if the mean or p95 latency of any query exceeds
+`--budget-ms` (20 ms by default).
+
+Usage: python -m benchmarks.search [--events 100000] [--repeat 50] [--budget-ms 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app
+from benchmarks.seed import seed_campus, _bulk_insert
+from extensions import db
+from models import Event
+from search import search_events
+
+
+def make_vocabulary(rng, size=5000):
+    return [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def seed_events(count, creator_id, vocabulary, rng):
+    # Zipf-distributed words: a few terms appear in almost every event, most are rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    now = datetime.utcnow().replace(microsecond=0)
+    _bulk_insert(Event, [dict(
+        name=' '.join(rng.choices(vocabulary, weights, k=rng.randint(2, 5))).title(),
+        description=' '.join(rng.choices(vocabulary, weights, k=rng.randint(20, 80))),
+        location=f'Hall {i % 17}',
+        date=now + timedelta(days=rng.randint(-60, 180), hours=rng.randint(8, 18)),
+        price=0.0,
+        created_by=creator_id,
+        date_created=now,
+        status='Approved' if i % 2 else 'Pending DSA Approval',
+        reminder_sent=False,
+    ) for i in range(count)])
+    db.session.commit()
+
+
+def queries(vocabulary):
+    return (
+        ('most common word', vocabulary[0], None),
+        ('rare word', vocabulary[3000], None),
+        ('two mid-frequency words', f'{vocabulary[10]} {vocabulary[50]}', None),
+        ('partial word (prefix)', vocabulary[20][:3], None),
+        ('location', 'Hall 3', None),
+        ('common word + 30 day range', vocabulary[0], 30),
+        ('no match', 'quidditch', None),
+    )
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('SEARCH_BUDGET_MS', 20)))
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-search-'), 'search.db')
+    app = make_app('sqlite:///' + path)
+    failures = []
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seeded = seed_campus(students=1, events=0, halls=0, buses=0, hall_bookings=0, bus_bookings=0,
+                             registrations_per_event=0, notifications_per_user=0)
+        rng = random.Random(0)
+        vocabulary = make_vocabulary(rng)
+        seed_events(args.events, seeded['user_ids']['admin'], vocabulary, rng)
+        print(f'seeded {args.events} events (indexed by trigger) in {time.perf_counter() - started:.1f}s')
+
+        print(f"{'query':<30} {'hits':>5} {'mean ms':>8} {'p95 ms':>8}")
+        for label, query, days in queries(vocabulary):
+            date_from = datetime.utcnow() if days else None
+            date_to = date_from + timedelta(days=days) if days else None
+            search_events(query, date_from, date_to)  # warm the page cache
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                page = search_events(query, date_from, date_to)
+                timings.append((time.perf_counter() - started) * 1000)
+                db.session.rollback()
+            mean, p95 = statistics.mean(timings), percentile(timings, 95)
+            print(f'{label:<30} {len(page.items):>5} {mean:>8.2f} {p95:>8.2f}')
+            if max(mean, p95) > args.budget_ms:
+                failures.append(f'{label}: mean {mean:.2f} ms / p95 {p95:.2f} ms over {args.budget_ms} ms')
+
+    for failure in failures:
+        print('FAIL', failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
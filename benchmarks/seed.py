@@ -0,0 +1,124 @@
+# benchmarks/seed.py
+"""Synthetic campus data for benchmarks, inserted with bulk executemany calls."""
+import random
+from datetime import datetime, date, time, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+import analytics
+from extensions import db
+from models import User, Event, Registration, Hall, HallBooking, Bus, BusBooking, Notification
+
+PASSWORD = 'password123'
+STAFF = (('admin', 'admin'), ('dsa', 'dsa'), ('vc', 'vc_office'))
+
+EVENT_STATUSES = ('Approved', 'Approved', 'Approved', 'Pending DSA Approval', 'Pending VC Office Approval', 'DSA Rejected')
+BOOKING_STATUSES = ('Pending', 'Approved', 'Rejected')
+
+
+def _chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _bulk_insert(model, rows):
+    for chunk in _chunks(rows):
+        db.session.execute(insert(model), chunk)
+
+
+def seed_campus(students=200, events=50, halls=10, buses=10, hall_bookings=200, bus_bookings=200,
+                registrations_per_event=20, notifications_per_user=5, seed=0):
+    """Populates an empty database and returns a dict with the ids/usernames benchmarks need.
+
+    Every account shares PASSWORD; the hash is computed once so seeding large
+    volumes is not dominated by password hashing.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    password_hash = generate_password_hash(PASSWORD)
+
+    user_rows = [dict(username=username, email=f'{username}@campus.test', role=role, password_hash=password_hash)
+                 for username, role in STAFF]
+    user_rows += [dict(username=f'student{i}', email=f'student{i}@campus.test', role='student', password_hash=password_hash)
+                  for i in range(students)]
+    _bulk_insert(User, user_rows)
+    user_ids = dict(db.session.execute(db.select(User.username, User.id)).all())
+    admin_id, dsa_id, vc_id = user_ids['admin'], user_ids['dsa'], user_ids['vc']
+    student_ids = [user_ids[f'student{i}'] for i in range(students)]
+
+    event_rows = []
+    for i in range(events):
+        status = EVENT_STATUSES[i % len(EVENT_STATUSES)]
+        event_rows.append(dict(
+            name=f'Event {i}',
+            description=f'Description for event {i}.\n\n' + 'Lorem ipsum dolor sit amet. ' * rng.randint(5, 40),
+            date=now + timedelta(days=rng.randint(1, 120), hours=rng.randint(8, 18)),
+            location=f'Venue {i % 17}',
+            price=0.0 if i % 3 else float(rng.choice((5, 10, 20))),
+            capacity=rng.choice((None, 50, 100, 500)),
+            created_by=admin_id,
+            date_created=now,
+            status=status,
+            dsa_approver_id=dsa_id if status in ('Approved', 'Pending VC Office Approval', 'DSA Rejected') else None,
+            vc_approver_id=vc_id if status == 'Approved' else None,
+            reminder_sent=False,
+        ))
+    _bulk_insert(Event, event_rows)
+    event_ids = list(db.session.execute(db.select(Event.id).order_by(Event.id)).scalars())
+    approved_event_ids = list(db.session.execute(
+        db.select(Event.id).filter_by(status='Approved').order_by(Event.id)).scalars())
+
+    _bulk_insert(Hall, [dict(name=f'Hall {i}', capacity=rng.randint(50, 800), location_details=f'Block {i % 5}')
+                        for i in range(halls)])
+    _bulk_insert(Bus, [dict(identifier=f'BUS-{i:03d}', capacity=rng.choice((18, 30, 60)), driver_contact=f'080000000{i % 10}',
+                            route_details='Main gate - Town')
+                       for i in range(buses)])
+    hall_ids = list(db.session.execute(db.select(Hall.id)).scalars())
+    bus_ids = list(db.session.execute(db.select(Bus.id)).scalars())
+
+    registration_rows = []
+    for event_id in approved_event_ids:
+        for student_id in rng.sample(student_ids, min(registrations_per_event, len(student_ids))):
+            registration_rows.append(dict(user_id=student_id, event_id=event_id, registration_date=now,
+                                          ticket_id=f'T-{event_id}-{student_id}', payment_status='paid'))
+    _bulk_insert(Registration, registration_rows)
+
+    def booking_common(i):
+        status = BOOKING_STATUSES[i % len(BOOKING_STATUSES)]
+        processed = status != 'Pending'
+        return dict(
+            student_id=rng.choice(student_ids),
+            event_id=rng.choice(approved_event_ids) if approved_event_ids and i % 2 else None,
+            requested_date=date.today() + timedelta(days=rng.randint(1, 60)),
+            purpose=f'Booking purpose {i}',
+            status=status,
+            timestamp=now - timedelta(minutes=i),
+            processed_by_admin_id=admin_id if processed else None,
+            processed_timestamp=now if processed else None,
+            admin_remarks='Rejected by Admin' if status == 'Rejected' else None,
+        )
+
+    if hall_ids:
+        _bulk_insert(HallBooking, [dict(booking_common(i), hall_id=rng.choice(hall_ids), start_time=time(9), end_time=time(11))
+                                   for i in range(hall_bookings)])
+    if bus_ids:
+        _bulk_insert(BusBooking, [dict(booking_common(i), bus_id=rng.choice(bus_ids), pickup_time=time(7, 30),
+                                       pickup_location='Main gate', destination='Town', number_of_passengers=rng.randint(1, 18))
+                                  for i in range(bus_bookings)])
+
+    _bulk_insert(Notification, [dict(user_id=user_id, message=f'Notification {n} for user {user_id}', timestamp=now,
+                                     is_read=bool(n % 2), notification_type='event_status_update', related_id=None)
+                                for user_id in student_ids for n in range(notifications_per_user)])
+    db.session.commit()
+    # Bulk inserts bypass the ORM rollup hooks
+    analytics.rebuild_rollups()
+
+    return {
+        'user_ids': user_ids,
+        'student_ids': student_ids,
+        'event_ids': event_ids,
+        'approved_event_ids': approved_event_ids,
+        'hall_ids': hall_ids,
+        'bus_ids': bus_ids,
+    }
@@ -0,0 +1,295 @@
+# benchmarks/sse_connections.py
+"""Thousands of idle notification streams: connect cost, idle cost, fan-out and catch-up.
+
+Starts the app with PUSH_ENABLED in a child process (gevent's WSGI server
+by default, as with `gunicorn -k gevent`; --server threaded uses werkzeug's
+thread-per-connection server), seeds one student per connection, and opens
+one /notifications/stream per student from an asyncio client. It reports:
+
+- how long the streams take to open and get their first event;
+- server memory per open stream, and server CPU while all of them idle
+  (heartbeats only);
+- fan-out latency: one commit creates a notification for every student, and
+  the time until each stream delivers it is measured;
+- catch-up: some streams disconnect, a notification is created while they
+  are gone, and they reconnect with Last-Event-ID; each must receive it.
+
+Usage: python -m benchmarks.sse_connections [--connections 5000] [--idle 20] [--server gevent|threaded]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HEARTBEAT_SECONDS = 5
+TICKS = os.sysconf('SC_CLK_TCK')
+
+
+# --- Server (child process) ---
+
+def serve(database_uri, port, server):
+    if server == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    from benchmarks.common import make_app
+    from extensions import db
+    from models import Notification, User
+
+    app = make_app(database_uri, PUSH_ENABLED=True, PUSH_HEARTBEAT_SECONDS=HEARTBEAT_SECONDS)
+
+    def trigger(environ, start_response):
+        # Benchmark-only endpoint: one commit that notifies every student, like a broadcast
+        with app.app_context():
+            student_ids = db.session.scalars(db.select(User.id).filter_by(role='student')).all()
+            db.session.add_all(Notification(user_id=user_id, message=f'Broadcast {time.time()}',
+                                            notification_type='broadcast') for user_id in student_ids)
+            db.session.commit()
+        start_response('204 No Content', [])
+        return []
+
+    def dispatch(environ, start_response):
+        if environ['PATH_INFO'] == '/_bench/broadcast':
+            return trigger(environ, start_response)
+        return app(environ, start_response)
+
+    if server == 'gevent':
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(('127.0.0.1', port), dispatch, log=None, backlog=4096).serve_forever()
+    else:
+        from werkzeug.serving import make_server, WSGIRequestHandler
+        WSGIRequestHandler.log_request = lambda *args, **kwargs: None
+        httpd = make_server('127.0.0.1', port, dispatch, threaded=True)
+        httpd.request_queue_size = 4096
+        httpd.serve_forever()
+
+
+def process_usage(pid):
+    """(RSS in MiB, CPU seconds) of a process, from /proc."""
+    with open(f'/proc/{pid}/status') as f:
+        rss_kib = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return rss_kib / 1024, (int(fields[11]) + int(fields[12])) / TICKS
+
+
+# --- Clients ---
+
+class Stream:
+    """One EventSource-like client: records event ids, arrival times and heartbeats."""
+
+    def __init__(self, port, cookie):
+        self.port, self.cookie = port, cookie
+        self.last_id = None
+        self.events = []  # (name, id, arrival time)
+        self.heartbeats = 0
+        self.ready = asyncio.Event()
+        self._writer = self._task = None
+
+    async def open(self, last_event_id=None):
+        reader, self._writer = await asyncio.open_connection('127.0.0.1', self.port)
+        headers = f'Cookie: session={self.cookie}\r\nAccept: text/event-stream\r\n'
+        if last_event_id is not None:
+            headers += f'Last-Event-ID: {last_event_id}\r\n'
+        # HTTP/1.0, so the body is not chunked and ends when the connection closes
+        self._writer.write(f'GET /notifications/stream HTTP/1.0\r\nHost: localhost\r\n{headers}\r\n'.encode())
+        status = await reader.readline()
+        if b' 200 ' not in status:
+            raise RuntimeError(f'Stream refused: {status.decode().strip()}')
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        self._task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader):
+        name = event_id = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.rstrip(b'\r\n')
+            if line.startswith(b':'):
+                self.heartbeats += 1
+            elif line.startswith(b'id: '):
+                event_id = int(line[4:])
+            elif line.startswith(b'event: '):
+                name = line[7:].decode()
+            elif not line and name:
+                self.last_id = event_id
+                self.events.append((name, event_id, time.perf_counter()))
+                if name == 'ready':
+                    self.ready.set()
+                name = None
+
+    async def close(self):
+        self._writer.close()
+        self._task.cancel()
+
+
+async def open_streams(streams, concurrency):
+    """Opens the streams, `concurrency` at a time; returns each one's seconds until its first event."""
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(stream, last_event_id=None):
+        async with limit:
+            started = time.perf_counter()
+            await stream.open(last_event_id)
+            await stream.ready.wait()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(stream, stream.last_id) for stream in streams))
+    return latencies
+
+
+async def broadcast(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'POST /_bench/broadcast HTTP/1.0\r\nHost: localhost\r\nContent-Length: 0\r\n\r\n')
+    await reader.read()
+    writer.close()
+
+
+async def wait_for(condition, timeout):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    return condition()
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return 'n/a'
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+    return f'p50 {pick(0.50):.1f} ms, p95 {pick(0.95):.1f} ms, p99 {pick(0.99):.1f} ms, max {values[-1] * 1000:.1f} ms'
+
+
+async def run(args, port, server_pid, cookies):
+    failures = []
+    streams = [Stream(port, cookie) for cookie in cookies]
+
+    # One stream first, so imports and lazy setup are not counted per connection
+    await open_streams(streams[:1], 1)
+    base_rss, _ = process_usage(server_pid)
+
+    started = time.perf_counter()
+    latencies = await open_streams(streams[1:], args.concurrency)
+    elapsed = time.perf_counter() - started
+    rss, cpu_before = process_usage(server_pid)
+    print(f'Opened {len(streams)} streams in {elapsed:.2f}s ({(len(streams) - 1) / elapsed:.0f}/s); '
+          f'time to first event: {percentiles(latencies)}')
+    print(f'Server RSS: {base_rss:.1f} MiB -> {rss:.1f} MiB, '
+          f'{(rss - base_rss) * 1024 / max(1, len(streams) - 1):.1f} KiB per stream')
+
+    heartbeats_before = sum(stream.heartbeats for stream in streams)
+    await asyncio.sleep(args.idle)
+    _, cpu_after = process_usage(server_pid)
+    heartbeats = sum(stream.heartbeats for stream in streams) - heartbeats_before
+    print(f'Idle {args.idle:.0f}s: server CPU {cpu_after - cpu_before:.2f}s '
+          f'({(cpu_after - cpu_before) / args.idle * 100:.1f}% of a core), {heartbeats} heartbeats '
+          f'({heartbeats / len(streams) / args.idle * HEARTBEAT_SECONDS:.2f} per stream per {HEARTBEAT_SECONDS}s)')
+    if heartbeats < len(streams) * (args.idle // HEARTBEAT_SECONDS - 1):
+        failures.append('streams missed heartbeats while idle')
+
+    # Fan-out: one commit notifies every student
+    received = lambda: sum(1 for stream in streams if stream.events[-1][0] == 'notification')
+    sent_at = time.perf_counter()
+    await broadcast(port)
+    committed = time.perf_counter() - sent_at
+    await wait_for(lambda: received() == len(streams), 60)
+    delays = [stream.events[-1][2] - sent_at for stream in streams if stream.events[-1][0] == 'notification']
+    print(f'Fan-out to {len(streams)} streams (commit took {committed * 1000:.0f} ms): {percentiles(delays)}')
+    if len(delays) != len(streams):
+        failures.append(f'{len(streams) - len(delays)} streams never received the broadcast')
+
+    # Catch-up: streams that are disconnected during a broadcast get it on reconnect via Last-Event-ID
+    away = streams[:args.reconnects]
+    for stream in away:
+        await stream.close()
+    await asyncio.sleep(0.2)
+    await broadcast(port)
+    missed = {id(stream): stream.last_id for stream in away}
+    for stream in away:
+        stream.ready = asyncio.Event()
+    await open_streams(away, args.concurrency)
+    caught_up = lambda: all(stream.last_id > missed[id(stream)] for stream in away)
+    ok = await wait_for(caught_up, 30)
+    print(f'Reconnected {len(away)} streams with Last-Event-ID: '
+          f'{"all" if ok else "NOT all"} received the notification sent while they were away')
+    if not ok:
+        failures.append('reconnected streams did not catch up')
+
+    for stream in streams:
+        await stream.close()
+    return failures
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=5000)
+    parser.add_argument('--idle', type=float, default=20, help='seconds all streams stay idle')
+    parser.add_argument('--reconnects', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=200, help='streams being opened at once')
+    parser.add_argument('--server', choices=('gevent', 'threaded'), default='gevent')
+    parser.add_argument('--serve', nargs=2, metavar=('DATABASE_URI', 'PORT'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args.serve[0], int(args.serve[1]), args.server)
+
+    from benchmarks.common import make_app
+    from benchmarks.seed import seed_campus
+    from extensions import db
+
+    # Both ends hold one socket per stream
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < args.connections + 100:
+        print(f'Open file limit {hard} is too low for {args.connections} connections')
+        return 1
+
+    database_uri = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='campus-sse-'), 'sse.db')
+    app = make_app(database_uri)
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=args.connections, events=10, hall_bookings=0, bus_bookings=0,
+                             registrations_per_event=0, notifications_per_user=0)
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookies = [serializer.dumps({'_user_id': str(user_id), '_fresh': True}) for user_id in seeded['student_ids']]
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'benchmarks.sse_connections', '--server', args.server,
+                               '--serve', database_uri, str(port)])
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    print('Server did not start')
+                    return 1
+                time.sleep(0.1)
+        print(f'{args.server} server, {args.connections} streams, heartbeat every {HEARTBEAT_SECONDS}s')
+        failures = asyncio.run(run(args, port, server.pid, cookies))
+    finally:
+        server.terminate()
+        server.wait()
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
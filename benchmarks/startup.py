@@ -0,0 +1,74 @@
+# benchmarks/startup.py
+"""Cold-start import budget check.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter, reports
+the slowest imports and exits non-zero when the total import time exceeds the
+budget or when a lazily-loaded module (PDF/QR stack) is pulled in at startup.
+
+Usage: python -m benchmarks.startup [--budget-ms 1500] [--module app] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a ticket/certificate is rendered
+LAZY_MODULES = ('xhtml2pdf', 'reportlab', 'html5lib', 'pyhanko', 'qrcode', 'PIL')
+
+_line_re = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(module):
+    """Returns (total_us, [(cumulative_us, name), ...]) for one cold import of `module`."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    total = 0
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _line_re.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total += int(self_us)
+        entries.append((int(cumulative_us), name.strip()))
+    return total, entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 1500)))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    best_total, entries = min(runs, key=lambda r: r[0])
+    best_ms = best_total / 1000
+
+    print(f"import {args.module}: best of {args.runs} = {best_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for cumulative_us, name in sorted(entries, reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = sorted({name for _, name in entries if name.split('.')[0] in LAZY_MODULES})
+    if eager:
+        print(f"FAIL: lazily-loaded modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAIL: startup import time {best_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
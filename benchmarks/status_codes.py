@@ -0,0 +1,148 @@
+# benchmarks/status_codes.py
+"""Status columns as text vs small-integer codes.
+
+Seeds a large event table (a few hundred events pending each approval
+stage, the rest approved or rejected) and builds a twin of it, event_text,
+identical except that status holds the label as text, as before the
+migration to codes. It reports:
+
+- table and (status, date) index sizes for both, from SQLite's dbstat;
+- the dsa_dashboard and vc_dashboard queries against the text table
+  without an index (the previous schema), with the same index, and against
+  the coded table;
+- both dashboard pages end to end after the change.
+
+Usage: python -m benchmarks.status_codes [--events 200000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, String, func, insert
+from sqlalchemy.orm import aliased
+
+from benchmarks.common import make_app, login_as
+from benchmarks.seed import seed_campus
+import approvals
+from extensions import db
+from models import Event, User
+
+REJECTED = ('DSA Rejected', 'VC Rejected')
+
+
+def seed_events(count, admin_id):
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        if i % 1000 == 0:
+            status = approvals.PENDING_DSA
+        elif i % 1000 == 1:
+            status = approvals.PENDING_VC
+        else:
+            status = REJECTED[i % 2] if i % 10 == 0 else approvals.APPROVED
+        rows.append(dict(name=f'Event {i}', description='Seeded event', date=now + timedelta(hours=i % 8760 - 4380),
+                         location='Main hall', price=0.0, created_by=admin_id, status=status))
+        if len(rows) == 10_000:
+            db.session.execute(insert(Event), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Event), rows)
+    db.session.commit()
+
+
+def text_twin():
+    """Creates event_text: the event table with status stored as its label."""
+    ddl = db.session.scalar(db.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'event'"))
+    ddl = ddl.replace('CREATE TABLE event', 'CREATE TABLE event_text', 1).replace('status SMALLINT', 'status VARCHAR(50)', 1)
+    db.session.execute(db.text(ddl))
+    columns = [column.name for column in Event.__table__.columns]
+    select_list = ', '.join("(SELECT name FROM status_lookup WHERE domain = 'event' AND code = event.status)"
+                            if name == 'status' else name for name in columns)
+    db.session.execute(db.text(f"INSERT INTO event_text ({', '.join(columns)}) SELECT {select_list} FROM event"))
+    db.session.commit()
+    table = Event.__table__.to_metadata(MetaData(), name='event_text')
+    table.c.status.type = String(50)
+    return table
+
+
+def size_kib(name):
+    return db.session.scalar(db.text('SELECT SUM(pgsize) FROM dbstat WHERE name = :name'), {'name': name}) / 1024
+
+
+def dashboard_queries(table):
+    creator, dsa_approver = aliased(User), aliased(User)
+    dsa = (db.select(table, creator.username).outerjoin(creator, creator.id == table.c.created_by)
+           .where(table.c.status == approvals.PENDING_DSA).order_by(table.c.date))
+    vc = (db.select(table, creator.username, dsa_approver.username)
+          .outerjoin(creator, creator.id == table.c.created_by)
+          .outerjoin(dsa_approver, dsa_approver.id == table.c.dsa_approver_id)
+          .where(table.c.status == approvals.PENDING_VC).order_by(table.c.date))
+    return dsa, vc
+
+
+def time_ms(function, repeat=30):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='campus-statuses-'), 'statuses.db')
+    app = make_app('sqlite:///' + path)
+    failures = []
+    with app.app_context():
+        db.create_all()
+        seeded = seed_campus(students=20, events=0, hall_bookings=0, bus_bookings=0, notifications_per_user=0)
+        seed_events(args.events, seeded['user_ids']['admin'])
+        text = text_twin()
+        db.session.execute(db.text('VACUUM'))
+        db.session.execute(db.text('ANALYZE'))
+
+        coded_queries, text_queries = dashboard_queries(Event.__table__), dashboard_queries(text)
+        results = {}
+        results['text, no index'] = [time_ms(lambda q=q: db.session.execute(q).all()) for q in text_queries]
+        db.session.execute(db.text('CREATE INDEX ix_event_text_status_date ON event_text (status, date)'))
+        db.session.execute(db.text('ANALYZE'))
+        results['text, indexed'] = [time_ms(lambda q=q: db.session.execute(q).all()) for q in text_queries]
+        results['code, indexed'] = [time_ms(lambda q=q: db.session.execute(q).all()) for q in coded_queries]
+        counts = [len(db.session.execute(q).all()) for q in coded_queries]
+        if counts != [len(db.session.execute(q).all()) for q in text_queries]:
+            failures.append('the text and coded tables returned different rows')
+
+        print(f'{args.events} events, {counts[0]} pending DSA and {counts[1]} pending VC approval')
+        print(f'{"":<22}{"text":>10}{"code":>10}')
+        print(f'{"table (KiB)":<22}{size_kib("event_text"):>10.0f}{size_kib("event"):>10.0f}')
+        print(f'{"status index (KiB)":<22}{size_kib("ix_event_text_status_date"):>10.0f}'
+              f'{size_kib("ix_event_status_date"):>10.0f}')
+        print(f'\n{"query (median ms)":<22}{"dsa":>10}{"vc":>10}')
+        for label, (dsa_ms, vc_ms) in results.items():
+            print(f'{label:<22}{dsa_ms:>10.2f}{vc_ms:>10.2f}')
+        if size_kib('ix_event_status_date') >= size_kib('ix_event_text_status_date'):
+            failures.append('the coded index is not smaller')
+
+    print('\nPages after the change (median ms):')
+    for role, url in (('dsa', '/dsa/dashboard'), ('vc', '/vc/dashboard')):
+        client = login_as(app.test_client(), seeded['user_ids'][role])
+        status = client.get(url).status_code
+        print(f'  {url:<16} {time_ms(lambda: client.get(url), repeat=10):8.1f}  HTTP {status}')
+        if status != 200:
+            failures.append(f'{url} returned HTTP {status}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# calendar_feeds.py
+"""iCalendar (.ics) feeds of approved events and of each student's RSVPs and
+approved hall/bus bookings.
+
+Calendar apps poll feeds every few minutes, so a feed is built in layers:
+
+1. One query lists the feed's rows as (kind, id, version). The version is the
+   row's updated_at, plus the hall/bus name for bookings, so anything shown
+   in the VEVENT changes it. A hash of this list is the feed's ETag, and a
+   client that sends it back gets a 304.
+2. Each row's serialized VEVENT is cached under (kind, id) with its version.
+   Only rows that are new or whose version changed are loaded and serialized,
+   with one query per kind.
+3. The assembled feed body is cached by ETag, so clients that don't send
+   If-None-Match get the same bytes without reassembly.
+
+Caches are per process, bounded LRU dicts. Event VEVENTs are shared between
+the public feed and every RSVP feed.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import url_for
+from sqlalchemy import literal, union_all
+
+from extensions import db
+from models import Event, Registration, Hall, HallBooking, Bus, BusBooking
+
+PRODID = '-//Campus Event Manager//Calendar Feed//EN'
+UID_DOMAIN = 'campus-event-manager'
+# Events only store a start time
+EVENT_DURATION = timedelta(hours=2)
+BUS_TRIP_DURATION = timedelta(hours=1)
+# Feeds include items from this far back, so recent past items don't vanish from calendars at once
+HISTORY = timedelta(days=30)
+MAX_CACHED_VEVENTS = 50_000
+MAX_CACHED_FEEDS = 1_000
+
+
+class _LRU:
+    def __init__(self, max_size):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_size = max_size
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_vevents = _LRU(MAX_CACHED_VEVENTS)  # (kind, id) -> (version, VEVENT text)
+_feeds = _LRU(MAX_CACHED_FEEDS)      # etag -> feed body
+
+
+def clear_cache():
+    _vevents.clear()
+    _feeds.clear()
+
+
+# --- Serialization (RFC 5545) ---
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\n').replace('\r', '\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Folds a content line into 75-octet pieces without splitting a UTF-8 character."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    pieces, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(encoded[start:end].decode())
+        start, limit = end, 74  # continuation lines begin with a space
+    return '\r\n '.join(pieces)
+
+
+def _local(moment):
+    # Times are stored as naive campus-local times, so they are written as floating times
+    return moment.strftime('%Y%m%dT%H%M%S')
+
+
+def _utc(moment):
+    return moment.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _vevent(uid, stamp, start, end, summary, description, location, url=None):
+    lines = ['BEGIN:VEVENT',
+             f'UID:{uid}@{UID_DOMAIN}',
+             f'DTSTAMP:{_utc(stamp)}',
+             f'DTSTART:{_local(start)}',
+             f'DTEND:{_local(end)}',
+             f'SUMMARY:{_escape(summary)}',
+             f'DESCRIPTION:{_escape(description)}',
+             f'LOCATION:{_escape(location)}',
+             'STATUS:CONFIRMED']
+    if url:
+        lines.append(f'URL:{url}')
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+def _event_vevent(row):
+    description = row.description
+    if row.price:
+        description += f'\n\nTicket price: {row.price:.2f}'
+    return _vevent(f'event-{row.id}', row.updated_at, row.date, row.date + EVENT_DURATION, row.name, description,
+                   row.location, url_for('events.event_details', event_id=row.id, _external=True))
+
+
+def _hall_vevent(row):
+    return _vevent(f'hall-booking-{row.id}', row.updated_at, datetime.combine(row.requested_date, row.start_time),
+                   datetime.combine(row.requested_date, row.end_time), f'Hall booking: {row.hall_name}',
+                   row.purpose, row.hall_name)
+
+
+def _bus_vevent(row):
+    start = datetime.combine(row.requested_date, row.pickup_time)
+    description = f'{row.purpose}\n\nFrom {row.pickup_location} to {row.destination}'
+    if row.number_of_passengers:
+        description += f', {row.number_of_passengers} passengers'
+    return _vevent(f'bus-booking-{row.id}', row.updated_at, start, start + BUS_TRIP_DURATION,
+                   f'Bus {row.bus_identifier}: {row.destination}', description, row.pickup_location)
+
+
+# --- Queries ---
+
+def _event_rows(ids):
+    return db.session.execute(db.select(Event.id, Event.name, Event.description, Event.date, Event.location,
+                                        Event.price, Event.updated_at).where(Event.id.in_(ids)))
+
+
+def _hall_rows(ids):
+    return db.session.execute(db.select(HallBooking.id, HallBooking.requested_date, HallBooking.start_time,
+                                        HallBooking.end_time, HallBooking.purpose, HallBooking.updated_at,
+                                        Hall.name.label('hall_name'))
+                              .join(Hall, Hall.id == HallBooking.hall_id).where(HallBooking.id.in_(ids)))
+
+
+def _bus_rows(ids):
+    return db.session.execute(db.select(BusBooking.id, BusBooking.requested_date, BusBooking.pickup_time,
+                                        BusBooking.pickup_location, BusBooking.destination,
+                                        BusBooking.number_of_passengers, BusBooking.purpose, BusBooking.updated_at,
+                                        Bus.identifier.label('bus_identifier'))
+                              .join(Bus, Bus.id == BusBooking.bus_id).where(BusBooking.id.in_(ids)))
+
+
+KINDS = {
+    'event': (_event_rows, _event_vevent),
+    'hall': (_hall_rows, _hall_vevent),
+    'bus': (_bus_rows, _bus_vevent),
+}
+
+
+def _event_versions(since):
+    return (db.select(literal('event').label('kind'), Event.id.label('row_id'), Event.updated_at.label('updated_at'),
+                      literal('').label('name'))
+            .where(Event.status == 'Approved', Event.date >= since))
+
+
+def public_versions():
+    since = datetime.now() - HISTORY
+    return _event_versions(since).order_by(Event.date, Event.id)
+
+
+def user_versions(user_id):
+    since = datetime.now() - HISTORY
+    events = _event_versions(since).join(Registration, Registration.event_id == Event.id) \
+        .where(Registration.user_id == user_id)
+    halls = (db.select(literal('hall'), HallBooking.id, HallBooking.updated_at, Hall.name)
+             .join(Hall, Hall.id == HallBooking.hall_id)
+             .where(HallBooking.student_id == user_id, HallBooking.status == 'Approved',
+                    HallBooking.requested_date >= since.date()))
+    buses = (db.select(literal('bus'), BusBooking.id, BusBooking.updated_at, Bus.identifier)
+             .join(Bus, Bus.id == BusBooking.bus_id)
+             .where(BusBooking.student_id == user_id, BusBooking.status == 'Approved',
+                    BusBooking.requested_date >= since.date()))
+    return union_all(events, halls, buses).order_by('kind', 'row_id')
+
+
+# --- Feeds ---
+
+def feed_etag(name, versions):
+    digest = hashlib.sha1(name.encode())
+    for kind, row_id, updated_at, label in versions:
+        digest.update(f'{kind}:{row_id}:{updated_at.isoformat()}:{label}\n'.encode())
+    return digest.hexdigest()
+
+
+def build_feed(name, statement):
+    """Returns (etag, body) for the feed whose rows `statement` lists as (kind, id, updated_at, name)."""
+    versions = db.session.execute(statement).all()
+    etag = feed_etag(name, versions)
+    body = _feeds.get(etag)
+    if body is not None:
+        return etag, body
+
+    blocks, stale = {}, {kind: {} for kind in KINDS}
+    for kind, row_id, updated_at, label in versions:
+        version = (updated_at, label)
+        cached = _vevents.get((kind, row_id))
+        if cached is not None and cached[0] == version:
+            blocks[kind, row_id] = cached[1]
+        else:
+            stale[kind][row_id] = version
+    for kind, wanted in stale.items():
+        if not wanted:
+            continue
+        load, serialize = KINDS[kind]
+        for row in load(list(wanted)):
+            text = serialize(row)
+            blocks[kind, row.id] = text
+            _vevents.put((kind, row.id), (wanted[row.id], text))
+
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+              f'X-WR-CALNAME:{_escape(name)}']
+    parts = [''.join(_fold(line) + '\r\n' for line in header)]
+    parts += [blocks[kind, row_id] for kind, row_id, _, _ in versions if (kind, row_id) in blocks]
+    parts.append('END:VCALENDAR\r\n')
+    body = ''.join(parts)
+    _feeds.put(etag, body)
+    return etag, body
@@ -0,0 +1,270 @@
+# dashboard.py
+"""The per-user summary shown on the student dashboard and served as JSON.
+
+A summary holds the user's next few event registrations, how many upcoming
+events they are registered for, their pending and approved hall and bus
+bookings, and their unread notification count. It costs two statements:
+one UNION ALL of grouped counts over the four tables, and one select of the
+upcoming registrations joined to their events.
+
+Summaries are cached per user, per process, for DASHBOARD_CACHE_SECONDS
+(0 disables the cache). Session hooks note the users whose registrations,
+bookings or notifications a flush touched and drop their summaries when
+the transaction commits. Core bulk UPDATEs bypass the hooks; their callers
+call invalidate(). Edits to an event show up when the entry expires.
+
+Invalidations only reach the cache of the process that made the write,
+unless PUSH_BROKER_URL is set: then they are also published through Redis
+and every process drops the entry, so a user sees their own changes at once
+whichever worker serves the next request. A process that loses its Redis
+connection clears its whole cache on reconnecting, since it may have missed
+invalidations.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain
+
+from flask import current_app
+from sqlalchemy import event, func, literal, null, union_all
+
+from extensions import db
+from models import BusBooking, Event, HallBooking, Notification, Registration
+from replica import RoutingSession
+from statuses import StatusCode, BOOKING_STATUS
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_SUMMARIES = 10_000
+CHANNEL = 'campus:dashboard'
+BOOKING_STATUSES = ('Pending', 'Approved')
+
+UpcomingRegistration = namedtuple('UpcomingRegistration', 'registration_id event_id name date location payment_status')
+
+
+@dataclass
+class Summary:
+    upcoming: list = field(default_factory=list)  # the next DASHBOARD_UPCOMING_LIMIT, soonest first
+    upcoming_count: int = 0
+    hall_bookings: dict = field(default_factory=lambda: dict.fromkeys(BOOKING_STATUSES, 0))
+    bus_bookings: dict = field(default_factory=lambda: dict.fromkeys(BOOKING_STATUSES, 0))
+    unread_notifications: int = 0
+    generated_at: datetime = None
+
+    def as_dict(self):
+        return {
+            'upcoming': [dict(item._asdict(), date=item.date.isoformat()) for item in self.upcoming],
+            'upcoming_count': self.upcoming_count,
+            'hall_bookings': self.hall_bookings,
+            'bus_bookings': self.bus_bookings,
+            'unread_notifications': self.unread_notifications,
+            'generated_at': self.generated_at.isoformat(),
+        }
+
+
+# --- Queries ---
+
+def _counts(user_id, now):
+    """Yields (kind, status, count) rows for the user, from one statement."""
+    bookings = [
+        db.select(literal(kind).label('kind'), model.status.label('status'), func.count(model.id).label('count'))
+        .where(model.student_id == user_id, model.status.in_(BOOKING_STATUSES))
+        .group_by(model.status)
+        for kind, model in (('hall', HallBooking), ('bus', BusBooking))
+    ]
+    no_status = null().cast(StatusCode(BOOKING_STATUS))
+    upcoming = (db.select(literal('upcoming'), no_status, func.count(Registration.id))
+                .join(Event, Event.id == Registration.event_id)
+                .where(Registration.user_id == user_id, Event.date >= now))
+    unread = (db.select(literal('unread'), no_status, func.count(Notification.id))
+              .where(Notification.user_id == user_id, Notification.is_read.is_(False)))
+    return db.session.execute(union_all(*bookings, upcoming, unread))
+
+
+def build_summary(user_id, limit=None, now=None):
+    """Reads a user's summary from the database, bypassing the cache."""
+    now = now or datetime.now()
+    limit = limit or current_app.config['DASHBOARD_UPCOMING_LIMIT']
+    summary = Summary(generated_at=now)
+    for kind, status, count in _counts(user_id, now):
+        if kind == 'hall':
+            summary.hall_bookings[status] = count
+        elif kind == 'bus':
+            summary.bus_bookings[status] = count
+        elif kind == 'upcoming':
+            summary.upcoming_count = count
+        else:
+            summary.unread_notifications = count
+    if summary.upcoming_count:
+        rows = db.session.execute(
+            db.select(Registration.id, Event.id, Event.name, Event.date, Event.location, Registration.payment_status)
+            .join(Event, Event.id == Registration.event_id)
+            .where(Registration.user_id == user_id, Event.date >= now)
+            .order_by(Event.date, Event.id).limit(limit))
+        summary.upcoming = [UpcomingRegistration(*row) for row in rows]
+    return summary
+
+
+# --- Per-user cache ---
+
+class _SummaryCache:
+    """Bounded LRU of user id -> (expires, summary).
+
+    A summary computed while its user's data was being invalidated may
+    predate the write, so it is not stored.
+    """
+
+    def __init__(self, max_size):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self._computing = Counter()  # user id -> summaries being built
+        self._stale = set()          # users invalidated while a summary was being built
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return entry[1]
+
+    def begin(self, user_id):
+        with self._lock:
+            self._computing[user_id] += 1
+
+    def finish(self, user_id, summary, ttl):
+        with self._lock:
+            stale = user_id in self._stale
+            self._computing[user_id] -= 1
+            if not self._computing[user_id]:
+                del self._computing[user_id]
+                self._stale.discard(user_id)
+            if summary is None or stale:
+                return
+            self._items[user_id] = (time.monotonic() + ttl, summary)
+            self._items.move_to_end(user_id)
+            if len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._items.pop(user_id, None)
+                if user_id in self._computing:
+                    self._stale.add(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class _RedisRelay:
+    """Publishes invalidations through Redis and applies those of every process to the local cache."""
+
+    def __init__(self, url, cache):
+        import redis  # Only needed with PUSH_BROKER_URL; keep it optional
+        self._cache = cache
+        # Publishing happens on commit, so don't let a Redis outage stall requests
+        self._client = redis.Redis.from_url(url, socket_connect_timeout=0.2, socket_timeout=0.2)
+        self._subscriber = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name='dashboard-redis-listener', daemon=True)
+        self._listener.start()
+
+    def publish(self, user_ids):
+        try:
+            self._client.publish(CHANNEL, json.dumps(list(user_ids)))
+        except Exception:
+            logger.warning("Could not publish dashboard invalidations for users %s", user_ids, exc_info=True)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._subscriber.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                self._cache.clear()  # invalidations sent while disconnected are lost
+                for item in pubsub.listen():
+                    self._cache.invalidate(json.loads(item['data']))
+            except Exception:
+                logger.warning("Dashboard invalidation connection lost; reconnecting", exc_info=True)
+                time.sleep(1)
+
+
+_cache = _SummaryCache(MAX_CACHED_SUMMARIES)
+_relay = None
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def invalidate(*user_ids):
+    """Drops the cached summaries of these users; for writes the session hooks don't see."""
+    _invalidate(user_ids)
+
+
+def _invalidate(user_ids):
+    _cache.invalidate(user_ids)
+    if _relay is not None:
+        _relay.publish(user_ids)
+
+
+def get_summary(user_id):
+    """The user's summary, from the cache when it is fresh enough."""
+    ttl = current_app.config['DASHBOARD_CACHE_SECONDS']
+    if not ttl:
+        return build_summary(user_id)
+    summary = _cache.get(user_id)
+    if summary is not None:
+        return summary
+    _cache.begin(user_id)
+    summary = None
+    try:
+        summary = build_summary(user_id)
+    finally:
+        _cache.finish(user_id, summary, ttl)
+    return summary
+
+
+# --- Invalidation on commit ---
+
+def _owner(obj):
+    if isinstance(obj, (Registration, Notification)):
+        return obj.user_id
+    if isinstance(obj, (HallBooking, BusBooking)):
+        return obj.student_id
+    return None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_changed_users(db_session, flush_context):
+    users = {_owner(obj) for obj in chain(db_session.new, db_session.dirty, db_session.deleted)}
+    users.discard(None)
+    if users:
+        db_session.info.setdefault('_dashboard_stale', set()).update(users)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_changed_users(db_session):
+    users = db_session.info.pop('_dashboard_stale', None)
+    if users:
+        _invalidate(users)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_changed_users(db_session):
+    db_session.info.pop('_dashboard_stale', None)
+
+
+def init_app(app):
+    global _relay
+    url = app.config.get('PUSH_BROKER_URL')
+    if url and app.config['DASHBOARD_CACHE_SECONDS'] and _relay is None:
+        _relay = _RedisRelay(url, _cache)
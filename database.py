@@ -0,0 +1,49 @@
+# database.py
+"""Database URL and engine tuning for SQLite (development) and PostgreSQL (production)."""
+import os
+
+from sqlalchemy import event
+
+
+def normalize_database_url(url):
+    # Heroku/Render style URLs use the scheme SQLAlchemy 1.4+ no longer accepts
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Returns SQLALCHEMY_ENGINE_OPTIONS for the given database URL.
+
+    PostgreSQL gets a QueuePool sized from the environment. Remember that every
+    worker process has its own pool, so the server must allow
+    workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    """
+    if url.startswith('sqlite'):
+        # Seconds sqlite3 waits on a locked database before raising
+        return {'connect_args': {'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000}}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        # Recycle before typical server/proxy idle timeouts drop the connection
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a writer holds the lock; busy_timeout makes
+    # writers wait for the lock instead of failing with "database is locked"
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def init_app(app, db):
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _set_sqlite_pragmas)
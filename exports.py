@@ -0,0 +1,241 @@
+# exports.py
+"""Streaming CSV/XLSX exports of attendees and hall/bus bookings.
+
+Only the selected columns are queried (no ORM entities), rows are fetched in
+batches with yield_per and written out batch by batch, so memory stays flat
+however many rows are exported. XLSX goes through XlsxWriter's constant_memory
+mode into a temporary file, which is then streamed and deleted.
+"""
+import csv
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy.orm import aliased
+
+from extensions import db
+from models import User, Event, Registration, Hall, HallBooking, Bus, BusBooking
+
+BATCH_SIZE = 1000
+FILE_CHUNK_SIZE = 64 * 1024
+XLSX_MAX_ROWS = 1048576  # per worksheet, header row included
+# Spreadsheet apps run a text cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportTooLarge(ValueError):
+    pass
+
+
+@dataclass
+class Dataset:
+    title: str
+    base: object         # the model the rows come from
+    columns: dict        # key -> (header, column expression), in default order
+    date_column: object  # what the from/to filters apply to
+    order_by: object
+    joins: tuple = ()
+
+    def statement(self, keys, date_from=None, date_to=None):
+        stmt = db.select(*(self.columns[key][1] for key in keys)).select_from(self.base)
+        for target, onclause in self.joins:
+            stmt = stmt.join(target, onclause, isouter=True)
+        if date_from is not None:
+            stmt = stmt.where(self.date_column >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(self.date_column < date_to)
+        return stmt.order_by(self.order_by)
+
+
+def _datasets():
+    # Built on call so the aliases/relationships are ready, like the table loader options in routes/admin.py
+    requester = aliased(User, name='requester')
+    processor = aliased(User, name='processor')
+    booking_joins = lambda model: ((requester, requester.id == model.student_id),
+                                   (processor, processor.id == model.processed_by_admin_id),
+                                   (Event, Event.id == model.event_id))
+    return {
+        'attendees': Dataset(
+            title='Event attendees',
+            base=Registration,
+            columns={
+                'registration_id': ('Registration ID', Registration.id),
+                'event_id': ('Event ID', Registration.event_id),
+                'event': ('Event', Event.name),
+                'event_date': ('Event Date', Event.date),
+                'username': ('Username', User.username),
+                'email': ('Email', User.email),
+                'ticket_id': ('Ticket ID', Registration.ticket_id),
+                'registration_date': ('Registration Date', Registration.registration_date),
+                'payment_status': ('Payment Status', Registration.payment_status),
+                'certificate_generated_at': ('Certificate Generated', Registration.certificate_generated_at),
+            },
+            date_column=Registration.registration_date,
+            order_by=Registration.id,
+            joins=((User, User.id == Registration.user_id), (Event, Event.id == Registration.event_id)),
+        ),
+        'hall_bookings': Dataset(
+            title='Hall bookings',
+            base=HallBooking,
+            columns={
+                'booking_id': ('Booking ID', HallBooking.id),
+                'hall': ('Hall', Hall.name),
+                'requester': ('Requested By', requester.username),
+                'requester_email': ('Requester Email', requester.email),
+                'requested_date': ('Date', HallBooking.requested_date),
+                'start_time': ('Start', HallBooking.start_time),
+                'end_time': ('End', HallBooking.end_time),
+                'purpose': ('Purpose', HallBooking.purpose),
+                'event': ('Linked Event', Event.name),
+                'status': ('Status', HallBooking.status),
+                'requested_at': ('Requested At', HallBooking.timestamp),
+                'processed_by': ('Processed By', processor.username),
+                'processed_at': ('Processed At', HallBooking.processed_timestamp),
+                'remarks': ('Admin Remarks', HallBooking.admin_remarks),
+            },
+            date_column=HallBooking.requested_date,
+            order_by=HallBooking.id,
+            joins=((Hall, Hall.id == HallBooking.hall_id),) + booking_joins(HallBooking),
+        ),
+        'bus_bookings': Dataset(
+            title='Bus bookings',
+            base=BusBooking,
+            columns={
+                'booking_id': ('Booking ID', BusBooking.id),
+                'bus': ('Bus', Bus.identifier),
+                'requester': ('Requested By', requester.username),
+                'requester_email': ('Requester Email', requester.email),
+                'requested_date': ('Date', BusBooking.requested_date),
+                'pickup_time': ('Pickup Time', BusBooking.pickup_time),
+                'pickup_location': ('Pickup Location', BusBooking.pickup_location),
+                'destination': ('Destination', BusBooking.destination),
+                'passengers': ('Passengers', BusBooking.number_of_passengers),
+                'purpose': ('Purpose', BusBooking.purpose),
+                'event': ('Linked Event', Event.name),
+                'status': ('Status', BusBooking.status),
+                'requested_at': ('Requested At', BusBooking.timestamp),
+                'processed_by': ('Processed By', processor.username),
+                'processed_at': ('Processed At', BusBooking.processed_timestamp),
+                'remarks': ('Admin Remarks', BusBooking.admin_remarks),
+            },
+            date_column=BusBooking.requested_date,
+            order_by=BusBooking.id,
+            joins=((Bus, Bus.id == BusBooking.bus_id),) + booking_joins(BusBooking),
+        ),
+    }
+
+
+DATASET_NAMES = ('attendees', 'hall_bookings', 'bus_bookings')
+
+
+def get_dataset(name):
+    return _datasets().get(name)
+
+
+def parse_export_args(dataset, args):
+    """Validates `columns`, `from`, `to` (YYYY-MM-DD, inclusive) and `event_id`.
+
+    `columns` may be repeated (form checkboxes) or comma-separated. Returns
+    (keys, date_from, date_to, event_id); raises ValueError with a message for
+    the user.
+    """
+    requested = [key.strip() for value in args.getlist('columns') for key in value.split(',') if key.strip()]
+    unknown = [key for key in requested if key not in dataset.columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(dataset.columns)}")
+    keys = requested or list(dataset.columns)
+
+    def parse_date(name):
+        value = args.get(name, '').strip()
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format.")
+
+    date_from, date_to = parse_date('from'), parse_date('to')
+    if date_to is not None:
+        date_to += timedelta(days=1)  # 'to' is inclusive
+    if date_from is not None and date_to is not None and date_from >= date_to:
+        raise ValueError("'from' must not be after 'to'.")
+    if isinstance(dataset.date_column.type, db.Date):
+        date_from = date_from.date() if date_from else None
+        date_to = date_to.date() if date_to else None
+
+    event_id = args.get('event_id', type=int)
+    return keys, date_from, date_to, event_id
+
+
+def export_statement(dataset, keys, date_from=None, date_to=None, event_id=None):
+    stmt = dataset.statement(keys, date_from, date_to)
+    if event_id is not None:
+        stmt = stmt.where(Event.id == event_id)
+    return stmt.execution_options(yield_per=BATCH_SIZE)
+
+
+def _csv_value(value):
+    # User-entered text (usernames, purposes, remarks) must not open as a formula
+    return "'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+
+
+def stream_csv(header, result):
+    """Yields CSV text for `header` and the rows of `result`, one batch at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in result.partitions():
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _xlsx_value(value):
+    # Dates and times are written as text, matching the CSV, so no per-column cell formats are needed
+    return str(value) if isinstance(value, (datetime, date, time)) else value
+
+
+def write_xlsx(title, header, result):
+    """Writes the rows to a temporary .xlsx file with flat memory and returns its path.
+
+    Raises ExportTooLarge rather than returning a truncated file when the rows
+    don't fit on one worksheet.
+    """
+    import xlsxwriter  # Only needed for XLSX exports; keep it off the startup path
+
+    handle, path = tempfile.mkstemp(prefix='campus-export-', suffix='.xlsx')
+    os.close(handle)
+    # Text is always written as text: no formulas or links from user input
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_urls': False,
+                                          'strings_to_formulas': False})
+    try:
+        sheet = workbook.add_worksheet(title[:31])
+        sheet.write_row(0, 0, header, workbook.add_format({'bold': True}))
+        row_number = 1
+        for batch in result.partitions():
+            for row in batch:
+                if sheet.write_row(row_number, 0, [_xlsx_value(value) for value in row]) == -1:
+                    raise ExportTooLarge(f"More than {XLSX_MAX_ROWS - 1:,} rows do not fit in an XLSX file; "
+                                         f"export as CSV or narrow the date range.")
+                row_number += 1
+    except BaseException:
+        workbook.close()
+        os.remove(path)
+        raise
+    workbook.close()
+    return path
+
+
+def stream_file(path):
+    """Yields the file in chunks and deletes it afterwards."""
+    try:
+        with open(path, 'rb') as handle:
+            while chunk := handle.read(FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
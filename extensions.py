@@ -4,15 +4,19 @@ from flask_login import LoginManager
 from flask_wtf import CSRFProtect
 from flask_mail import Mail
 from flask_apscheduler import APScheduler
+from flask_jwt_extended import JWTManager
+
+from replica import RoutingSession
 
 # Create extension instances
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
 mail = Mail()
 scheduler = APScheduler()
+jwt = JWTManager()
 
 # Configure login behavior
-login_manager.login_view = 'login'
+login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
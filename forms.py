@@ -1,6 +1,7 @@
 # forms.py
 
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, TextAreaField, FloatField, IntegerField, SubmitField, DateTimeLocalField, PasswordField, SelectField, DateField, TimeField
 from wtforms.validators import DataRequired, Length, NumberRange, Optional, Email, EqualTo, ValidationError
 from datetime import datetime
@@ -32,17 +33,11 @@ class RegistrationForm(FlaskForm):
     )
     submit = SubmitField('Register')
 
-    def validate_username(self, username):
-        from app import User
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('That username is already taken. Please choose a different one.')
-
-    def validate_email(self, email):
-        from app import User
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('That email is already registered. Please use a different one or log in.')
+    # Shown by accounts.show_duplicate_errors; uniqueness is checked when the account is created
+    duplicate_messages = {
+        'username': 'That username is already taken. Please choose a different one.',
+        'email': 'That email is already registered. Please use a different one or log in.',
+    }
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -59,17 +54,10 @@ class CreateStaffForm(FlaskForm):
     ], validators=[DataRequired()])
     submit = SubmitField('Create Staff Account')
 
-    def validate_username(self, username):
-        from app import User
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('That username is already taken. Please choose a different one.')
-
-    def validate_email(self, email):
-        from app import User
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('That email is already registered. Please use a different one.')
+    duplicate_messages = {
+        'username': 'That username is already taken. Please choose a different one.',
+        'email': 'That email is already registered. Please use a different one.',
+    }
 
 class HallForm(FlaskForm):
     name = StringField('Hall Name', validators=[DataRequired()])
@@ -119,3 +107,13 @@ class BusBookingForm(FlaskForm):
         validators=[Optional()]
     )
     submit = SubmitField('Submit Booking Request')
+
+class ImportForm(FlaskForm):
+    kind = SelectField('Import', choices=[
+        ('users', 'Users'),
+        ('halls', 'Halls'),
+        ('buses', 'Buses'),
+        ('events', 'Events')
+    ], validators=[DataRequired()])
+    file = FileField('CSV File', validators=[FileRequired(), FileAllowed(['csv'], 'Please upload a .csv file.')])
+    submit = SubmitField('Import')
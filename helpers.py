@@ -0,0 +1,125 @@
+# helpers.py
+import os
+import re
+import base64
+import logging
+from io import BytesIO
+
+from flask import current_app, render_template
+from flask_mail import Message
+from jinja2 import pass_eval_context
+from markupsafe import Markup, escape
+
+from extensions import db, mail
+from instrumentation import timed
+from models import Notification
+
+logger = logging.getLogger(__name__)
+
+# NOTE: xhtml2pdf (reportlab, html5lib, pyHanko, ...) and qrcode/PIL are heavy
+# to import, so they are loaded inside the helpers that need them instead of at
+# module level. Only the requests that actually render a ticket pay for them.
+
+
+# Function to send confirmation email; returns False if it could not be sent
+def send_confirmation_email(user_email, event, registration):
+    msg = Message('Event Registration Confirmation', recipients=[user_email])
+    msg.body = f"""Hello {registration.user.username},
+
+Thank you for registering for the event: {event.name}!
+
+Event Details:
+Name: {event.name}
+Date: {event.date.strftime('%A, %B %d, %Y at %I:%M %p')}
+Location: {event.location}
+Price: {'Free' if event.price == 0 else f'${event.price:.2f}'}
+
+Your Registration Details:
+Registration Date: {registration.registration_date.strftime('%Y-%m-%d %H:%M')}
+Ticket ID: {registration.ticket_id if registration.ticket_id else 'N/A'}
+Payment Status: {registration.payment_status.upper()}
+
+Please keep this email for your records.
+
+We look forward to seeing you there!
+
+Best regards,
+The Campus Event Manager Team
+"""
+    try:
+        with timed('smtp'):
+            mail.send(msg)
+        logger.info("Confirmation email sent to %s for event %s.", user_email, event.name)
+        return True
+    except Exception as e:
+        logger.warning("Failed to send email to %s: %s", user_email, e)
+        return False
+
+# Helper function to create a notification (requires an active app context)
+def create_notification(user_id, message, notification_type=None, related_id=None):
+    notification = Notification(
+        user_id=user_id,
+        message=message,
+        notification_type=notification_type,
+        related_id=related_id
+    )
+    db.session.add(notification)
+    db.session.commit()
+    logger.info("Notification created for user %s: %s", user_id, message)
+
+# Helper function to generate QR code as base64
+def generate_qr_code_base64(data):
+    import qrcode
+
+    with timed('qr'):
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            box_size=10,
+            border=4,
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+        img = qr.make_image(fill_color="black", back_color="white")
+
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+# Helper function to generate PDF
+def generate_pdf_from_template(template_name, filename, context):
+    """Generates a PDF from a Jinja2 template."""
+    from xhtml2pdf import pisa
+
+    html = render_template(template_name, **context)
+    path = os.path.join(current_app.config['CERTIFICATES_FOLDER'], filename)
+    try:
+        with timed('pdf'), open(path, "wb") as pdf_file:
+            pisa_status = pisa.CreatePDF(
+                html,                # the HTML to convert
+                dest=pdf_file)       # file handle to receive result
+        if pisa_status.err:
+            logger.error("PDF generation error for %s: %s", filename, pisa_status.err)
+            return None
+        logger.info("PDF generated successfully: %s", path)
+        return path
+    except Exception:
+        logger.exception("Error generating PDF %s", filename)
+        return None
+
+
+# --- Custom Jinja Filter: nl2br ---
+_paragraph_re = re.compile(r'(?:\r\n|\r|\n){2,}')
+
+@pass_eval_context
+def nl2br(eval_ctx, value):
+    br = "<br>\n"
+    if eval_ctx.autoescape:
+        value = escape(value)
+        br = Markup(br)
+    result = "\n\n".join(
+        f"<p>{br.join(p.splitlines())}</p>"
+        for p in _paragraph_re.split(value)
+    )
+    return Markup(result) if eval_ctx.autoescape else result
+# --- End of Custom Filter ---
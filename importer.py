@@ -0,0 +1,352 @@
+# importer.py
+"""Bulk CSV import of users, halls, buses and events.
+
+The file is read and validated one row at a time and written in chunks of
+IMPORT_CHUNK_SIZE rows. For each chunk the rows that already exist are found
+with one query on the natural key (username, hall name, bus identifier,
+event name + date). New rows are inserted with a single executemany, and
+existing halls, buses and events are updated with a bulk UPDATE by primary
+key. Existing user accounts are never modified, so an import cannot reset a
+password or change someone's role. That makes re-running the same file a
+no-op.
+
+New users' passwords are hashed across a process pool, because password
+hashing dominates the cost of creating accounts. An invalid row is reported
+with its line number and skipped; if a chunk hits a database constraint, it
+is retried row by row so only the offending rows fail.
+"""
+import csv
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from email_validator import validate_email, EmailNotValidError
+from sqlalchemy import insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+import analytics
+import passwords
+from extensions import db
+from models import User, Hall, Bus, Event
+
+logger = logging.getLogger(__name__)
+
+IMPORT_ROLES = ('student', 'dsa', 'vc_office')
+EVENT_DATE_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S')
+# Below this many passwords the pool's startup costs more than it saves
+POOL_THRESHOLD = 32
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported (e.g. missing columns)."""
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list = field(default_factory=list)  # (line number, message)
+
+    @property
+    def processed(self):
+        return self.inserted + self.updated + self.unchanged + len(self.errors)
+
+
+# --- Row validation ---
+
+def _text(row, name, required=True, min_length=None, max_length=None):
+    value = (row.get(name) or '').strip()
+    if not value:
+        if required:
+            raise ValueError(f"'{name}' is required.")
+        return None
+    if min_length and len(value) < min_length:
+        raise ValueError(f"'{name}' must be at least {min_length} characters.")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"'{name}' must be at most {max_length} characters.")
+    return value
+
+
+def _number(row, name, kind=int, required=True, minimum=None):
+    value = (row.get(name) or '').strip()
+    if not value:
+        if required:
+            raise ValueError(f"'{name}' is required.")
+        return None
+    try:
+        number = kind(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number, got '{value}'.")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"'{name}' must be at least {minimum}.")
+    return number
+
+
+def _validate_user(row):
+    email = _text(row, 'email', max_length=120)
+    try:
+        email = validate_email(email, check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(f"Invalid email '{email}': {e}")
+    role = (_text(row, 'role', required=False) or 'student').lower()
+    if role not in IMPORT_ROLES:
+        raise ValueError(f"'role' must be one of {', '.join(IMPORT_ROLES)}.")
+    password = (row.get('password') or '').strip() or None
+    if password is not None and len(password) < 6:
+        raise ValueError("'password' must be at least 6 characters.")
+    return {
+        'username': _text(row, 'username', min_length=2, max_length=25),
+        'email': email,
+        'role': role,
+        'password': password,
+    }
+
+
+def _validate_hall(row):
+    return {
+        'name': _text(row, 'name', max_length=100),
+        'capacity': _number(row, 'capacity', minimum=1),
+        'location_details': _text(row, 'location_details', required=False),
+    }
+
+
+def _validate_bus(row):
+    return {
+        'identifier': _text(row, 'identifier', max_length=100),
+        'capacity': _number(row, 'capacity', minimum=1),
+        'driver_contact': _text(row, 'driver_contact', required=False, max_length=100),
+        'route_details': _text(row, 'route_details', required=False, max_length=500),
+    }
+
+
+def _validate_event(row):
+    raw_date = _text(row, 'date')
+    for date_format in EVENT_DATE_FORMATS:
+        try:
+            date = datetime.strptime(raw_date, date_format)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"'date' must look like 2025-09-01 14:00, got '{raw_date}'.")
+    return {
+        'name': _text(row, 'name', min_length=2, max_length=100),
+        'description': _text(row, 'description'),
+        'date': date,
+        'location': _text(row, 'location', min_length=2, max_length=100),
+        'price': _number(row, 'price', kind=float, required=False, minimum=0) or 0.0,
+        'capacity': _number(row, 'capacity', required=False, minimum=1),
+    }
+
+
+@dataclass
+class ImportSpec:
+    model: type
+    key: tuple            # natural key columns used to find existing rows
+    required: tuple       # CSV columns that must be present in the header
+    optional: tuple       # other CSV columns that are read if present
+    validate: object
+    update_fields: tuple  # columns overwritten on existing rows (empty: leave them alone)
+    also_unique: tuple = ()  # other unique columns, checked for duplicates within the file
+
+
+SPECS = {
+    'users': ImportSpec(User, ('username',), ('username', 'email'), ('password', 'role'), _validate_user, (),
+                        also_unique=('email',)),
+    'halls': ImportSpec(Hall, ('name',), ('name', 'capacity'), ('location_details',), _validate_hall,
+                        ('capacity', 'location_details')),
+    'buses': ImportSpec(Bus, ('identifier',), ('identifier', 'capacity'), ('driver_contact', 'route_details'),
+                        _validate_bus, ('capacity', 'driver_contact', 'route_details')),
+    'events': ImportSpec(Event, ('name', 'date'), ('name', 'description', 'date', 'location'), ('price', 'capacity'),
+                         _validate_event, ('description', 'location', 'price', 'capacity')),
+}
+
+
+# --- Password hashing ---
+
+def hash_passwords(plain, hasher, pool=None):
+    """Hashes `plain` in order, across `pool` (a ProcessPoolExecutor) for larger batches."""
+    if pool is None or len(plain) < POOL_THRESHOLD:
+        return [hasher.hash(password) for password in plain]
+    return list(pool.map(hasher.hash, plain, chunksize=8))
+
+
+# --- Chunk writing ---
+
+def _key(spec, row):
+    return tuple(row[column] for column in spec.key)
+
+
+def _existing_rows(spec, rows):
+    """Returns {natural key: (id, current values of update_fields)} for the rows already in the database."""
+    columns = [getattr(spec.model, column) for column in spec.key]
+    keys = [_key(spec, row) for _, row in rows]
+    condition = columns[0].in_([key[0] for key in keys]) if len(columns) == 1 else tuple_(*columns).in_(keys)
+    found = db.session.execute(db.select(spec.model.id, *columns, *(getattr(spec.model, column) for column in spec.update_fields))
+                               .where(condition))
+    width = len(columns)
+    return {tuple(found_row[1:width + 1]): (found_row[0], tuple(found_row[width + 1:])) for found_row in found}
+
+
+def _prepare_users(rows, result, pool):
+    """Drops rows whose email belongs to another account and hashes the new users' passwords."""
+    emails = [row['email'] for _, row in rows]
+    taken = dict(db.session.execute(db.select(User.email, User.username).where(User.email.in_(emails))).all())
+    kept = []
+    for line, row in rows:
+        owner = taken.get(row['email'])
+        if owner is not None and owner != row['username']:
+            result.errors.append((line, f"Email {row['email']} is already used by '{owner}'."))
+        elif row['password'] is None:
+            result.errors.append((line, "'password' is required for new users."))
+        else:
+            kept.append((line, row))
+    hashes = hash_passwords([row.pop('password') for _, row in kept], passwords.current_hasher(), pool)
+    for (_, row), password_hash in zip(kept, hashes):
+        row['password_hash'] = password_hash
+        row['image_file'] = 'default.jpg'
+    return kept
+
+
+def _write_chunk(spec, rows, result, extra_values, pool):
+    existing = _existing_rows(spec, rows)
+    new_rows = [(line, row) for line, row in rows if _key(spec, row) not in existing]
+    updates = []
+    for line, row in rows:
+        if _key(spec, row) not in existing:
+            continue
+        object_id, current = existing[_key(spec, row)]
+        values = tuple(row[column] for column in spec.update_fields)
+        if values == current:
+            result.unchanged += 1
+        else:
+            updates.append({'id': object_id, **dict(zip(spec.update_fields, values))})
+    if spec.model is User:
+        new_rows = _prepare_users(new_rows, result, pool)
+
+    values = [dict(row, **extra_values) for _, row in new_rows]
+    try:
+        with db.session.begin_nested():
+            if values:
+                db.session.execute(insert(spec.model), values)
+                # Core inserts bypass the ORM hooks that maintain the analytics rollups
+                analytics.record_bulk_insert(db.session.connection(), spec.model, values)
+            if updates:
+                db.session.execute(update(spec.model), updates)
+    except IntegrityError:
+        # e.g. a concurrent import created the same row: find the offending rows one by one
+        for (line, row), row_values in zip(new_rows, values):
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(spec.model), [row_values])
+                    analytics.record_bulk_insert(db.session.connection(), spec.model, [row_values])
+                result.inserted += 1
+            except IntegrityError as e:
+                result.errors.append((line, f'Rejected by the database: {e.orig}'))
+        if updates:
+            with db.session.begin_nested():
+                db.session.execute(update(spec.model), updates)
+            result.updated += len(updates)
+    else:
+        result.inserted += len(values)
+        result.updated += len(updates)
+    db.session.commit()
+
+
+def _rows(reader):
+    try:
+        yield from reader
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFileError(f"Could not read the file after line {reader.line_num} "
+                              f"(rows before it were imported): {e}")
+
+
+def import_csv(kind, text_stream, chunk_size=1000, extra_values=None, hash_workers=None):
+    """Imports the CSV in `text_stream` as `kind` and returns an ImportResult.
+
+    `extra_values` are added to every inserted row (e.g. created_by for events).
+    User imports hash passwords in `hash_workers` processes (default: one per
+    CPU; 1 hashes in this process). Raises ImportFileError if the header lacks
+    a required column.
+    """
+    spec = SPECS[kind]
+    reader = csv.DictReader(text_stream)
+    header = [name.strip() for name in reader.fieldnames or []]
+    missing = [column for column in spec.required if column not in header]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}. Expected at least: {', '.join(spec.required)}.")
+    reader.fieldnames = header
+
+    result = ImportResult(kind)
+    seen = {}  # (column(s), value) -> first line, to reject duplicates within the file
+    chunk = []
+    pool = ProcessPoolExecutor(hash_workers) if spec.model is User and hash_workers != 1 else None
+    try:
+        for row in _rows(reader):
+            line = reader.line_num
+            try:
+                clean = spec.validate(row)
+            except ValueError as e:
+                result.errors.append((line, str(e)))
+                continue
+            keys = [(spec.key, _key(spec, clean))] + [(column, clean[column]) for column in spec.also_unique]
+            duplicate_of = next((seen[key] for key in keys if key in seen), None)
+            if duplicate_of is not None:
+                result.errors.append((line, f'Duplicate of line {duplicate_of}.'))
+                continue
+            seen.update((key, line) for key in keys)
+            chunk.append((line, clean))
+            if len(chunk) >= chunk_size:
+                _write_chunk(spec, chunk, result, extra_values or {}, pool)
+                chunk = []
+        if chunk:
+            _write_chunk(spec, chunk, result, extra_values or {}, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    logger.info("Imported %s: %d inserted, %d updated, %d unchanged, %d errors",
+                kind, result.inserted, result.updated, result.unchanged, len(result.errors))
+    return result
+
+
+def event_defaults(creator_id):
+    # Imported events go through the same DSA/VC approval as events created in the form
+    return {'created_by': creator_id, 'date_created': datetime.utcnow(),
+            'status': 'Pending DSA Approval', 'reminder_sent': False}
+
+
+def open_upload(file_storage):
+    """Text stream over an uploaded file (BOM-tolerant, as Excel writes it)."""
+    return io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+
+
+def init_app(app):
+    import click
+
+    @app.cli.command('import-csv')
+    @click.argument('kind', type=click.Choice(sorted(SPECS)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--created-by', default='admin', help='Username recorded as the creator of imported events.')
+    @click.option('--workers', type=int, default=None, help='Password hashing processes (default: CPU count).')
+    def import_csv_command(kind, path, created_by, workers):
+        """Import users, halls, buses or events from a CSV file."""
+        extra_values = {}
+        if kind == 'events':
+            creator = User.query.filter_by(username=created_by).first()
+            if creator is None:
+                raise click.ClickException(f"No user named '{created_by}'.")
+            extra_values = event_defaults(creator.id)
+        with open(path, encoding='utf-8-sig', newline='') as handle:
+            try:
+                result = import_csv(kind, handle, chunk_size=app.config['IMPORT_CHUNK_SIZE'],
+                                    extra_values=extra_values, hash_workers=workers or app.config['IMPORT_HASH_WORKERS'])
+            except ImportFileError as e:
+                raise click.ClickException(str(e))
+        print(f"{result.inserted} inserted, {result.updated} updated, {result.unchanged} unchanged, "
+              f"{len(result.errors)} errors")
+        for line, message in result.errors:
+            print(f"  line {line}: {message}")
@@ -0,0 +1,372 @@
+# instrumentation.py
+"""Request timing, SQL/template/render breakdowns and a Prometheus text registry.
+
+Each process records into its own registry. With several gunicorn workers a
+scrape reaches one of them at random, and Prometheus would read the jumps
+between their counters as resets, so set METRICS_DIR: every process then
+writes a snapshot of its registry there every METRICS_FLUSH_SECONDS, and
+`/metrics` serves the sum of all the snapshots. Snapshots of exited workers
+are kept so totals never go down; empty the directory when deploying, as
+with prometheus_client's multiprocess mode.
+"""
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Sections tracked per request; each one is also exported as its own histogram
+SECTIONS = ('sql', 'template', 'pdf', 'qr', 'smtp')
+
+
+# --- Metrics registry ---
+class Metrics:
+    """Minimal thread-safe counter/histogram registry rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = defaultdict(float)
+        self._buckets = {}
+        self._histograms = {}
+
+    def _declare(self, name, kind, help_text):
+        if name not in self._types:
+            self._types[name] = kind
+            self._help[name] = help_text
+
+    def inc(self, name, value=1, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, 'counter', help_text)
+            self._counters[key] += value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, 'histogram', help_text)
+            self._buckets.setdefault(name, buckets)
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            counts, _, _ = state
+            counts[bisect_left(self._buckets[name], value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def reset(self):
+        with self._lock:
+            for store in (self._help, self._types, self._counters, self._buckets, self._histograms):
+                store.clear()
+
+    def snapshot(self):
+        """The registry as JSON-serializable data, for merge()."""
+        with self._lock:
+            return {
+                'help': dict(self._help),
+                'types': dict(self._types),
+                'buckets': {name: list(buckets) for name, buckets in self._buckets.items()},
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(counts), total, count]
+                               for (name, labels), (counts, total, count) in self._histograms.items()],
+            }
+
+    def merge(self, snapshot):
+        """Adds another registry's snapshot() to this one."""
+        def key(name, labels):
+            return name, tuple(tuple(pair) for pair in labels)
+
+        with self._lock:
+            for name, kind in snapshot['types'].items():
+                self._declare(name, kind, snapshot['help'].get(name, ''))
+            for name, buckets in snapshot['buckets'].items():
+                self._buckets.setdefault(name, tuple(buckets))
+            for name, labels, value in snapshot['counters']:
+                self._counters[key(name, labels)] += value
+            for name, labels, counts, total, count in snapshot['histograms']:
+                state = self._histograms.setdefault(key(name, labels), [[0] * len(counts), 0.0, 0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+    def render(self):
+        """Returns the registry in Prometheus text exposition format (version 0.0.4)."""
+        def fmt_labels(pairs):
+            if not pairs:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = []
+        with self._lock:
+            for name in sorted(self._types):
+                lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} {self._types[name]}')
+                if self._types[name] == 'counter':
+                    for (metric, labels), value in sorted(self._counters.items()):
+                        if metric == name:
+                            lines.append(f'{name}{fmt_labels(labels)} {value:g}')
+                    continue
+                buckets = self._buckets[name]
+                for (metric, labels), (counts, total, count) in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{fmt_labels(labels + (("le", f"{bound:g}"),))} {cumulative}')
+                    lines.append(f'{name}_bucket{fmt_labels(labels + (("le", "+Inf"),))} {count}')
+                    lines.append(f'{name}_sum{fmt_labels(labels)} {total:g}')
+                    lines.append(f'{name}_count{fmt_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class SharedMetrics:
+    """Sums the registries of every process through snapshot files in a shared directory."""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # the flush thread and a scrape share the temp file
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def write(self):
+        path = self._path(os.getpid())
+        with self._write_lock:
+            with open(path + '.tmp', 'w') as handle:
+                json.dump(metrics.snapshot(), handle)
+            os.replace(path + '.tmp', path)
+
+    def ensure_flushing(self):
+        """Starts this process's flush thread; called per request, since workers are forked after startup."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._flush, name='metrics-flush', daemon=True).start()
+
+    def _flush(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except OSError:
+                logger.warning("Could not write metrics snapshot to %s", self.directory, exc_info=True)
+
+    def render(self):
+        self.write()  # this process's own figures are always current
+        total = Metrics()
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as handle:
+                    total.merge(json.load(handle))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable metrics snapshot %s", path, exc_info=True)
+        return total.render()
+
+
+_shared = None
+
+
+def render_metrics():
+    """Prometheus text for /metrics: every process's figures with METRICS_DIR, else this process's."""
+    return _shared.render() if _shared is not None else metrics.render()
+
+
+def _request_stats():
+    if has_request_context():
+        return getattr(g, '_request_stats', None)
+    return None
+
+
+@contextmanager
+def timed(section):
+    """Times a block (e.g. 'pdf', 'qr', 'smtp') into the current request breakdown and its histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe(f'campus_{section}_seconds', elapsed, help_text=f'Time spent in {section} work.')
+        stats = _request_stats()
+        if stats is not None:
+            stats[f'{section}_time'] += elapsed
+            stats[f'{section}_count'] += 1
+
+
+# --- SQLAlchemy hooks ---
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['_query_start'].pop()
+    metrics.observe('campus_sql_query_seconds', elapsed, help_text='Duration of individual SQL statements.')
+    stats = _request_stats()
+    if stats is not None:
+        stats['sql_time'] += elapsed
+        stats['sql_count'] += 1
+
+
+# --- Template render hooks ---
+def _before_render(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None:
+        stats['_template_stack'].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None and stats['_template_stack']:
+        elapsed = time.perf_counter() - stats['_template_stack'].pop()
+        # Nested renders (e.g. a PDF template inside a view) are only counted once
+        if not stats['_template_stack']:
+            stats['template_time'] += elapsed
+            stats['template_count'] += 1
+        metrics.observe('campus_template_seconds', elapsed, help_text='Template render time.',
+                        template=template.name or 'string')
+
+
+# --- Sampling profiler ---
+class SamplingProfiler:
+    """Samples one thread's stack on a timer and aggregates collapsed stacks.
+
+    The output of `folded()` is the "folded" format understood by flamegraph.pl,
+    inferno and speedscope: one `frame;frame;frame count` line per unique stack.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common()) + '\n'
+
+
+def _profiling_requested(app):
+    if request.args.get('profile') != '1' or not app.config.get('PROFILING_ENABLED'):
+        return False
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+
+# --- Flask wiring ---
+def init_app(app):
+    app.config.setdefault('INSTRUMENTATION_ENABLED', True)
+    app.config.setdefault('PROFILING_ENABLED', True)
+    app.config.setdefault('PROFILE_SAMPLE_INTERVAL', 0.005)
+    app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+
+    global _shared
+    _shared = None
+    if app.config.get('METRICS_DIR'):
+        os.makedirs(app.config['METRICS_DIR'], exist_ok=True)
+        _shared = SharedMetrics(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_SECONDS'])
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def _start_request_timer():
+        if _shared is not None:
+            _shared.ensure_flushing()
+        stats = defaultdict(float)
+        stats['_template_stack'] = []
+        stats['_start'] = time.perf_counter()
+        g._request_stats = stats
+        if _profiling_requested(app):
+            g._profiler = SamplingProfiler(threading.get_ident(), app.config['PROFILE_SAMPLE_INTERVAL'])
+            g._profiler.start()
+
+    @app.after_request
+    def _finish_request_timer(response):
+        stats = getattr(g, '_request_stats', None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats['_start']
+        endpoint = request.endpoint or 'unknown'
+
+        metrics.inc('campus_requests_total', help_text='HTTP requests served.',
+                    endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.observe('campus_request_seconds', duration, help_text='HTTP request duration.', endpoint=endpoint)
+        metrics.observe('campus_request_sql_queries', stats['sql_count'], buckets=COUNT_BUCKETS,
+                        help_text='SQL statements issued per request.', endpoint=endpoint)
+
+        timings = [f'total;dur={duration * 1000:.1f}']
+        for section in SECTIONS:
+            if stats[f'{section}_count']:
+                timings.append(f'{section};dur={stats[f"{section}_time"] * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+            path = os.path.join(app.config['PROFILE_DIR'], f'{endpoint}-{int(time.time() * 1000)}.folded')
+            with open(path, 'w') as profile_file:
+                profile_file.write(profiler.folded())
+            response.headers['X-Profile-Path'] = path
+            logger.info("Profile for %s written to %s", request.path, path)
+
+        logger.debug(
+            "%s %s %s %.1fms sql=%d/%.1fms template=%.1fms pdf=%.1fms qr=%.1fms smtp=%.1fms",
+            request.method, request.path, response.status_code, duration * 1000,
+            stats['sql_count'], stats['sql_time'] * 1000, stats['template_time'] * 1000,
+            stats['pdf_time'] * 1000, stats['qr_time'] * 1000, stats['smtp_time'] * 1000
+        )
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        # after_request is skipped on unhandled errors; make sure the sampler thread ends
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.stop()
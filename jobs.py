@@ -0,0 +1,227 @@
+# jobs.py
+"""Scheduled jobs, run by exactly one process at a time.
+
+Jobs live in the database (APScheduler's SQLAlchemy job store, table
+apscheduler_jobs), so their next run times survive restarts and deploys.
+Every process that starts the scheduler starts it paused and competes for a
+lease row in scheduler_lock. The holder renews the lease every third of
+SCHEDULER_LEASE_SECONDS and is the only one whose scheduler runs jobs. If it
+stops renewing (crash, shutdown, lost database connection), another process
+takes over once the lease expires; a process that fails to renew pauses its
+scheduler at once. Lease times come from each host's clock, so keep hosts
+in sync with NTP.
+
+Web processes start the scheduler with the first request they serve, so CLI
+commands such as `flask db upgrade` never run jobs. To keep jobs out of the
+web workers altogether, set SCHEDULER_ENABLED=0 and run `flask run-scheduler`
+as its own process (two copies give a hot standby).
+
+Every run is counted in campus_job_runs_total{job,status} and timed in
+campus_job_seconds{job} on the /metrics of the process that ran it.
+"""
+import atexit
+import importlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from extensions import db, scheduler
+from instrumentation import metrics
+from models import SchedulerLock
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'scheduler'
+JOB_TABLE = 'apscheduler_jobs'
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+# Job id -> (function, config key of its interval in seconds). The job store
+# only keeps the id; run_job() looks the function up here.
+JOBS = {
+    'send_reminders': ('reminders:scheduled_send', 'REMINDER_POLL_SECONDS'),
+    'rebuild_analytics': ('analytics:scheduled_rebuild', 'ANALYTICS_REBUILD_SECONDS'),
+    'archive_notifications': ('retention:scheduled_archive', 'NOTIFICATION_ARCHIVE_INTERVAL_SECONDS'),
+    'reconcile_payments': ('payments:scheduled_reconcile', 'PAYMENT_RECONCILE_INTERVAL_SECONDS'),
+    'issue_tickets': ('tickets:scheduled_sweep', 'TICKET_SWEEP_SECONDS'),
+}
+
+
+class Lease:
+    """A named lease in scheduler_lock, taken and renewed with one conditional UPDATE."""
+
+    def __init__(self, name, seconds):
+        self.name = name
+        self.seconds = seconds
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def acquire(self):
+        """Takes or renews the lease; returns True if this process holds it."""
+        now = datetime.utcnow()
+        result = db.session.execute(
+            update(SchedulerLock)
+            .where(SchedulerLock.name == self.name,
+                   or_(SchedulerLock.owner == self.owner, SchedulerLock.expires_at < now))
+            .values(owner=self.owner, expires_at=now + timedelta(seconds=self.seconds))
+            .execution_options(synchronize_session=False))
+        if result.rowcount == 1:
+            db.session.commit()
+            return True
+        exists = db.session.scalar(db.select(SchedulerLock.name).filter_by(name=self.name))
+        if exists:
+            db.session.rollback()
+            return False
+        db.session.add(SchedulerLock(name=self.name, owner=self.owner, expires_at=now + timedelta(seconds=self.seconds)))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # another process created it first
+            return False
+        return True
+
+    def release(self):
+        db.session.execute(update(SchedulerLock).filter_by(name=self.name, owner=self.owner)
+                           .values(expires_at=datetime.utcnow()).execution_options(synchronize_session=False))
+        db.session.commit()
+
+
+class Elector(threading.Thread):
+    """Keeps trying to hold the lease, and runs the scheduler only while it does."""
+
+    def __init__(self, app, lease):
+        super().__init__(name='scheduler-elector', daemon=True)
+        self.app = app
+        self.lease = lease
+        self.is_leader = False
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.step()
+            self._stopped.wait(self.lease.seconds / 3)
+
+    def step(self):
+        with self.app.app_context():
+            try:
+                leader = self.lease.acquire()
+                if leader and not self.is_leader:
+                    sync_jobs(self.app)
+            except Exception:
+                logger.warning("Could not renew the scheduler lease", exc_info=True)
+                db.session.rollback()
+                leader = False
+        if leader and not self.is_leader:
+            logger.info("Acquired the scheduler lease as %s; running jobs", self.lease.owner)
+            scheduler.resume()
+        elif self.is_leader and not leader:
+            logger.warning("Lost the scheduler lease; pausing jobs")
+            scheduler.pause()
+        self.is_leader = leader
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_leader:
+            self.is_leader = False
+            scheduler.pause()
+            try:
+                with self.app.app_context():
+                    self.lease.release()
+            except Exception:
+                logger.warning("Could not release the scheduler lease", exc_info=True)
+
+
+def sync_jobs(app):
+    """Makes the job store match JOBS, keeping the next run time of jobs whose interval is unchanged."""
+    for job in scheduler.get_jobs():
+        if job.id not in JOBS:
+            scheduler.remove_job(job.id)
+    for job_id, (_, interval_key) in JOBS.items():
+        interval = timedelta(seconds=app.config[interval_key])
+        job = scheduler.get_job(job_id)
+        if job is None or job.trigger.interval != interval:
+            scheduler.add_job(id=job_id, func='jobs:run_job', args=[job_id], trigger='interval',
+                              seconds=interval.total_seconds(), replace_existing=True)
+
+
+def is_leader():
+    """True if this process holds the scheduler lease."""
+    return _elector is not None and _elector.is_leader
+
+
+def run_job(job_id):
+    """Runs a job from JOBS and records its duration and outcome."""
+    if not is_leader():
+        logger.info("Skipping job %s: this process does not hold the scheduler lease", job_id)
+        return
+    module_name, function_name = JOBS[job_id][0].split(':')
+    function = getattr(importlib.import_module(module_name), function_name)
+    started = time.perf_counter()
+    status = 'ok'
+    try:
+        function()
+    except Exception:
+        status = 'error'
+        logger.exception("Job %s failed", job_id)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.inc('campus_job_runs_total', help_text='Scheduled job runs.', job=job_id, status=status)
+        metrics.observe('campus_job_seconds', duration, buckets=JOB_BUCKETS,
+                        help_text='Scheduled job duration.', job=job_id)
+        logger.info("Job %s finished in %.2fs (%s)", job_id, duration, status)
+
+
+_elector = None
+_start_lock = threading.Lock()
+
+
+def start(app):
+    """Starts the paused scheduler and the lease election in this process (once)."""
+    global _elector
+    with _start_lock:
+        if _elector is not None:
+            return
+        from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+
+        with app.app_context():
+            engine = db.engine  # shares the app's pool and SQLite pragmas
+        app.config.setdefault('SCHEDULER_JOBSTORES', {'default': SQLAlchemyJobStore(engine=engine, tablename=JOB_TABLE)})
+        # A run missed while no process held the lease happens once when one takes over
+        app.config.setdefault('SCHEDULER_JOB_DEFAULTS', {'coalesce': True, 'max_instances': 1,
+                                                         'misfire_grace_time': None})
+        scheduler.init_app(app)
+        try:
+            scheduler.start(paused=True)
+        except OperationalError:
+            # Workers booting together can race to create the job table; it exists now
+            time.sleep(0.5)
+            scheduler.start(paused=True)
+        if not scheduler.running:
+            return  # the reloader's parent process under `flask run --debug`
+        _elector = Elector(app, Lease(LEASE_NAME, app.config['SCHEDULER_LEASE_SECONDS']))
+        _elector.start()
+        atexit.register(_elector.stop)
+
+
+def init_app(app):
+    @app.cli.command('run-scheduler')
+    def run_scheduler_command():
+        """Run scheduled jobs in the foreground while this process holds the scheduler lease."""
+        start(app)
+        print(f"Scheduler started as {_elector.lease.owner}; press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+    if app.config['SCHEDULER_ENABLED'] and not app.testing:
+        @app.before_request
+        def _start_scheduler():
+            if _elector is None:
+                start(app)
@@ -0,0 +1,69 @@
+"""Replace Event.next_reminder_at with one event_reminder row per lead time
+
+Revision ID: a4c8e2f6b913
+Revises: f2a7d9b4c611
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b913'
+down_revision = 'f2a7d9b4c611'
+branch_labels = None
+depends_on = None
+
+# The default REMINDER_LEADS; events saved later get the configured ones
+LEADS = (24 * 60, 60)
+
+
+def upgrade():
+    op.create_table('event_reminder',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('minutes_before', sa.Integer(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'minutes_before', name='uq_event_reminder_event_id_minutes_before')
+    )
+    with op.batch_alter_table('event_reminder', schema=None) as batch_op:
+        batch_op.create_index('ix_event_reminder_sent_at_due_at', ['sent_at', 'due_at'], unique=False)
+
+    # Reminders for approved upcoming events; the 24-hour one counts as sent where reminder_sent is set
+    event = sa.table('event', sa.column('id', sa.Integer), sa.column('date', sa.DateTime),
+                     sa.column('status', sa.String), sa.column('reminder_sent', sa.Boolean))
+    reminder = sa.table('event_reminder', sa.column('event_id', sa.Integer), sa.column('minutes_before', sa.Integer),
+                        sa.column('due_at', sa.DateTime), sa.column('sent_at', sa.DateTime))
+    connection = op.get_bind()
+    now = datetime.now()
+    rows = connection.execute(sa.select(event.c.id, event.c.date, event.c.reminder_sent)
+                              .where(event.c.status == 'Approved', event.c.date > now)).all()
+    values = [dict(event_id=event_id, minutes_before=minutes, due_at=date - timedelta(minutes=minutes),
+                   sent_at=now if reminder_sent and minutes >= 24 * 60 else None)
+              for event_id, date, reminder_sent in rows for minutes in LEADS]
+    if values:
+        connection.execute(reminder.insert(), values)
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_next_reminder_at')
+        batch_op.drop_column('next_reminder_at')
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_reminder_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_event_next_reminder_at', ['next_reminder_at'], unique=False)
+
+    op.execute("UPDATE event SET next_reminder_at = (SELECT MIN(due_at) FROM event_reminder "
+               "WHERE event_reminder.event_id = event.id AND event_reminder.sent_at IS NULL)")
+
+    with op.batch_alter_table('event_reminder', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_reminder_sent_at_due_at')
+
+    op.drop_table('event_reminder')
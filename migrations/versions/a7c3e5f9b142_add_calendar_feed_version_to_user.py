@@ -0,0 +1,29 @@
+"""Add calendar_feed_version to user, so a leaked calendar feed URL can be revoked
+
+Revision ID: a7c3e5f9b142
+Revises: f4d8b1e6a925
+Create Date: 2026-10-21 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f9b142'
+down_revision = 'f4d8b1e6a925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('calendar_feed_version', sa.Integer(), nullable=True))
+    op.execute('UPDATE "user" SET calendar_feed_version = 0')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('calendar_feed_version', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('calendar_feed_version')
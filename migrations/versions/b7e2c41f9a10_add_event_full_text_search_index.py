@@ -0,0 +1,72 @@
+"""Add full-text search index on Event name, description and location
+
+Revision ID: b7e2c41f9a10
+Revises: 9dfe4f62c0c9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c41f9a10'
+down_revision = '9dfe4f62c0c9'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with search.SQLITE_DDL / search.POSTGRES_DDL
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5("
+    "name, description, location, content='event', content_rowid='id', tokenize='porter unicode61', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_ai AFTER INSERT ON event BEGIN "
+    "INSERT INTO event_fts(rowid, name, description, location) VALUES (new.id, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_ad AFTER DELETE ON event BEGIN "
+    "INSERT INTO event_fts(event_fts, rowid, name, description, location) VALUES ('delete', old.id, old.name, old.description, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_au AFTER UPDATE OF name, description, location ON event BEGIN "
+    "INSERT INTO event_fts(event_fts, rowid, name, description, location) VALUES ('delete', old.id, old.name, old.description, old.location); "
+    "INSERT INTO event_fts(rowid, name, description, location) VALUES (new.id, new.name, new.description, new.location); END",
+    # Index the events that already exist
+    "INSERT INTO event_fts(event_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS event_fts_au",
+    "DROP TRIGGER IF EXISTS event_fts_ad",
+    "DROP TRIGGER IF EXISTS event_fts_ai",
+    "DROP TABLE IF EXISTS event_fts",
+)
+
+POSTGRES_UPGRADE = (
+    "ALTER TABLE event ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_event_search_vector ON event USING GIN (search_vector)",
+)
+
+POSTGRES_DOWNGRADE = (
+    "DROP INDEX IF EXISTS ix_event_search_vector",
+    "ALTER TABLE event DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_DOWNGRADE)
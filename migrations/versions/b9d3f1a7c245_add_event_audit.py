@@ -0,0 +1,40 @@
+"""Add the event_audit table for approval transitions
+
+Revision ID: b9d3f1a7c245
+Revises: a4c8e2f6b913
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d3f1a7c245'
+down_revision = 'a4c8e2f6b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_audit',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('transition', sa.String(length=30), nullable=False),
+    sa.Column('from_status', sa.String(length=50), nullable=False),
+    sa.Column('to_status', sa.String(length=50), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['actor_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('event_audit', schema=None) as batch_op:
+        batch_op.create_index('ix_event_audit_event_id_id', ['event_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_audit', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_audit_event_id_id')
+
+    op.drop_table('event_audit')
@@ -0,0 +1,70 @@
+"""Add analytics rollup tables
+
+Revision ID: c3a91d7e5b22
+Revises: b7e2c41f9a10
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a91d7e5b22'
+down_revision = 'b7e2c41f9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analytics_counter',
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('event_stats',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('registrations', sa.Integer(), nullable=False),
+    sa.Column('paid_registrations', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    with op.batch_alter_table('event_stats', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_stats_registrations'), ['registrations'], unique=False)
+
+    op.create_table('hall_usage_week',
+    sa.Column('hall_id', sa.Integer(), nullable=False),
+    sa.Column('week_start', sa.Date(), nullable=False),
+    sa.Column('approved_bookings', sa.Integer(), nullable=False),
+    sa.Column('booked_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['hall_id'], ['hall.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hall_id', 'week_start')
+    )
+    with op.batch_alter_table('hall_usage_week', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_hall_usage_week_week_start'), ['week_start'], unique=False)
+
+    op.create_table('bus_usage_day',
+    sa.Column('bus_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('approved_bookings', sa.Integer(), nullable=False),
+    sa.Column('passengers', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['bus_id'], ['bus.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bus_id', 'day')
+    )
+    with op.batch_alter_table('bus_usage_day', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_bus_usage_day_day'), ['day'], unique=False)
+
+    # Existing data is counted by `flask rebuild-analytics` after upgrading
+
+
+def downgrade():
+    with op.batch_alter_table('bus_usage_day', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bus_usage_day_day'))
+    op.drop_table('bus_usage_day')
+    with op.batch_alter_table('hall_usage_week', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hall_usage_week_week_start'))
+    op.drop_table('hall_usage_week')
+    with op.batch_alter_table('event_stats', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_stats_registrations'))
+    op.drop_table('event_stats')
+    op.drop_table('analytics_counter')
@@ -0,0 +1,98 @@
+"""Store status columns as small-integer codes, with a status_lookup table
+
+Revision ID: c6e4a2d8f157
+Revises: b9d3f1a7c245
+Create Date: 2026-10-20 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e4a2d8f157'
+down_revision = 'b9d3f1a7c245'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with the registries in statuses.py
+EVENT = {1: 'Pending DSA Approval', 2: 'Pending VC Office Approval', 3: 'Approved', 4: 'DSA Rejected', 5: 'VC Rejected'}
+BOOKING = {1: 'Pending', 2: 'Approved', 3: 'Rejected', 4: 'Cancelled by Admin', 5: 'Cancelled by Student'}
+PAYMENT = {1: 'N/A', 2: 'pending', 3: 'paid'}
+
+# table, column, codes, string length, nullable, (index name, columns)
+COLUMNS = (
+    ('event', 'status', EVENT, 50, False, ('ix_event_status_date', ['status', 'date'])),
+    ('hall_booking', 'status', BOOKING, 50, False, ('ix_hall_booking_status_requested_date', ['status', 'requested_date'])),
+    ('bus_booking', 'status', BOOKING, 50, False, ('ix_bus_booking_status_requested_date', ['status', 'requested_date'])),
+    ('registration', 'payment_status', PAYMENT, 20, True, None),
+)
+
+# Recreating the event table on SQLite drops its full-text search triggers (search.SQLITE_DDL)
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS event_fts_ai AFTER INSERT ON event BEGIN "
+    "INSERT INTO event_fts(rowid, name, description, location) VALUES (new.id, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_ad AFTER DELETE ON event BEGIN "
+    "INSERT INTO event_fts(event_fts, rowid, name, description, location) VALUES ('delete', old.id, old.name, old.description, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_au AFTER UPDATE OF name, description, location ON event BEGIN "
+    "INSERT INTO event_fts(event_fts, rowid, name, description, location) VALUES ('delete', old.id, old.name, old.description, old.location); "
+    "INSERT INTO event_fts(rowid, name, description, location) VALUES (new.id, new.name, new.description, new.location); END",
+    # Earlier migrations recreated the table too, so reindex whatever was missed meanwhile
+    "INSERT INTO event_fts(event_fts) VALUES ('rebuild')",
+)
+
+
+def _restore_fts_triggers():
+    connection = op.get_bind()
+    if connection.dialect.name == 'sqlite' and sa.inspect(connection).has_table('event_fts'):
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+
+def _convert(table_name, column, mapping, old_type, new_type, nullable, drop_index=None, create_index=None):
+    """Replaces `column` with a copy translated through `mapping` (old value -> new value)."""
+    temporary = f'{column}_new'
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        batch_op.add_column(sa.Column(temporary, new_type, nullable=True))
+
+    table = sa.table(table_name, sa.column(column, old_type), sa.column(temporary, new_type))
+    connection = op.get_bind()
+    connection.execute(table.update().values({temporary: sa.case(mapping, value=table.c[column])}))
+    unknown = connection.execute(sa.select(table.c[column]).distinct()
+                                 .where(table.c[temporary].is_(None), table.c[column].is_not(None))).scalars().all()
+    if unknown:
+        raise RuntimeError(f"{table_name}.{column} holds values with no code: {unknown}; add them to statuses.py first")
+
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        if drop_index:
+            batch_op.drop_index(drop_index[0])
+        batch_op.drop_column(column)
+        batch_op.alter_column(temporary, new_column_name=column, existing_type=new_type, nullable=nullable)
+    if create_index:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.create_index(create_index[0], create_index[1], unique=False)
+
+
+def upgrade():
+    lookup = op.create_table('status_lookup',
+    sa.Column('domain', sa.String(length=20), nullable=False),
+    sa.Column('code', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('domain', 'code')
+    )
+    op.bulk_insert(lookup, [dict(domain=domain, code=code, name=name)
+                            for domain, codes in (('event', EVENT), ('booking', BOOKING), ('payment', PAYMENT))
+                            for code, name in codes.items()])
+
+    for table_name, column, codes, length, nullable, index in COLUMNS:
+        _convert(table_name, column, {name: code for code, name in codes.items()},
+                 sa.String(length), sa.SmallInteger(), nullable, create_index=index)
+    _restore_fts_triggers()
+
+
+def downgrade():
+    for table_name, column, codes, length, nullable, index in COLUMNS:
+        _convert(table_name, column, codes, sa.SmallInteger(), sa.String(length), nullable, drop_index=index)
+    _restore_fts_triggers()
+
+    op.drop_table('status_lookup')
@@ -0,0 +1,39 @@
+"""Add updated_at to events and hall/bus bookings for calendar feeds
+
+Revision ID: d5f0a8c3e417
+Revises: c3a91d7e5b22
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f0a8c3e417'
+down_revision = 'c3a91d7e5b22'
+branch_labels = None
+depends_on = None
+
+# Best available "last changed" time for existing rows
+BACKFILL = {
+    'event': 'date_created',
+    'hall_booking': 'COALESCE(processed_timestamp, timestamp)',
+    'bus_booking': 'COALESCE(processed_timestamp, timestamp)',
+}
+
+
+def upgrade():
+    # Added nullable, backfilled, then made NOT NULL: SQLite can't add a column with a non-constant default
+    for table, expression in BACKFILL.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = COALESCE({expression}, CURRENT_TIMESTAMP)')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in reversed(list(BACKFILL)):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
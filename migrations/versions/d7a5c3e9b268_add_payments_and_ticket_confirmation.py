@@ -0,0 +1,96 @@
+"""Add payment and payment_webhook_event, and registration.confirmation_sent_at
+
+Revision ID: d7a5c3e9b268
+Revises: c6e4a2d8f157
+Create Date: 2026-10-20 02:00:00.000000
+
+Free registrations made through the event page were stored as 'paid';
+they become 'N/A' like RSVPs, so run `flask rebuild-analytics` afterwards
+to correct the paid registration counts.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a5c3e9b268'
+down_revision = 'c6e4a2d8f157'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with the registries in statuses.py
+PAYMENT_NA, PAYMENT_PENDING, PAYMENT_PAID, PAYMENT_FAILED = 1, 2, 3, 4
+NEW_LOOKUP_ROWS = [
+    dict(domain='payment', code=PAYMENT_FAILED, name='failed'),
+    dict(domain='checkout', code=1, name='pending'),
+    dict(domain='checkout', code=2, name='paid'),
+    dict(domain='checkout', code=3, name='failed'),
+]
+
+
+def upgrade():
+    op.create_table('payment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('registration_id', sa.Integer(), nullable=True),
+    sa.Column('provider', sa.String(length=20), nullable=False),
+    sa.Column('provider_ref', sa.String(length=100), nullable=False),
+    sa.Column('amount_cents', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('paid_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['registration_id'], ['registration.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('provider', 'provider_ref', name='uq_payment_provider_provider_ref')
+    )
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_status_created_at', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_payment_registration_id', ['registration_id'], unique=False)
+
+    op.create_table('payment_webhook_event',
+    sa.Column('provider', sa.String(length=20), nullable=False),
+    sa.Column('event_id', sa.String(length=100), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('provider', 'event_id')
+    )
+
+    with op.batch_alter_table('registration', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('confirmation_sent_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_registration_confirmation_sent_at', ['confirmation_sent_at'], unique=False)
+
+    registration = sa.table('registration', sa.column('event_id', sa.Integer()), sa.column('payment_status', sa.SmallInteger()),
+                            sa.column('registration_date', sa.DateTime()), sa.column('confirmation_sent_at', sa.DateTime()))
+    event = sa.table('event', sa.column('id', sa.Integer()), sa.column('price', sa.Float()))
+    op.execute(registration.update()
+               .where(registration.c.payment_status == PAYMENT_PAID,
+                      registration.c.event_id.in_(sa.select(event.c.id).where(event.c.price == 0)))
+               .values(payment_status=PAYMENT_NA))
+    # Existing tickets were issued inline, so don't let tickets.sweep() send their emails again
+    op.execute(registration.update()
+               .where(registration.c.payment_status.in_([PAYMENT_NA, PAYMENT_PAID]))
+               .values(confirmation_sent_at=sa.func.coalesce(registration.c.registration_date, sa.func.current_timestamp())))
+
+    lookup = sa.table('status_lookup', sa.column('domain', sa.String()), sa.column('code', sa.SmallInteger()),
+                      sa.column('name', sa.String()))
+    op.bulk_insert(lookup, NEW_LOOKUP_ROWS)
+
+
+def downgrade():
+    lookup = sa.table('status_lookup', sa.column('domain', sa.String()), sa.column('code', sa.SmallInteger()))
+    op.execute(lookup.delete().where(sa.or_(lookup.c.domain == 'checkout',
+                                            sa.and_(lookup.c.domain == 'payment', lookup.c.code == PAYMENT_FAILED))))
+    # The previous schema has no 'failed' registrations; they are still unpaid
+    registration = sa.table('registration', sa.column('payment_status', sa.SmallInteger()))
+    op.execute(registration.update().where(registration.c.payment_status == PAYMENT_FAILED)
+               .values(payment_status=PAYMENT_PENDING))
+
+    with op.batch_alter_table('registration', schema=None) as batch_op:
+        batch_op.drop_index('ix_registration_confirmation_sent_at')
+        batch_op.drop_column('confirmation_sent_at')
+
+    op.drop_table('payment_webhook_event')
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_registration_id')
+        batch_op.drop_index('ix_payment_status_created_at')
+
+    op.drop_table('payment')
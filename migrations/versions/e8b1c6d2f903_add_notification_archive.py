@@ -0,0 +1,46 @@
+"""Add the notification archive table and notification indexes
+
+Revision ID: e8b1c6d2f903
+Revises: d5f0a8c3e417
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b1c6d2f903'
+down_revision = 'd5f0a8c3e417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('notification_type', sa.String(length=50), nullable=True),
+    sa.Column('related_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_archive_user_id_id', ['user_id', 'id'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_id_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_notification_is_read_timestamp', ['is_read', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_is_read_timestamp')
+        batch_op.drop_index('ix_notification_user_id_id')
+
+    with op.batch_alter_table('notification_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_archive_user_id_id')
+
+    op.drop_table('notification_archive')
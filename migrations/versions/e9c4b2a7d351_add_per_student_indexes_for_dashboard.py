@@ -0,0 +1,38 @@
+"""Index registrations and hall/bus bookings by student, for the dashboard summary
+
+Revision ID: e9c4b2a7d351
+Revises: d7a5c3e9b268
+Create Date: 2026-10-20 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c4b2a7d351'
+down_revision = 'd7a5c3e9b268'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('registration', schema=None) as batch_op:
+        batch_op.create_index('ix_registration_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('hall_booking', schema=None) as batch_op:
+        batch_op.create_index('ix_hall_booking_student_id_status', ['student_id', 'status'], unique=False)
+
+    with op.batch_alter_table('bus_booking', schema=None) as batch_op:
+        batch_op.create_index('ix_bus_booking_student_id_status', ['student_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bus_booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_bus_booking_student_id_status')
+
+    with op.batch_alter_table('hall_booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_hall_booking_student_id_status')
+
+    with op.batch_alter_table('registration', schema=None) as batch_op:
+        batch_op.drop_index('ix_registration_user_id')
@@ -0,0 +1,51 @@
+"""Add the scheduler lease table and Event.next_reminder_at
+
+Revision ID: f2a7d9b4c611
+Revises: e8b1c6d2f903
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a7d9b4c611'
+down_revision = 'e8b1c6d2f903'
+branch_labels = None
+depends_on = None
+
+# REMINDER_LEAD_HOURS at the time of this migration; later changes apply to newly saved events
+LEAD = timedelta(hours=24)
+
+
+def upgrade():
+    op.create_table('scheduler_lock',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('owner', sa.String(length=120), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_reminder_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_event_next_reminder_at'), ['next_reminder_at'], unique=False)
+
+    # Schedule reminders for approved upcoming events that haven't had one
+    event = sa.table('event', sa.column('id', sa.Integer), sa.column('date', sa.DateTime),
+                     sa.column('status', sa.String), sa.column('reminder_sent', sa.Boolean),
+                     sa.column('next_reminder_at', sa.DateTime))
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(event.c.id, event.c.date).where(
+        event.c.status == 'Approved', event.c.reminder_sent == sa.false(), event.c.date >= datetime.now())).all()
+    for event_id, date in rows:
+        connection.execute(event.update().where(event.c.id == event_id).values(next_reminder_at=date - LEAD))
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_next_reminder_at'))
+        batch_op.drop_column('next_reminder_at')
+
+    op.drop_table('scheduler_lock')
@@ -0,0 +1,27 @@
+"""Drop the campus-wide registration counters; totals are summed from event_stats
+
+Revision ID: f4d8b1e6a925
+Revises: e9c4b2a7d351
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4d8b1e6a925'
+down_revision = 'e9c4b2a7d351'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("DELETE FROM analytics_counter WHERE name IN ('registrations', 'registrations:paid')")
+
+
+def downgrade():
+    op.execute("INSERT INTO analytics_counter (name, value) "
+               "SELECT 'registrations', COALESCE(SUM(registrations), 0) FROM event_stats")
+    op.execute("INSERT INTO analytics_counter (name, value) "
+               "SELECT 'registrations:paid', COALESCE(SUM(paid_registrations), 0) FROM event_stats")
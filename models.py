@@ -1,8 +1,10 @@
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import uuid
 
+import passwords
+from statuses import StatusCode, EVENT_STATUS, BOOKING_STATUS, PAYMENT_STATUS, CHECKOUT_STATUS, fill_lookup_table
+
 # Import db from the extensions module
 from extensions import db
 
@@ -13,9 +15,14 @@ class User(db.Model, UserMixin):
     image_file = db.Column(db.String(20), nullable=False, default='default.jpg')
     password_hash = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='student')
+    # Part of the personal calendar feed URL; bumping it revokes the old URL (see routes/calendar.py)
+    calendar_feed_version = db.Column(db.Integer, nullable=False, default=0)
 
     hall_bookings_made = db.relationship('HallBooking', foreign_keys='HallBooking.student_id', backref='requester', lazy='dynamic')
     bus_bookings_made = db.relationship('BusBooking', foreign_keys='BusBooking.student_id', backref='requester', lazy='dynamic')
+    # Read-only, non-dynamic counterparts of the above so they can be batch-loaded with selectinload()
+    hall_bookings = db.relationship('HallBooking', foreign_keys='HallBooking.student_id', viewonly=True, lazy='select')
+    bus_bookings = db.relationship('BusBooking', foreign_keys='BusBooking.student_id', viewonly=True, lazy='select')
     
     registrations = db.relationship('Registration', backref='user', lazy=True)
     
@@ -25,10 +32,17 @@ class User(db.Model, UserMixin):
     created_events = db.relationship('Event', foreign_keys='Event.created_by', back_populates='creator', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def upgrade_password_hash(self, password):
+        """Rehashes a verified password if PASSWORD_HASHER/PASSWORD_HASH_COST changed since it was hashed."""
+        if not passwords.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
 
     def has_rsvpd(self, event_id):
         return Registration.query.filter_by(user_id=self.id, event_id=event_id).first() is not None
@@ -47,7 +61,7 @@ class Event(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_event_created_by'), nullable=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
 
-    status = db.Column(db.String(50), nullable=False, default='Pending DSA Approval')
+    status = db.Column(StatusCode(EVENT_STATUS), nullable=False, default='Pending DSA Approval')
     dsa_approver_id = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_event_dsa_approver_id'), nullable=True)
     vc_approver_id = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_event_vc_approver_id'), nullable=True)
 
@@ -58,6 +72,12 @@ class Event(db.Model):
     registrations = db.relationship('Registration', backref='event', lazy=True)
 
     reminder_sent = db.Column(db.Boolean, default=False, nullable=False)
+    # One per configured lead time while the event is approved (see reminders.py)
+    reminders = db.relationship('EventReminder', backref='event', lazy=True, cascade='all, delete-orphan')
+    # Bumped on every ORM or Core UPDATE; calendar_feeds uses it to reserialize only changed rows
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_event_status_date', 'status', 'date'),)  # approval dashboards, listings
 
     def __repr__(self):
         return f"Event('{self.name}', '{self.date}', '{self.status}')"
@@ -68,9 +88,19 @@ class Registration(db.Model):
     event_id = db.Column(db.Integer, db.ForeignKey('event.id', name='fk_registration_event_id'), nullable=False)
     registration_date = db.Column(db.DateTime, default=datetime.utcnow)
     ticket_id = db.Column(db.String(50), unique=True, nullable=True)
-    payment_status = db.Column(db.String(20), default='pending')
+    payment_status = db.Column(StatusCode(PAYMENT_STATUS), default='pending')
     certificate_path = db.Column(db.String(255), nullable=True)
     certificate_generated_at = db.Column(db.DateTime, nullable=True)
+    # Set when the confirmation email is claimed for sending (see tickets.py)
+    confirmation_sent_at = db.Column(db.DateTime, nullable=True)
+
+    # Checkout attempts; deleting the registration keeps them, unlinked, for the books
+    payments = db.relationship('Payment', backref='registration', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_registration_confirmation_sent_at', 'confirmation_sent_at'),  # tickets.sweep()
+        db.Index('ix_registration_user_id', 'user_id'),  # a student's registrations, dashboard.py
+    )
 
     def __repr__(self):
         return f"Registration('{self.user_id}', '{self.event_id}')"
@@ -81,6 +111,8 @@ class Hall(db.Model):
     capacity = db.Column(db.Integer, nullable=False)
     location_details = db.Column(db.Text, nullable=True)
     bookings = db.relationship('HallBooking', backref='hall', lazy='dynamic', cascade="all, delete-orphan")
+    # Read-only, non-dynamic counterpart of `bookings` for selectinload()
+    all_bookings = db.relationship('HallBooking', viewonly=True, lazy='select')
 
     def __repr__(self):
         return f'<Hall {self.name}>'
@@ -94,13 +126,19 @@ class HallBooking(db.Model):
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
     purpose = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(50), nullable=False, default='Pending')
+    status = db.Column(StatusCode(BOOKING_STATUS), nullable=False, default='Pending')
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     processed_by_admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     processed_timestamp = db.Column(db.DateTime, nullable=True)
     admin_remarks = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     processor = db.relationship('User', foreign_keys=[processed_by_admin_id], lazy='select')
 
+    __table_args__ = (
+        db.Index('ix_hall_booking_status_requested_date', 'status', 'requested_date'),  # admin queues
+        db.Index('ix_hall_booking_student_id_status', 'student_id', 'status'),  # a student's bookings, dashboard.py
+    )
+
     def __repr__(self):
         return f'<HallBooking ID {self.id} for Hall {self.hall_id} by User {self.student_id}>'
 
@@ -111,6 +149,8 @@ class Bus(db.Model):
     driver_contact = db.Column(db.String(100), nullable=True)
     route_details = db.Column(db.Text, nullable=True)
     bookings = db.relationship('BusBooking', backref='bus', lazy='dynamic', cascade="all, delete-orphan")
+    # Read-only, non-dynamic counterpart of `bookings` for selectinload()
+    all_bookings = db.relationship('BusBooking', viewonly=True, lazy='select')
 
     def __repr__(self):
         return f'<Bus {self.identifier}>'
@@ -126,7 +166,7 @@ class BusBooking(db.Model):
     destination = db.Column(db.String(200), nullable=False)
     number_of_passengers = db.Column(db.Integer, nullable=True)
     purpose = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(50), nullable=False, default='Pending')
+    status = db.Column(StatusCode(BOOKING_STATUS), nullable=False, default='Pending')
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     processed_by_admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     processed_timestamp = db.Column(db.DateTime, nullable=True)
@@ -134,6 +174,12 @@ class BusBooking(db.Model):
     processor = db.relationship('User', foreign_keys=[processed_by_admin_id], lazy='select')
     certificate_path = db.Column(db.String(255), nullable=True) # Added for bus tickets
     certificate_generated_at = db.Column(db.DateTime, nullable=True) # Added for bus tickets
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_bus_booking_status_requested_date', 'status', 'requested_date'),  # admin queues
+        db.Index('ix_bus_booking_student_id_status', 'student_id', 'status'),  # a student's bookings, dashboard.py
+    )
 
     def __repr__(self):
         return f'<BusBooking ID {self.id} for Bus {self.bus_id} by User {self.student_id}>'
@@ -149,5 +195,115 @@ class Notification(db.Model):
 
     user = db.relationship('User', backref=db.backref('notifications', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_notification_user_id_id', 'user_id', 'id'),  # a user's notifications, newest first
+        db.Index('ix_notification_is_read_timestamp', 'is_read', 'timestamp'),  # retention.py
+    )
+
     def __repr__(self):
         return f"Notification('{self.user.username}', '{self.message[:30]}...', Read: {self.is_read})"
+
+# Read notifications past NOTIFICATION_RETENTION_DAYS, moved here by retention.py.
+# Rows keep their original id, so a user's history pages across both tables by id.
+class NotificationArchive(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    notification_type = db.Column(db.String(50), nullable=True)
+    related_id = db.Column(db.Integer, nullable=True)
+
+    is_read = True  # only read notifications are archived
+
+    __table_args__ = (db.Index('ix_notification_archive_user_id_id', 'user_id', 'id'),)
+
+# A reminder email due `minutes_before` the event starts; kept up to date by reminders.py
+class EventReminder(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id', ondelete='CASCADE'), nullable=False)
+    minutes_before = db.Column(db.Integer, nullable=False)
+    due_at = db.Column(db.DateTime, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'minutes_before', name='uq_event_reminder_event_id_minutes_before'),
+        db.Index('ix_event_reminder_sent_at_due_at', 'sent_at', 'due_at'),  # pending reminders by due time
+    )
+
+# One row per approval-workflow transition of an event; append-only (see approvals.py)
+class EventAudit(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    transition = db.Column(db.String(30), nullable=False)
+    from_status = db.Column(db.String(50), nullable=False)
+    to_status = db.Column(db.String(50), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    actor = db.relationship('User', lazy=True)
+
+    __table_args__ = (db.Index('ix_event_audit_event_id_id', 'event_id', 'id'),)  # an event's history in order
+
+# One checkout attempt at the payment provider (see payments.py)
+class Payment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    registration_id = db.Column(db.Integer, db.ForeignKey('registration.id'), nullable=True)
+    provider = db.Column(db.String(20), nullable=False)
+    provider_ref = db.Column(db.String(100), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    currency = db.Column(db.String(3), nullable=False)
+    status = db.Column(StatusCode(CHECKOUT_STATUS), nullable=False, default='pending')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    paid_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'provider_ref', name='uq_payment_provider_provider_ref'),
+        db.Index('ix_payment_status_created_at', 'status', 'created_at'),  # payments.reconcile()
+        db.Index('ix_payment_registration_id', 'registration_id'),
+    )
+
+# Provider webhook events already processed; the primary key makes redelivery a no-op
+class PaymentWebhookEvent(db.Model):
+    provider = db.Column(db.String(20), primary_key=True)
+    event_id = db.Column(db.String(100), primary_key=True)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Code -> label of every status column, for reading the database directly (see statuses.py)
+class StatusLookup(db.Model):
+    domain = db.Column(db.String(20), primary_key=True)
+    code = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), nullable=False)
+
+fill_lookup_table(StatusLookup.__table__)
+
+# Lease held by the one process that runs scheduled jobs (see jobs.py)
+class SchedulerLock(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# --- Analytics rollups (maintained by analytics.py, never written by views) ---
+class AnalyticsCounter(db.Model):
+    # Campus-wide totals, e.g. 'events:Approved' or 'hall_bookings:Pending'
+    name = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class EventStats(db.Model):
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id', ondelete='CASCADE'), primary_key=True)
+    registrations = db.Column(db.Integer, nullable=False, default=0, index=True)
+    paid_registrations = db.Column(db.Integer, nullable=False, default=0)
+    event = db.relationship('Event', lazy='select')
+
+class HallUsageWeek(db.Model):
+    hall_id = db.Column(db.Integer, db.ForeignKey('hall.id', ondelete='CASCADE'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True, index=True)  # Monday
+    approved_bookings = db.Column(db.Integer, nullable=False, default=0)
+    booked_minutes = db.Column(db.Integer, nullable=False, default=0)
+    hall = db.relationship('Hall', lazy='select')
+
+class BusUsageDay(db.Model):
+    bus_id = db.Column(db.Integer, db.ForeignKey('bus.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    approved_bookings = db.Column(db.Integer, nullable=False, default=0)
+    passengers = db.Column(db.Integer, nullable=False, default=0)
+    bus = db.relationship('Bus', lazy='select')
@@ -0,0 +1,105 @@
+# passwords.py
+"""Configurable password hashing.
+
+PASSWORD_HASHER selects the algorithm for new hashes ('scrypt', 'pbkdf2',
+'bcrypt' or 'argon2') and PASSWORD_HASH_COST its work factor (0 means the
+algorithm's default):
+
+    scrypt  N, a power of two (werkzeug default 2**15)
+    pbkdf2  SHA-256 iterations (werkzeug default 1,000,000)
+    bcrypt  log2 rounds (default 12)
+    argon2  time cost, i.e. passes over 64 MiB (default 3; needs argon2-cffi)
+
+Verification looks at the stored hash, not the config, so hashes made with
+any earlier setting keep working. After a successful login the password is
+rehashed if its hash was made with a different algorithm or cost; see
+User.upgrade_password_hash.
+"""
+from dataclasses import dataclass
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+HASHERS = ('scrypt', 'pbkdf2', 'bcrypt', 'argon2')
+DEFAULT_COSTS = {'scrypt': 2 ** 15, 'pbkdf2': 1_000_000, 'bcrypt': 12, 'argon2': 3}
+ARGON2_MEMORY_KIB = 64 * 1024
+ARGON2_PARALLELISM = 1
+# bcrypt only reads this many bytes of the password; bcrypt>=5 raises instead of truncating
+BCRYPT_MAX_BYTES = 72
+
+
+@dataclass(frozen=True)
+class Hasher:
+    """Hashes with one algorithm and cost. Plain data, so it can be sent to worker processes."""
+    algorithm: str
+    cost: int
+
+    def hash(self, password):
+        if self.algorithm == 'scrypt':
+            return generate_password_hash(password, method=f'scrypt:{self.cost}:8:1')
+        if self.algorithm == 'pbkdf2':
+            return generate_password_hash(password, method=f'pbkdf2:sha256:{self.cost}')
+        if self.algorithm == 'bcrypt':
+            import bcrypt
+            return bcrypt.hashpw(password.encode()[:BCRYPT_MAX_BYTES], bcrypt.gensalt(self.cost)).decode()
+        return _argon2(self.cost).hash(password)
+
+    def needs_rehash(self, password_hash):
+        """True if `password_hash` was not made with this algorithm and cost."""
+        if self.algorithm == 'scrypt':
+            return not password_hash.startswith(f'scrypt:{self.cost}:8:1$')
+        if self.algorithm == 'pbkdf2':
+            return not password_hash.startswith(f'pbkdf2:sha256:{self.cost}$')
+        if self.algorithm == 'bcrypt':
+            return not password_hash.startswith(f'$2b${self.cost:02d}$')
+        return not password_hash.startswith('$argon2') or _argon2(self.cost).check_needs_rehash(password_hash)
+
+
+def _argon2(time_cost):
+    try:
+        from argon2 import PasswordHasher
+    except ImportError:
+        raise RuntimeError("PASSWORD_HASHER='argon2' needs the argon2-cffi package.") from None
+    return PasswordHasher(time_cost=time_cost, memory_cost=ARGON2_MEMORY_KIB, parallelism=ARGON2_PARALLELISM)
+
+
+def make_hasher(algorithm, cost=0):
+    if algorithm not in HASHERS:
+        raise ValueError(f"Unknown PASSWORD_HASHER '{algorithm}'; expected one of {', '.join(HASHERS)}.")
+    cost = cost or DEFAULT_COSTS[algorithm]
+    if algorithm == 'scrypt' and cost & (cost - 1):
+        raise ValueError(f'The scrypt cost must be a power of two, not {cost}.')
+    if algorithm == 'argon2':
+        _argon2(cost)  # fail at startup, not at the first login
+    return Hasher(algorithm, cost)
+
+
+def current_hasher():
+    return current_app.extensions['password_hasher']
+
+
+def hash_password(password):
+    return current_hasher().hash(password)
+
+
+def verify_password(password_hash, password):
+    """Checks `password` against a hash made with any supported algorithm or cost."""
+    if password_hash.startswith('$2'):
+        import bcrypt
+        return bcrypt.checkpw(password.encode()[:BCRYPT_MAX_BYTES], password_hash.encode())
+    if password_hash.startswith('$argon2'):
+        hasher = _argon2(DEFAULT_COSTS['argon2'])  # the parameters are read from the hash
+        from argon2.exceptions import VerificationError, InvalidHashError
+        try:
+            return hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    return current_hasher().needs_rehash(password_hash)
+
+
+def init_app(app):
+    app.extensions['password_hasher'] = make_hasher(app.config['PASSWORD_HASHER'], app.config['PASSWORD_HASH_COST'])
@@ -0,0 +1,308 @@
+# payments.py
+"""Payments for paid events.
+
+A registration for a paid event starts with payment_status 'pending'. The
+student starts a checkout (start_checkout): a Payment row records the
+attempt and the provider returns the page to send them to. The provider
+reports the outcome with a signed webhook, handled by handle_webhook():
+
+- Idempotent: each provider event id is inserted into payment_webhook_event
+  in the same transaction as its effects, so a redelivered webhook hits the
+  primary key and changes nothing, and a webhook whose processing fails
+  leaves no trace and can be retried by the provider.
+- settle() applies outcomes in bulk with conditional UPDATEs (Payment
+  'pending' -> 'paid'/'failed', and the registration with it), so only the
+  first of two concurrent deliveries moves anything. Ticket rendering and
+  the confirmation email are enqueued for after the commit (tickets.py),
+  not done while the provider waits for its 200.
+
+Webhooks get lost, so the scheduler leader runs reconcile() every
+PAYMENT_RECONCILE_INTERVAL_SECONDS (and `flask reconcile-payments`): it asks
+the provider about checkouts still pending after
+PAYMENT_RECONCILE_AFTER_MINUTES, PAYMENT_RECONCILE_BATCH_SIZE references per
+call, and settles them the same way.
+
+Providers implement PaymentProvider. With PAYMENT_PROVIDER unset, online
+payment is off: paid registrations stay pending and nothing is reconciled.
+FakeProvider stands in for a real one during development: its checkout page
+lives in this app, lets the student pick the outcome and delivers its
+webhooks in-process. It is only built, and its page only registered, in
+debug or testing mode or with PAYMENT_FAKE_ENABLED. It keeps checkouts in
+memory, so it only works with a single process.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from flask import current_app, url_for
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+import analytics
+import tickets
+from extensions import db, scheduler
+from instrumentation import metrics
+from models import Event, Notification, Payment, PaymentWebhookEvent, Registration
+
+logger = logging.getLogger(__name__)
+
+# What the provider knows about a checkout
+Checkout = namedtuple('Checkout', 'ref url')
+# A verified webhook: its provider event id, and the checkout outcome it reports
+WebhookEvent = namedtuple('WebhookEvent', 'id ref status')
+
+OUTCOMES = ('paid', 'failed')
+
+
+class InvalidWebhook(ValueError):
+    """A webhook with a bad signature or body."""
+
+
+class PaymentProvider:
+    """Interface to a payment provider."""
+    name = None
+    signature_header = None
+
+    def create_checkout(self, amount_cents, currency, description, return_url):
+        """Opens a checkout; returns a Checkout with the provider's reference and the page to redirect to."""
+        raise NotImplementedError
+
+    def parse_webhook(self, body, signature):
+        """Verifies a webhook request body; returns a WebhookEvent or raises InvalidWebhook."""
+        raise NotImplementedError
+
+    def fetch_statuses(self, refs):
+        """Looks up checkouts in bulk; returns {ref: 'pending' | 'paid' | 'failed'} for the ones it knows."""
+        raise NotImplementedError
+
+
+class FakeProvider(PaymentProvider):
+    """An in-process provider for development and benchmarks."""
+    name = 'fake'
+    signature_header = 'X-Payment-Signature'
+
+    def __init__(self, secret):
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.checkouts = {}  # ref -> {'status', 'amount_cents', 'currency', 'description', 'return_url'}
+        self._lock = threading.Lock()
+
+    def create_checkout(self, amount_cents, currency, description, return_url):
+        ref = f'fake_{secrets.token_hex(12)}'
+        with self._lock:
+            self.checkouts[ref] = dict(status='pending', amount_cents=amount_cents, currency=currency,
+                                       description=description, return_url=return_url)
+        return Checkout(ref, url_for('fake_payments.fake_checkout', ref=ref))
+
+    def sign(self, body):
+        return hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+
+    def complete(self, ref, status):
+        """Settles a checkout as the student would on the provider's page; returns the webhook (body, signature)."""
+        with self._lock:
+            checkout = self.checkouts[ref]
+            if checkout['status'] == 'pending':
+                checkout['status'] = status
+            status = checkout['status']
+        body = json.dumps({'id': f'evt_{secrets.token_hex(12)}', 'type': 'checkout.completed',
+                           'data': {'ref': ref, 'status': status}}).encode()
+        return body, self.sign(body)
+
+    def parse_webhook(self, body, signature):
+        if not signature or not hmac.compare_digest(self.sign(body), signature):
+            raise InvalidWebhook('bad signature')
+        try:
+            payload = json.loads(body)
+            event = WebhookEvent(payload['id'], payload['data']['ref'], payload['data']['status'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidWebhook(f'malformed body: {e}') from None
+        if event.status not in OUTCOMES:
+            raise InvalidWebhook(f'unexpected status {event.status!r}')
+        return event
+
+    def fetch_statuses(self, refs):
+        with self._lock:
+            return {ref: self.checkouts[ref]['status'] for ref in refs if ref in self.checkouts}
+
+
+PROVIDERS = {'fake': FakeProvider}
+
+
+def make_provider(app):
+    """The configured provider, or None when PAYMENT_PROVIDER is unset."""
+    config = app.config
+    name = config['PAYMENT_PROVIDER']
+    if not name:
+        return None
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown PAYMENT_PROVIDER '{name}'; expected one of {', '.join(PROVIDERS)}.")
+    if PROVIDERS[name] is FakeProvider and not (app.debug or app.testing or config['PAYMENT_FAKE_ENABLED']):
+        # Its checkout page lets the student choose the outcome
+        raise ValueError("PAYMENT_PROVIDER 'fake' marks registrations paid without taking money; "
+                         "it needs debug or testing mode, or PAYMENT_FAKE_ENABLED=1.")
+    return PROVIDERS[name](config['PAYMENT_WEBHOOK_SECRET'] or config['SECRET_KEY'] or secrets.token_hex(32))
+
+
+def provider():
+    """The active provider, or None when online payment is off."""
+    return current_app.extensions['payment_provider']
+
+
+def start_checkout(registration, return_url):
+    """Opens a checkout for a pending (or failed) registration; returns the URL to send the student to."""
+    event = registration.event
+    if registration.payment_status == 'failed':
+        registration.payment_status = 'pending'
+    active = provider()
+    amount_cents = round(event.price * 100)
+    currency = current_app.config['PAYMENT_CURRENCY']
+    checkout = active.create_checkout(amount_cents, currency, f'Ticket for {event.name}', return_url)
+    db.session.add(Payment(registration_id=registration.id, provider=active.name, provider_ref=checkout.ref,
+                           amount_cents=amount_cents, currency=currency))
+    db.session.commit()
+    logger.info("Checkout %s started for registration %s", checkout.ref, registration.id)
+    return checkout.url
+
+
+@dataclass
+class Settlement:
+    paid: list = field(default_factory=list)     # registration ids now paid
+    failed: list = field(default_factory=list)   # registration ids now failed
+    payments: int = 0                            # Payment rows moved out of 'pending'
+
+    def __iadd__(self, other):
+        self.paid += other.paid
+        self.failed += other.failed
+        self.payments += other.payments
+        return self
+
+
+MESSAGES = {
+    'paid': "Payment received for '{name}'. Your ticket is on its way.",
+    'failed': "Your payment for '{name}' did not go through. You can try again from My Event Registrations.",
+}
+
+
+def settle(provider_name, outcomes, now=None):
+    """Applies {provider ref: 'paid' | 'failed'} to pending checkouts and their registrations, and commits.
+
+    Refs that are unknown, already settled or still pending are skipped. A
+    paid checkout moves its registration from 'pending' (or 'failed', when
+    an earlier attempt's failure arrived first) to 'paid'; a failed one
+    only moves it from 'pending'.
+    """
+    now = now or datetime.utcnow()
+    result = Settlement()
+    moved = []
+    for status in OUTCOMES:
+        refs = sorted(ref for ref, outcome in outcomes.items() if outcome == status)
+        if not refs:
+            continue
+        registration_ids = db.session.scalars(
+            update(Payment)
+            .where(Payment.provider == provider_name, Payment.provider_ref.in_(refs), Payment.status == 'pending')
+            .values(status=status, paid_at=now if status == 'paid' else None)
+            .returning(Payment.registration_id)
+            .execution_options(synchronize_session=False)).all()
+        result.payments += len(registration_ids)
+        registration_ids = sorted({i for i in registration_ids if i is not None})
+        if not registration_ids:
+            continue
+        sources = ('pending', 'failed') if status == 'paid' else ('pending',)
+        rows = db.session.execute(
+            update(Registration)
+            .where(Registration.id.in_(registration_ids), Registration.payment_status.in_(sources))
+            .values(payment_status=status)
+            .returning(Registration.id, Registration.user_id, Registration.event_id)
+            .execution_options(synchronize_session=False)).all()
+        getattr(result, status).extend(row.id for row in rows)
+        moved += [(status, row) for row in rows]
+    if not moved:
+        db.session.commit()  # the Payment updates, if any
+        return result
+
+    names = dict(db.session.execute(db.select(Event.id, Event.name)
+                                    .where(Event.id.in_({row.event_id for _, row in moved}))).all())
+    # ORM objects, so push.py publishes them on commit
+    db.session.add_all(Notification(user_id=row.user_id, message=MESSAGES[status].format(name=names[row.event_id]),
+                                    notification_type='payment_update', related_id=row.id, timestamp=now)
+                       for status, row in moved)
+    # Only 'paid' counts in the rollups, so 'failed' and 'pending' are interchangeable as the old value
+    analytics.record_bulk_update(db.session.connection(), Registration, [
+        ({'event_id': row.event_id, 'payment_status': 'pending'}, {'event_id': row.event_id, 'payment_status': status})
+        for status, row in moved])
+    db.session.commit()
+    for status in OUTCOMES:
+        metrics.inc('campus_payments_settled_total', len(getattr(result, status)),
+                    help_text='Registrations settled by a checkout outcome.', status=status)
+    tickets.enqueue(result.paid)
+    return result
+
+
+def handle_webhook(active, body, signature):
+    """Processes a webhook once; returns False for a redelivery. Raises InvalidWebhook."""
+    event = active.parse_webhook(body, signature)
+    db.session.add(PaymentWebhookEvent(provider=active.name, event_id=event.id))
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        logger.info("Ignoring redelivered %s webhook %s", active.name, event.id)
+        return False
+    settle(active.name, {event.ref: event.status})
+    return True
+
+
+def reconcile(older_than_minutes=None, batch_size=None, now=None):
+    """Settles checkouts still pending after `older_than_minutes` from the provider's records."""
+    config = current_app.config
+    older_than_minutes = config['PAYMENT_RECONCILE_AFTER_MINUTES'] if older_than_minutes is None else older_than_minutes
+    batch_size = batch_size or config['PAYMENT_RECONCILE_BATCH_SIZE']
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(minutes=older_than_minutes)
+    active = provider()
+    if active is None:
+        return Settlement()
+
+    result, last_id = Settlement(), 0
+    while True:
+        rows = db.session.execute(
+            db.select(Payment.id, Payment.provider_ref)
+            .where(Payment.status == 'pending', Payment.provider == active.name,
+                   Payment.created_at < cutoff, Payment.id > last_id)
+            .order_by(Payment.id).limit(batch_size)).all()
+        if not rows:
+            return result
+        last_id = rows[-1].id
+        statuses = active.fetch_statuses([row.provider_ref for row in rows])
+        result += settle(active.name, {ref: status for ref, status in statuses.items() if status in OUTCOMES}, now)
+        if len(rows) < batch_size:
+            return result
+
+
+def scheduled_reconcile():
+    with scheduler.app.app_context():
+        result = reconcile()
+        if result.payments:
+            logger.info("Reconciled %d pending checkouts: %d registrations paid, %d failed",
+                        result.payments, len(result.paid), len(result.failed))
+
+
+def init_app(app):
+    import click
+
+    app.extensions['payment_provider'] = make_provider(app)
+
+    @app.cli.command('reconcile-payments')
+    @click.option('--older-than', type=int, default=None,
+                  help='Minutes a checkout must have been pending (default: PAYMENT_RECONCILE_AFTER_MINUTES).')
+    def reconcile_payments_command(older_than):
+        """Settle pending checkouts from the payment provider's records."""
+        result = reconcile(older_than)
+        print(f"{result.payments} checkouts settled: {len(result.paid)} registrations paid, "
+              f"{len(result.failed)} failed.")
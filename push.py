@@ -0,0 +1,200 @@
+# push.py
+"""Server-Sent Events push of new notifications.
+
+Every committed Notification row is published to a broker, however it was
+created: an after_flush hook on the session collects new rows, and an
+after_commit hook publishes them. Open /notifications/stream responses
+subscribe to their user's channel and write each notification as an SSE
+message whose `id:` is the notification id.
+
+A reconnecting EventSource sends that id back as Last-Event-ID, and the
+stream first replays the user's newer notifications from the database, so
+nothing is lost across reconnects, deploys or a full queue. While idle, a
+comment line is sent every PUSH_HEARTBEAT_SECONDS to keep proxies from
+closing the connection. Streams end after PUSH_MAX_STREAM_SECONDS, and the
+browser reconnects.
+
+The database is only used while the stream is being set up. After that an
+idle stream holds a queue and a worker thread or greenlet, not a
+connection. Each open stream occupies its worker, so serve the app with an
+async worker, e.g. `gunicorn -k gevent --worker-connections 10000 app:app`,
+before setting PUSH_ENABLED.
+
+Brokers: LocalBroker delivers within one process. With several workers or
+hosts, set PUSH_BROKER_URL to a redis:// URL and RedisBroker relays every
+publish through Redis pub/sub to the local subscribers of each process.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from models import Notification
+from replica import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+# Put on a subscriber's queue when it overflows: the stream ends and the client catches up via Last-Event-ID
+RESYNC = object()
+CHANNEL = 'campus:notifications'
+
+
+class LocalBroker:
+    """In-process pub/sub with one bounded queue per open stream."""
+
+    def __init__(self, queue_size=100):
+        self._subscribers = defaultdict(set)  # user id -> queues
+        self._lock = threading.Lock()
+        self._queue_size = queue_size
+
+    def subscribe(self, user_id):
+        subscription = queue.Queue(self._queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(subscription)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, message):
+        self._deliver(user_id, message)
+
+    def _deliver(self, user_id, message):
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        for subscription in queues:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # A stalled client: drop its backlog and let it resync from the database
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(RESYNC)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+
+class RedisBroker(LocalBroker):
+    """Relays publishes through Redis so streams in every process and on every host receive them."""
+
+    def __init__(self, url, queue_size=100):
+        super().__init__(queue_size)
+        import redis  # Only needed with PUSH_BROKER_URL; keep it optional
+        self._client = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name='push-redis-listener', daemon=True)
+        self._listener.start()
+
+    def publish(self, user_id, message):
+        self._client.publish(CHANNEL, json.dumps({'user_id': user_id, 'message': message}))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for item in pubsub.listen():
+                    payload = json.loads(item['data'])
+                    self._deliver(payload['user_id'], payload['message'])
+            except Exception:
+                # Messages published while disconnected are recovered by clients via Last-Event-ID
+                logger.warning("Push broker connection lost; reconnecting", exc_info=True)
+                time.sleep(1)
+
+
+_broker = None
+
+
+def get_broker():
+    return _broker
+
+
+def init_app(app):
+    global _broker
+    url = app.config.get('PUSH_BROKER_URL')
+    _broker = RedisBroker(url, app.config['PUSH_QUEUE_SIZE']) if url else LocalBroker(app.config['PUSH_QUEUE_SIZE'])
+
+
+# --- Publishing committed notifications ---
+
+def notification_message(notification):
+    return {'id': notification.id, 'message': notification.message, 'type': notification.notification_type,
+            'related_id': notification.related_id, 'timestamp': notification.timestamp.isoformat()}
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_notifications(db_session, flush_context):
+    new = [obj for obj in db_session.new if isinstance(obj, Notification)]
+    if new:
+        db_session.info.setdefault('_push_pending', []).extend(
+            (obj.user_id, notification_message(obj)) for obj in new)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _publish_notifications(db_session):
+    pending = db_session.info.pop('_push_pending', None)
+    if pending and _broker is not None:
+        for user_id, message in pending:
+            try:
+                _broker.publish(user_id, message)
+            except Exception:
+                logger.warning("Could not publish notification %s", message['id'], exc_info=True)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_notifications(db_session):
+    db_session.info.pop('_push_pending', None)
+
+
+# --- The stream ---
+
+def _sse(message_id, event_name, data):
+    return f'id: {message_id}\nevent: {event_name}\ndata: {json.dumps(data)}\n\n'
+
+
+def event_stream(user_id, subscription, backlog, cursor, heartbeat, max_age, backlog_complete=True, retry_ms=5000):
+    """Yields SSE text: the backlog, then live notifications newer than `cursor`, with heartbeats.
+
+    If the backlog was truncated (`backlog_complete` false), the stream ends
+    after it, and the client reconnects from the last id it received.
+
+    Runs after the request has finished, so it must not touch the database
+    or the request context.
+    """
+    broker = _broker
+    deadline = time.monotonic() + max_age
+    try:
+        yield f'retry: {retry_ms}\n'
+        # Sets the client's Last-Event-ID even if nothing else is sent before it reconnects
+        yield _sse(cursor, 'ready', {})
+        for message in backlog:
+            yield _sse(message['id'], 'notification', message)
+            cursor = max(cursor, message['id'])
+        if not backlog_complete:
+            return
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                message = subscription.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            if message is RESYNC:
+                return
+            if message['id'] > cursor:  # already sent as part of the backlog
+                cursor = message['id']
+                yield _sse(message['id'], 'notification', message)
+    finally:
+        broker.unsubscribe(user_id, subscription)
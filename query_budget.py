@@ -0,0 +1,110 @@
+# query_budget.py
+"""Per-route SQL query budgets.
+
+Views declare how many statements they may issue with `@query_budget(n)`
+(placed directly under the route decorator). Counting hooks SQLAlchemy's
+`before_cursor_execute`, so every statement on any engine is seen, including
+lazy loads triggered while the template renders.
+
+QUERY_BUDGET_MODE controls enforcement: 'off' (default), 'warn' (log and count
+in /metrics) or 'raise' (fail the request; meant for tests and staging).
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, endpoint, budget, statements):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.statements = statements
+        super().__init__(f"{endpoint} issued {len(statements)} queries (budget {budget})")
+
+
+class QueryCounter:
+    """Collects the SQL statements executed on the current thread while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Context manager yielding a QueryCounter for the statements run inside the block."""
+    counter = QueryCounter()
+    counters = _local.__dict__.setdefault('counters', [])
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+def query_budget(max_queries):
+    """Declares the maximum number of SQL statements a view may issue per request."""
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+def budget_for(app, endpoint):
+    view = app.view_functions.get(endpoint)
+    return getattr(view, 'query_budget', None)
+
+
+def init_app(app):
+    app.config.setdefault('QUERY_BUDGET_MODE', 'off')
+    if app.config['QUERY_BUDGET_MODE'] == 'off':
+        return
+
+    @app.before_request
+    def _start_query_counter():
+        if budget_for(app, request.endpoint) is None:
+            return
+        g._query_counter_cm = count_queries()
+        g._query_counter = g._query_counter_cm.__enter__()
+
+    @app.after_request
+    def _check_query_budget(response):
+        counter = g.pop('_query_counter', None)
+        if counter is None:
+            return response
+        g.pop('_query_counter_cm').__exit__(None, None, None)
+
+        budget = budget_for(app, request.endpoint)
+        if counter.count <= budget:
+            return response
+        metrics.inc('campus_query_budget_exceeded_total', help_text='Requests that exceeded their SQL query budget.',
+                    endpoint=request.endpoint)
+        if app.config['QUERY_BUDGET_MODE'] == 'raise':
+            raise QueryBudgetExceeded(request.endpoint, budget, counter.statements)
+        logger.warning("%s issued %d queries (budget %d)", request.endpoint, counter.count, budget)
+        return response
+
+    @app.teardown_request
+    def _release_query_counter(exc):
+        cm = g.pop('_query_counter_cm', None)
+        if cm is not None:
+            cm.__exit__(None, None, None)
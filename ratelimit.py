@@ -0,0 +1,203 @@
+# ratelimit.py
+"""Token-bucket rate limiting for the auth, booking and RSVP endpoints.
+
+`@rate_limit('login')` applies the buckets configured in RATELIMITS['login'],
+e.g. {'ip': '30/minute', 'username': '10/minute'}: one bucket per client IP
+and one per submitted username, each holding up to N tokens and refilling at
+N per period. Every request takes a token from each of its buckets; with any
+bucket empty it is rejected with 429 and a Retry-After header.
+
+Only POSTs are limited, and the check runs before the view, so a rejected
+request costs no database query and no password hash. A view can call
+refund() to give its tokens back, e.g. login() on success, so that only
+failed attempts count and many students behind one NAT address can still
+log in. Keys come from the
+request itself: the remote address, the form's username field, and the user
+id in Flask-Login's session cookie (not the database).
+
+Buckets live in process memory by default, so each gunicorn worker limits on
+its own. Set RATELIMIT_STORAGE_URL to a redis:// URL to share them across
+workers and hosts. If Redis is unreachable, requests are let through.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request, session
+from werkzeug.exceptions import TooManyRequests
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+# Least recently used buckets are dropped past this many keys; a dropped bucket is simply full again
+MAX_MEMORY_KEYS = 100_000
+
+
+def parse_limit(limit):
+    """'30/minute' -> (capacity 30, refill rate 0.5 tokens per second)."""
+    try:
+        count, period = limit.split('/')
+        capacity, seconds = int(count), PERIODS[period.strip()]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{limit}'; expected e.g. '30/minute'.") from None
+    return capacity, capacity / seconds
+
+
+class MemoryStore:
+    """Buckets in a dict, shared by the threads of one process."""
+
+    def __init__(self, max_keys=MAX_MEMORY_KEYS, clock=time.monotonic):
+        self._buckets = OrderedDict()  # key -> (tokens, updated at)
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+        self._clock = clock
+
+    def take(self, key, capacity, rate):
+        """Takes a token from the bucket; returns 0 if allowed, else seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def refund(self, key, capacity):
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + 1), updated)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Same algorithm as MemoryStore.take, atomically in Redis with the server's clock
+_TAKE_SCRIPT = """
+local capacity, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1))) end
+"""
+
+
+class RedisStore:
+    """Buckets in Redis, shared by every worker that uses the same URL."""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis  # Only needed with RATELIMIT_STORAGE_URL; keep it optional
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._refund = self._client.register_script(_REFUND_SCRIPT)
+        self._prefix = prefix
+
+    def take(self, key, capacity, rate):
+        try:
+            return float(self._take(keys=[self._prefix + key], args=[capacity, rate]))
+        except Exception:
+            logger.warning("Rate limit store unavailable; allowing request", exc_info=True)
+            return 0.0
+
+    def refund(self, key, capacity):
+        try:
+            self._refund(keys=[self._prefix + key], args=[capacity])
+        except Exception:
+            logger.warning("Rate limit store unavailable; refund dropped", exc_info=True)
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + '*'):
+            self._client.delete(key)
+
+
+def _client_ip():
+    return request.remote_addr or 'unknown'
+
+
+def _username():
+    # Same normalisation as a lookup would need, so 'Alice' and ' alice' share a bucket
+    username = request.form.get('username') or (request.get_json(silent=True) or {}).get('username')
+    username = username.strip().lower() if isinstance(username, str) else ''
+    return username or None
+
+
+def _session_user():
+    return session.get('_user_id')
+
+
+KEY_FUNCTIONS = {'ip': _client_ip, 'username': _username, 'user': _session_user}
+
+
+def check(scope):
+    """Takes a token from each of `scope`'s buckets; raises TooManyRequests if one is empty."""
+    store = current_app.extensions['ratelimit']
+    waits = []
+    g._ratelimit_taken = taken = []
+    for kind, (capacity, rate) in current_app.extensions['ratelimit_buckets'][scope]:
+        value = KEY_FUNCTIONS[kind]()
+        if value is None:
+            continue
+        key = f'{scope}:{kind}:{value}'
+        waits.append(store.take(key, capacity, rate))
+        taken.append((key, capacity))
+    wait = max(waits, default=0)
+    if wait > 0:
+        logger.info("Rate limited %s from %s", scope, _client_ip())
+        retry_after = math.ceil(wait)
+        raise TooManyRequests(f'Too many requests. Please wait {retry_after} seconds and try again.',
+                              retry_after=retry_after)
+
+
+def refund():
+    """Returns the tokens this request took, for requests that should not count (e.g. a successful login)."""
+    store = current_app.extensions['ratelimit']
+    for key, capacity in g.pop('_ratelimit_taken', ()):
+        store.refund(key, capacity)
+
+
+def rate_limit(scope):
+    """Limits the view's POSTs with the buckets configured in RATELIMITS[scope]."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method == 'POST' and current_app.config['RATELIMIT_ENABLED']:
+                check(scope)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    # Parse the limits once, so a typo fails at startup rather than on the first POST
+    buckets = {}
+    for scope, limits in app.config['RATELIMITS'].items():
+        unknown = [kind for kind in limits if kind not in KEY_FUNCTIONS]
+        if unknown:
+            raise ValueError(f"RATELIMITS['{scope}']: unknown key(s) {', '.join(unknown)}; "
+                             f"expected {', '.join(KEY_FUNCTIONS)}.")
+        buckets[scope] = [(kind, parse_limit(limit)) for kind, limit in limits.items()]
+    app.extensions['ratelimit_buckets'] = buckets
+    url = app.config.get('RATELIMIT_STORAGE_URL')
+    app.extensions['ratelimit'] = RedisStore(url) if url else MemoryStore()
@@ -0,0 +1,288 @@
+# reminders.py
+"""Event reminder emails, sent at configured lead times before each event.
+
+Scheduling: when an event becomes Approved through an ORM write, a
+before_flush hook creates one event_reminder row per lead time in
+REMINDER_LEADS, due at the event's start minus the lead. If the date
+changes, the due times move with it, and reminders already sent for the old
+date are sent again if their new time is still ahead. If the event stops
+being Approved, its unsent reminders are deleted. The approval workflow
+(approvals.py) moves events with a Core UPDATE, which the hook never sees,
+and calls sync_events() for them instead.
+
+Dispatching happens in the process that holds the scheduler lease (see
+jobs.py): a priority queue (heap) of reminders due soon, and a thread that
+sleeps until the earliest one is due. Every REMINDER_POLL_SECONDS the
+send_reminders job loads the reminders due within the next two poll
+intervals, a range read on the (sent_at, due_at) index, so pending
+reminders further out are never touched. Reminders created in the leader
+process are queued on commit; ones created elsewhere less than a poll
+interval ahead can be up to REMINDER_POLL_SECONDS late.
+
+A reminder is claimed with a conditional UPDATE before its emails go out,
+so it is sent at most once even if two processes briefly both think they
+lead. If the mail server cannot be reached, the claim is released and the
+next poll tries again. When several of an event's reminders are due at once (e.g. an event
+approved an hour before it starts), one email covers them.
+"""
+import heapq
+import logging
+import re
+import threading
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import event as sa_event, inspect, update
+from sqlalchemy.orm import selectinload
+
+import jobs
+from extensions import db, mail, scheduler
+from instrumentation import metrics, timed
+from models import Event, EventReminder, Registration, User
+from replica import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+UNITS = {'m': 1, 'h': 60, 'd': 1440}
+LATENESS_BUCKETS = (0.01, 0.1, 1.0, 5.0, 30.0, 60.0, 300.0, 3600.0)
+
+
+def parse_leads(leads):
+    """'24h,1h' -> [1440, 60] (minutes, longest first)."""
+    minutes = set()
+    for lead in leads.split(','):
+        match = re.fullmatch(r'\s*(\d+)\s*([mhd])\s*', lead)
+        if not match or not int(match.group(1)):
+            raise ValueError(f"Invalid reminder lead '{lead.strip()}'; expected e.g. '24h', '90m' or '2d'.")
+        minutes.add(int(match.group(1)) * UNITS[match.group(2)])
+    return sorted(minutes, reverse=True)
+
+
+# --- Scheduling ---
+
+def _schedule_changed(session, target):
+    if target in session.new:
+        return True
+    state = inspect(target)
+    return state.attrs.status.history.has_changes() or state.attrs.date.history.has_changes()
+
+
+def sync_reminders(event, leads, now=None):
+    """Makes `event.reminders` match its status, date and the configured lead times."""
+    now = now or datetime.now()
+    existing = {reminder.minutes_before: reminder for reminder in event.reminders}
+    if event.status == 'Approved' and event.date is not None and event.date > now:
+        for minutes in leads:
+            due_at = event.date - timedelta(minutes=minutes)
+            reminder = existing.pop(minutes, None)
+            if reminder is None:
+                event.reminders.append(EventReminder(minutes_before=minutes, due_at=due_at))
+            elif reminder.due_at != due_at:
+                reminder.due_at = due_at
+                if reminder.sent_at is not None and due_at > now:
+                    reminder.sent_at = None  # rescheduled: remind again before the new date
+    # Not approved (any more), already over, or a lead that is no longer configured
+    for reminder in existing.values():
+        if reminder.sent_at is None:
+            event.reminders.remove(reminder)
+
+
+@sa_event.listens_for(RoutingSession, 'before_flush')
+def _sync_changed_events(db_session, flush_context, instances):
+    changed = [obj for obj in list(db_session.new) + list(db_session.dirty)
+               if isinstance(obj, Event) and _schedule_changed(db_session, obj)]
+    if changed:
+        leads = current_app.extensions['reminder_leads']
+        with db_session.no_autoflush:
+            for changed_event in changed:
+                sync_reminders(changed_event, leads)
+
+
+def sync_events(event_ids, now=None):
+    """Runs sync_reminders for events changed with a Core UPDATE, which the before_flush hook never sees."""
+    leads = current_app.extensions['reminder_leads']
+    events = db.session.scalars(db.select(Event).where(Event.id.in_(event_ids))
+                                .options(selectinload(Event.reminders))
+                                .execution_options(populate_existing=True))
+    for changed_event in events:
+        sync_reminders(changed_event, leads, now)
+
+
+@sa_event.listens_for(RoutingSession, 'after_flush')
+def _collect_pending(db_session, flush_context):
+    if _dispatcher is None:
+        return
+    pending = [obj for obj in list(db_session.new) + list(db_session.dirty)
+               if isinstance(obj, EventReminder) and obj.sent_at is None]
+    if pending:
+        db_session.info.setdefault('_reminders_pending', []).extend((obj.due_at, obj.id) for obj in pending)
+
+
+@sa_event.listens_for(RoutingSession, 'after_commit')
+def _queue_pending(db_session):
+    pending = db_session.info.pop('_reminders_pending', None)
+    if pending and _dispatcher is not None and jobs.is_leader():
+        _dispatcher.offer(pending)
+
+
+@sa_event.listens_for(RoutingSession, 'after_rollback')
+def _discard_pending(db_session):
+    db_session.info.pop('_reminders_pending', None)
+
+
+# --- Sending ---
+
+def _reminder_message(event, username, email):
+    msg = Message(f"Reminder: Upcoming Event - {event.name}", recipients=[email])
+    msg.body = f"""Hello {username},
+
+This is a friendly reminder for the upcoming event: {event.name}!
+
+Event Details:
+Name: {event.name}
+Date: {event.date.strftime('%A, %B %d, %Y at %I:%M %p')}
+Location: {event.location}
+
+We look forward to seeing you there!
+
+Best regards,
+The Campus Event Manager Team
+"""
+    return msg
+
+
+def send_reminder(reminder_id, now=None):
+    """Sends a due reminder; returns None when done, or its due time if it was moved later."""
+    now = now or datetime.now()
+    reminder = db.session.get(EventReminder, reminder_id)
+    if reminder is None or reminder.sent_at is not None:
+        return None
+    if reminder.due_at > now:
+        return reminder.due_at
+    event = reminder.event
+    # Claim every reminder of this event that is due, so one email covers them
+    was_reminded = event.reminder_sent
+    claimed = db.session.execute(
+        update(EventReminder)
+        .where(EventReminder.event_id == event.id, EventReminder.sent_at.is_(None), EventReminder.due_at <= now)
+        .values(sent_at=now).execution_options(synchronize_session=False)).rowcount
+    event.reminder_sent = True
+    db.session.commit()
+    if not claimed or event.date <= now:
+        return None  # another process got it, or the event already started
+
+    attendees = db.session.execute(
+        db.select(User.username, User.email).join(Registration, Registration.user_id == User.id)
+        .where(Registration.event_id == event.id, User.email.is_not(None))).all()
+    sent = 0
+    if attendees:
+        with ExitStack() as stack:
+            try:
+                connection = stack.enter_context(mail.connect())  # one SMTP session per event
+            except Exception as e:
+                # Nothing was sent: release the claim so the next poll retries the event
+                db.session.execute(
+                    update(EventReminder)
+                    .where(EventReminder.event_id == event.id, EventReminder.sent_at == now)
+                    .values(sent_at=None).execution_options(synchronize_session=False))
+                event.reminder_sent = was_reminded
+                db.session.commit()
+                logger.warning("Could not connect to the mail server for the reminders of event %s; "
+                               "will retry: %s", event.name, e)
+                return None
+            for username, email in attendees:
+                try:
+                    with timed('smtp'):
+                        connection.send(_reminder_message(event, username, email))
+                    sent += 1
+                except Exception as e:
+                    logger.warning("Failed to send reminder email to %s for event %s: %s", email, event.name, e)
+    logger.info("Sent reminders for event %s to %d attendees.", event.name, sent)
+    metrics.inc('campus_reminder_emails_total', sent, help_text='Event reminder emails sent.')
+    metrics.observe('campus_reminder_lateness_seconds', (datetime.now() - reminder.due_at).total_seconds(),
+                    buckets=LATENESS_BUCKETS, help_text='Delay between a reminder falling due and being sent.')
+    return None
+
+
+class Dispatcher(threading.Thread):
+    """Sends each queued reminder when it falls due, earliest first."""
+
+    def __init__(self, app):
+        super().__init__(name='reminder-dispatcher', daemon=True)
+        self.app = app
+        self._heap = []      # (due_at, reminder id)
+        self._queued = set()
+        self._condition = threading.Condition()
+
+    def offer(self, reminders):
+        """Queues (due_at, reminder id) pairs; ones already queued are ignored."""
+        with self._condition:
+            for due_at, reminder_id in reminders:
+                if reminder_id not in self._queued:
+                    self._queued.add(reminder_id)
+                    heapq.heappush(self._heap, (due_at, reminder_id))
+            self._condition.notify()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def run(self):
+        while True:
+            with self._condition:
+                while True:
+                    wait = (self._heap[0][0] - datetime.now()).total_seconds() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                _, reminder_id = heapq.heappop(self._heap)
+                self._queued.discard(reminder_id)
+            if not jobs.is_leader():
+                with self._condition:
+                    self._heap.clear()
+                    self._queued.clear()
+                continue
+            with self.app.app_context():
+                try:
+                    moved_to = send_reminder(reminder_id)
+                except Exception:
+                    logger.exception("Reminder %s failed", reminder_id)
+                    db.session.rollback()
+                    continue
+            if moved_to is not None:
+                self.offer([(moved_to, reminder_id)])
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def dispatcher(app):
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher(app)
+            _dispatcher.start()
+    return _dispatcher
+
+
+def queue_due_reminders(app, now=None):
+    """Queues every unsent reminder due within two poll intervals; returns how many are queued."""
+    now = now or datetime.now()
+    horizon = now + timedelta(seconds=2 * app.config['REMINDER_POLL_SECONDS'])
+    rows = db.session.execute(db.select(EventReminder.due_at, EventReminder.id)
+                              .where(EventReminder.sent_at.is_(None), EventReminder.due_at < horizon)).all()
+    queue = dispatcher(app)
+    queue.offer(rows)
+    return len(queue)
+
+
+def scheduled_send():
+    with scheduler.app.app_context():
+        queue_due_reminders(scheduler.app)
+
+
+def init_app(app):
+    # Parse once, so a typo fails at startup rather than on the first approval
+    app.extensions['reminder_leads'] = parse_leads(app.config['REMINDER_LEADS'])
@@ -0,0 +1,60 @@
+# replica.py
+"""Read-replica routing for db.session.
+
+Views decorated with `@use_replica` read from the 'replica' bind
+(REPLICA_DATABASE_URL) when one is configured. Everything else, including any
+statement issued after the session has flushed a write, goes to the primary.
+
+Read-your-writes: a request that writes pins the user's session cookie to the
+primary for REPLICA_STICKY_SECONDS, so e.g. the redirect from
+register_for_event to my_event_registrations sees the new registration even if
+the replica is behind.
+"""
+import time
+from functools import wraps
+
+from flask import g, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+_PIN_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        is_write = clause is not None and getattr(clause, 'is_dml', False)
+        if bind is None and not is_write and not self._flushing and _replica_allowed():
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _replica_allowed():
+    return has_request_context() and g.get('_use_replica', False) and not g.get('_db_wrote', False)
+
+
+def use_replica(f):
+    """Routes the view's reads to the replica unless the user recently wrote."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._use_replica = session.get(_PIN_KEY, 0) < time.time()
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(db_session, flush_context):
+    if has_request_context():
+        g._db_wrote = True
+
+
+def init_app(app):
+    app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+
+    @app.after_request
+    def _pin_to_primary(response):
+        if g.get('_db_wrote') and REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+            session[_PIN_KEY] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
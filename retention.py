@@ -0,0 +1,106 @@
+# retention.py
+"""Notification retention: archiving old read notifications, and paging a
+user's history across the live and archive tables.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are moved from
+`notification` to the narrower `notification_archive` table, which keeps the
+live table (and the unread count and first page of notifications that every
+page view pays for) small. Unread notifications are never archived.
+
+Rows are moved in batches of NOTIFICATION_ARCHIVE_BATCH_SIZE: each batch is
+an INSERT ... SELECT and a DELETE by primary key in its own short
+transaction, so write locks are held for one batch at a time, with a pause
+of NOTIFICATION_ARCHIVE_PAUSE_SECONDS between batches for other writers. A
+run that stops halfway leaves every row in exactly one of the two tables.
+The job runs every NOTIFICATION_ARCHIVE_INTERVAL_SECONDS and via
+`flask archive-notifications`.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert
+
+from extensions import db, scheduler
+from models import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = ('id', 'user_id', 'message', 'timestamp', 'notification_type', 'related_id')
+
+
+def archive_batch(cutoff, batch_size):
+    """Moves up to `batch_size` read notifications older than `cutoff` to the archive; returns how many."""
+    ids = db.session.scalars(db.select(Notification.id).filter_by(is_read=True)
+                             .where(Notification.timestamp < cutoff)
+                             .order_by(Notification.id).limit(batch_size)).all()
+    if not ids:
+        return 0
+    columns = [getattr(Notification, name) for name in ARCHIVED_COLUMNS]
+    db.session.execute(insert(NotificationArchive).from_select(
+        ARCHIVED_COLUMNS, db.select(*columns).where(Notification.id.in_(ids))))
+    db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def archive_notifications(retention_days=None, batch_size=None, pause=None, now=None):
+    """Archives every read notification past the retention period, batch by batch; returns how many."""
+    config = current_app.config
+    retention_days = config['NOTIFICATION_RETENTION_DAYS'] if retention_days is None else retention_days
+    if not retention_days:
+        return 0
+    batch_size = batch_size or config['NOTIFICATION_ARCHIVE_BATCH_SIZE']
+    pause = config['NOTIFICATION_ARCHIVE_PAUSE_SECONDS'] if pause is None else pause
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+        time.sleep(pause)
+
+
+def scheduled_archive():
+    with scheduler.app.app_context():
+        started = datetime.now()
+        archived = archive_notifications()
+        logger.info("Archived %d notifications in %.2fs", archived, (datetime.now() - started).total_seconds())
+
+
+# --- History ---
+
+@dataclass
+class NotificationPage:
+    items: list
+    # Pass as ?before= for the next (older) page; None on the last page
+    next_before: int | None
+
+
+def notification_history(user_id, before=None, per_page=20):
+    """One page of a user's notifications, newest first, from the live and archive tables.
+
+    Keyset pagination on id: each table is read through its (user_id, id)
+    index for at most per_page + 1 rows, and the two are merged.
+    """
+    rows = []
+    for model in (Notification, NotificationArchive):
+        stmt = db.select(model).filter_by(user_id=user_id)
+        if before is not None:
+            stmt = stmt.where(model.id < before)
+        rows += db.session.scalars(stmt.order_by(model.id.desc()).limit(per_page + 1)).all()
+    rows.sort(key=lambda row: row.id, reverse=True)
+    items = rows[:per_page]
+    return NotificationPage(items, items[-1].id if len(rows) > per_page else None)
+
+
+def init_app(app):
+    @app.cli.command('archive-notifications')
+    def archive_notifications_command():
+        """Move read notifications past NOTIFICATION_RETENTION_DAYS to the archive table."""
+        archived = archive_notifications()
+        print(f"Archived {archived} notifications.")
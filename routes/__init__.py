@@ -0,0 +1,25 @@
+# routes/__init__.py
+from payments import FakeProvider
+from routes.auth import bp as auth_bp
+from routes.admin import bp as admin_bp
+from routes.events import bp as events_bp
+from routes.bookings import bp as bookings_bp
+from routes.notifications import bp as notifications_bp
+from routes.metrics import bp as metrics_bp
+from routes.calendar import bp as calendar_bp
+from routes.payments import bp as payments_bp, fake_bp as fake_payments_bp
+from routes.api import bp as api_bp
+
+
+def register_blueprints(app):
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(bookings_bp)
+    app.register_blueprint(notifications_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(calendar_bp)
+    app.register_blueprint(payments_bp)
+    if isinstance(app.extensions.get('payment_provider'), FakeProvider):
+        app.register_blueprint(fake_payments_bp)
+    app.register_blueprint(api_bp)
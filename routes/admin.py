@@ -0,0 +1,313 @@
+# routes/admin.py
+import os
+from datetime import datetime, UTC
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort, Response, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+
+import analytics
+import dashboard
+import exports
+import importer
+from accounts import DuplicateUserError, create_user, show_duplicate_errors
+from extensions import db
+from query_budget import query_budget
+from replica import use_replica
+from decorators import admin_required
+from forms import CreateStaffForm, HallForm, BusForm, ImportForm
+from helpers import create_notification, generate_qr_code_base64, generate_pdf_from_template
+from models import User, Event, Hall, HallBooking, Bus, BusBooking
+
+bp = Blueprint('admin', __name__)
+
+# The booking tables render one column from each related row, so those rows are
+# joined into the main query and trimmed to that column instead of lazy-loaded per row.
+# (Built on call: the backref attributes only exist once the mappers are configured.)
+def hall_booking_table_options():
+    return (
+        joinedload(HallBooking.hall).load_only(Hall.name),
+        joinedload(HallBooking.requester).load_only(User.username),
+        joinedload(HallBooking.processor).load_only(User.username),
+    )
+
+def bus_booking_table_options():
+    return (
+        joinedload(BusBooking.bus).load_only(Bus.identifier),
+        joinedload(BusBooking.requester).load_only(User.username),
+        joinedload(BusBooking.processor).load_only(User.username),
+    )
+
+
+# --- Admin Routes ---
+@bp.route('/admin/dashboard')
+@query_budget(7)
+@use_replica
+@login_required
+@admin_required
+def admin_dashboard():
+    my_events = Event.query.filter_by(created_by=current_user.id).order_by(Event.date.desc()).all()
+    # Stats come from the precomputed rollup tables, not from aggregating the base tables
+    stats = analytics.dashboard_summary(current_app.config['HALL_HOURS_PER_WEEK'])
+    return render_template('admin_dashboard.html', my_events=my_events, stats=stats)
+
+@bp.route('/admin/analytics/<rollup>.csv')
+@use_replica
+@login_required
+@admin_required
+def admin_export_analytics(rollup):
+    if rollup not in analytics.EXPORTS:
+        abort(404)
+    return Response(stream_with_context(analytics.export_csv(rollup)), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=analytics_{rollup}.csv'})
+
+@bp.route('/admin/create_staff', methods=['GET', 'POST'])
+@query_budget(3)
+@login_required
+@admin_required
+def admin_create_staff():
+    form = CreateStaffForm()
+    if form.validate_on_submit():
+        try:
+            new_staff = create_user(form.username.data, form.email.data, form.password.data, form.role.data)
+        except DuplicateUserError as e:
+            show_duplicate_errors(form, e)
+        else:
+            flash(f'Staff account for {new_staff.username} ({new_staff.role}) created successfully!', 'success')
+            return redirect(url_for('admin.admin_dashboard'))
+    return render_template('create_staff.html', title='Create Staff Account', form=form)
+
+@bp.route('/admin/halls', methods=['GET', ' POST'])
+@query_budget(4)
+@login_required
+@admin_required
+def admin_manage_halls():
+    form = HallForm()
+    if form.validate_on_submit():
+        existing_hall = Hall.query.filter_by(name=form.name.data).first()
+        if existing_hall:
+            flash(f"A hall with the name '{form.name.data}' already exists.", 'warning')
+        else:
+            new_hall = Hall(
+                name=form.name.data,
+                capacity=form.capacity.data,
+                location_details=form.location_details.data
+            )
+            db.session.add(new_hall)
+            db.session.commit()
+            flash(f"Hall '{new_hall.name}' added successfully!", 'success')
+            return redirect(url_for('admin.admin_manage_halls'))
+    halls = Hall.query.order_by(Hall.name).all()
+    return render_template('admin_halls.html', halls=halls, form=form)
+
+
+@bp.route('/admin/buses', methods=['GET', 'POST'])
+@query_budget(4)
+@login_required
+@admin_required
+def admin_manage_buses():
+    form = BusForm()
+    if form.validate_on_submit():
+        existing_bus = Bus.query.filter_by(identifier=form.identifier.data).first()
+        if existing_bus:
+            flash(f"A bus with the identifier '{form.identifier.data}' already exists.", 'warning')
+        else:
+            new_bus = Bus(
+                identifier=form.identifier.data,
+                capacity=form.capacity.data,
+                driver_contact=form.driver_contact.data,
+                route_details=form.route_details.data
+            )
+            db.session.add(new_bus)
+            db.session.commit()
+            flash(f"Bus '{new_bus.identifier}' added successfully!", 'success')
+            return redirect(url_for('admin.admin_manage_buses'))
+    buses = Bus.query.order_by(Bus.identifier).all()
+    return render_template('admin_buses.html', buses=buses, form=form)
+
+
+@bp.route('/admin/hall_bookings', methods=['GET'])
+@query_budget(5)
+@login_required
+@admin_required
+def admin_manage_hall_bookings():
+    pending_bookings = HallBooking.query.options(*hall_booking_table_options()).filter_by(status='Pending').order_by(HallBooking.requested_date, HallBooking.start_time).all()
+    processed_bookings = HallBooking.query.options(*hall_booking_table_options()).filter(HallBooking.status != 'Pending').order_by(HallBooking.processed_timestamp.desc(), HallBooking.requested_date.desc()).all()
+    return render_template('admin_manage_hall_bookings.html', pending_bookings=pending_bookings, processed_bookings=processed_bookings)
+
+@bp.route('/admin/hall_booking/approve/<int:booking_id>', methods=['POST'])
+@login_required
+@admin_required
+def admin_approve_hall_booking(booking_id):
+    booking = HallBooking.query.get_or_404(booking_id)
+    if booking.status == 'Pending':
+        booking.status = 'Approved'
+        booking.processed_by_admin_id = current_user.id
+        booking.processed_timestamp = datetime.now(UTC)
+        db.session.commit()
+        flash(f"Booking ID {booking.id} for '{booking.hall.name}' has been approved.", 'success')
+        # Notify the student who made the booking
+        create_notification(booking.student_id, f"Your hall booking for '{booking.hall.name}' on {booking.requested_date.strftime('%Y-%m-%d')} has been APPROVED!", 'booking_status_update', booking.id) #cite: uploaded:app.py
+    else:
+        flash(f"Booking ID {booking.id} is not in 'Pending' state.", 'warning')
+    return redirect(url_for('admin.admin_manage_hall_bookings'))
+
+@bp.route('/admin/hall_booking/reject/<int:booking_id>', methods=['POST'])
+@login_required
+@admin_required
+def admin_reject_hall_booking(booking_id):
+    booking = HallBooking.query.get_or_404(booking_id)
+    if booking.status == 'Pending':
+        booking.status = 'Rejected'
+        booking.processed_by_admin_id = current_user.id
+        booking.processed_timestamp = datetime.now(UTC)
+        booking.admin_remarks = request.form.get('admin_remarks', "Rejected by Admin")
+        db.session.commit()
+        flash(f"Booking ID {booking.id} for '{booking.hall.name}' has been rejected.", 'success')
+        # Notify the student who made the booking
+        create_notification(booking.student_id, f"Your hall booking for '{booking.hall.name}' on {booking.requested_date.strftime('%Y-%m-%d')} has been REJECTED. Remarks: {booking.admin_remarks}", 'booking_status_update', booking.id) #cite: uploaded:app.py
+    else:
+        flash(f"Booking ID {booking.id} is not in 'Pending' state.", 'warning')
+    return redirect(url_for('admin.admin_manage_hall_bookings'))
+
+# --- Bulk Import ---
+@bp.route('/admin/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def admin_import():
+    form = ImportForm()
+    result = None
+    if form.validate_on_submit():
+        kind = form.kind.data
+        try:
+            result = importer.import_csv(
+                kind,
+                importer.open_upload(form.file.data),
+                chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+                extra_values=importer.event_defaults(current_user.id) if kind == 'events' else None,
+                hash_workers=1  # no process pool inside a web worker; see `flask import-csv`
+            )
+        except importer.ImportFileError as e:
+            flash(str(e), 'danger')
+        else:
+            summary = (f"Imported {kind}: {result.inserted} added, {result.updated} updated, "
+                       f"{result.unchanged} unchanged, {len(result.errors)} rows with errors.")
+            flash(summary, 'warning' if result.errors else 'success')
+    return render_template('admin_import.html', title='Bulk Import', form=form, result=result, specs=importer.SPECS)
+
+# --- Data Exports ---
+@bp.route('/admin/export')
+@login_required
+@admin_required
+def admin_export_form():
+    datasets = {name: exports.get_dataset(name) for name in exports.DATASET_NAMES}
+    return render_template('admin_export.html', title='Export Data', datasets=datasets)
+
+@bp.route('/admin/export/<dataset_name>')
+@use_replica
+@login_required
+@admin_required
+def admin_export(dataset_name):
+    dataset = exports.get_dataset(dataset_name)
+    if dataset is None:
+        abort(404)
+    try:
+        keys, date_from, date_to, event_id = exports.parse_export_args(dataset, request.args)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.admin_export_form'))
+
+    header = [dataset.columns[key][0] for key in keys]
+    # Rows are fetched in batches while the response is being sent
+    result = db.session.execute(exports.export_statement(dataset, keys, date_from, date_to, event_id))
+    filename = f"{dataset_name}_{datetime.now(UTC).strftime('%Y%m%d')}"
+    if request.args.get('format') == 'xlsx':
+        try:
+            path = exports.write_xlsx(dataset.title, header, result)
+        except exports.ExportTooLarge as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('admin.admin_export_form'))
+        return Response(exports.stream_file(path),
+                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                        headers={'Content-Disposition': f'attachment; filename={filename}.xlsx'})
+    return Response(stream_with_context(exports.stream_csv(header, result)), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
+
+# --- Admin Bus Bookings ---
+@bp.route('/admin/bus_bookings', methods=['GET'])
+@query_budget(5)
+@login_required
+@admin_required
+def admin_manage_bus_bookings():
+    pending_bookings = BusBooking.query.options(*bus_booking_table_options()).filter_by(status='Pending').order_by(BusBooking.requested_date, BusBooking.pickup_time).all()
+    processed_bookings = BusBooking.query.options(*bus_booking_table_options()).filter(BusBooking.status != 'Pending').order_by(BusBooking.processed_timestamp.desc(), BusBooking.requested_date.desc()).all()
+    return render_template('admin_manage_bus_bookings.html', pending_bookings=pending_bookings, processed_bookings=processed_bookings)
+
+@bp.route('/admin/bus_booking/approve/<int:booking_id>', methods=['POST'])
+@login_required
+@admin_required
+def admin_approve_bus_booking(booking_id):
+    booking = BusBooking.query.get_or_404(booking_id)
+    # Claim the booking with a conditional UPDATE and commit before rendering, so two admins approving
+    # at once don't both render, notify and commit, and the write lock isn't held during the render
+    claimed = db.session.execute(
+        update(BusBooking)
+        .where(BusBooking.id == booking_id, BusBooking.status == 'Pending')
+        .values(status='Approved', processed_by_admin_id=current_user.id, processed_timestamp=datetime.now(UTC))
+        .execution_options(synchronize_session=False)).rowcount
+    if claimed:
+        # The UPDATE bypasses the session hooks that maintain these
+        rollup = {'bus_id': booking.bus_id, 'requested_date': booking.requested_date,
+                  'number_of_passengers': booking.number_of_passengers}
+        analytics.record_bulk_update(db.session.connection(), BusBooking,
+                                     [(dict(rollup, status='Pending'), dict(rollup, status='Approved'))])
+        db.session.commit()
+        dashboard.invalidate(booking.student_id)
+
+        qr_data = f"Bus Booking ID: {booking.id}\nPassenger: {booking.requester.username}\nBus: {booking.bus.identifier}\nDate: {booking.requested_date.strftime('%Y-%m-%d')}"
+        qr_code_base64 = generate_qr_code_base64(qr_data)
+
+        ticket_filename = f"bus_ticket_{booking.id}.pdf"
+        ticket_path = generate_pdf_from_template(
+            'bus_ticket_template.html',
+            ticket_filename,
+            context={
+                'booking': booking,
+                'qr_code_base64': qr_code_base64,
+                'now': datetime.now(UTC)
+            }
+        )
+
+        if ticket_path:
+            booking.certificate_path = os.path.relpath(ticket_path, current_app.root_path) # Store path relative to app root
+            booking.certificate_generated_at = datetime.now(UTC)
+            db.session.commit()
+            flash(f"Bus ticket generated at {ticket_path}", 'info')
+        else:
+            flash("Failed to generate bus ticket PDF.", 'danger')
+
+        flash(f"Bus Booking ID {booking.id} for '{booking.bus.identifier if booking.bus else 'N/A'}' has been approved.", 'success')
+        # Notify the student who made the booking
+        create_notification(booking.student_id, f"Your bus booking for '{booking.bus.identifier if booking.bus else 'N/A'}' on {booking.requested_date.strftime('%Y-%m-%d')} has been APPROVED! Your ticket is now available.", 'booking_status_update', booking.id)
+    else:
+        flash(f"Bus Booking ID {booking.id} is not in 'Pending' state.", 'warning')
+    return redirect(url_for('admin.admin_manage_bus_bookings'))
+
+@bp.route('/admin/bus_booking/reject/<int:booking_id>', methods=['POST'])
+@login_required
+@admin_required
+def admin_reject_bus_booking(booking_id):
+    booking = BusBooking.query.get_or_404(booking_id)
+    if booking.status == 'Pending':
+        booking.status = 'Rejected'
+        booking.processed_by_admin_id = current_user.id
+        booking.processed_timestamp = datetime.now(UTC)
+        booking.admin_remarks = request.form.get('admin_remarks', "Rejected by Admin")
+        db.session.commit()
+        flash(f"Bus Booking ID {booking.id} for '{booking.bus.identifier if booking.bus else 'N/A'}' has been rejected.", 'success')
+        # Notify the student who made the booking
+        create_notification(booking.student_id, f"Your bus booking for '{booking.bus.identifier if booking.bus else 'N/A'}' on {booking.requested_date.strftime('%Y-%m-%d')} has been REJECTED. Remarks: {booking.admin_remarks}", 'booking_status_update', booking.id)
+    else:
+        flash(f"Bus Booking ID {booking.id} is not in 'Pending' state.", 'warning')
+    return redirect(url_for('admin.admin_manage_bus_bookings'))
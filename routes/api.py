@@ -0,0 +1,292 @@
+# routes/api.py
+"""Versioned JSON API for the mobile app and kiosks, under /api/v1.
+
+Clients POST a username and password to /api/v1/tokens and send the
+returned access token as `Authorization: Bearer <token>`. The token carries
+the user's id and role, so authenticated requests don't load the user.
+Lists take ?fields=, ?limit= and ?cursor= (see serializers.py) and answer
+{"data": [...], "next_cursor": ...}; errors answer {"error": ...}.
+"""
+import gzip
+from datetime import datetime
+
+import orjson
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func
+from werkzeug.exceptions import BadRequest, HTTPException
+
+import dashboard
+from extensions import csrf, db, jwt
+from models import Bus, BusBooking, Event, EventStats, Hall, HallBooking, Notification, Registration, User
+from query_budget import query_budget
+from ratelimit import rate_limit, refund
+from replica import use_replica
+from serializers import Schema, json_response, page_limit
+from statuses import BOOKING_STATUS
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+csrf.exempt(bp)  # token auth: there is no session cookie to forge requests with
+
+
+def _event_column(column):
+    return db.select(column).where(Event.id == Registration.event_id).scalar_subquery()
+
+
+EVENT = Schema({
+    'id': Event.id,
+    'name': Event.name,
+    'description': Event.description,
+    'date': Event.date,
+    'location': Event.location,
+    'price': Event.price,
+    'capacity': Event.capacity,
+    'registrations': func.coalesce(db.select(EventStats.registrations)
+                                   .where(EventStats.event_id == Event.id).scalar_subquery(), 0),
+}, order=(Event.date, Event.id), default=('id', 'name', 'date', 'location', 'price', 'capacity'))
+
+REGISTRATION = Schema({
+    'id': Registration.id,
+    'event_id': Registration.event_id,
+    'event_name': _event_column(Event.name),
+    'event_date': _event_column(Event.date),
+    'user_id': Registration.user_id,
+    'registration_date': Registration.registration_date,
+    'ticket_id': Registration.ticket_id,
+    'payment_status': Registration.payment_status,
+}, order=(Registration.id,), descending=True)
+
+HALL = Schema({
+    'id': Hall.id,
+    'name': Hall.name,
+    'capacity': Hall.capacity,
+    'location_details': Hall.location_details,
+}, order=(Hall.id,))
+
+BUS = Schema({
+    'id': Bus.id,
+    'identifier': Bus.identifier,
+    'capacity': Bus.capacity,
+    'driver_contact': Bus.driver_contact,
+    'route_details': Bus.route_details,
+}, order=(Bus.id,))
+
+HALL_BOOKING = Schema({
+    'id': HallBooking.id,
+    'hall_id': HallBooking.hall_id,
+    'hall_name': db.select(Hall.name).where(Hall.id == HallBooking.hall_id).scalar_subquery(),
+    'student_id': HallBooking.student_id,
+    'event_id': HallBooking.event_id,
+    'requested_date': HallBooking.requested_date,
+    'start_time': HallBooking.start_time,
+    'end_time': HallBooking.end_time,
+    'purpose': HallBooking.purpose,
+    'status': HallBooking.status,
+    'admin_remarks': HallBooking.admin_remarks,
+}, order=(HallBooking.id,), descending=True,
+   default=('id', 'hall_id', 'hall_name', 'requested_date', 'start_time', 'end_time', 'status'))
+
+BUS_BOOKING = Schema({
+    'id': BusBooking.id,
+    'bus_id': BusBooking.bus_id,
+    'bus_identifier': db.select(Bus.identifier).where(Bus.id == BusBooking.bus_id).scalar_subquery(),
+    'student_id': BusBooking.student_id,
+    'event_id': BusBooking.event_id,
+    'requested_date': BusBooking.requested_date,
+    'pickup_time': BusBooking.pickup_time,
+    'pickup_location': BusBooking.pickup_location,
+    'destination': BusBooking.destination,
+    'number_of_passengers': BusBooking.number_of_passengers,
+    'purpose': BusBooking.purpose,
+    'status': BusBooking.status,
+    'admin_remarks': BusBooking.admin_remarks,
+}, order=(BusBooking.id,), descending=True,
+   default=('id', 'bus_id', 'bus_identifier', 'requested_date', 'pickup_time', 'pickup_location',
+            'destination', 'status'))
+
+NOTIFICATION = Schema({
+    'id': Notification.id,
+    'message': Notification.message,
+    'timestamp': Notification.timestamp,
+    'is_read': Notification.is_read,
+    'type': Notification.notification_type,
+    'related_id': Notification.related_id,
+}, order=(Notification.id,), descending=True)
+
+
+def _user_id():
+    return int(get_jwt_identity())
+
+
+def _is_admin():
+    return get_jwt().get('role') == 'admin'
+
+
+def _list(schema, statement_for):
+    """Answers a page of `statement_for(select)` with the requested fields."""
+    names = schema.requested_fields()
+    page = schema.page(statement_for(schema.select(names)), names, page_limit())
+    return json_response({'data': page.items, 'next_cursor': page.next_cursor})
+
+
+def _booking_status():
+    status = request.args.get('status')
+    if status is not None and status not in BOOKING_STATUS.codes:
+        raise BadRequest(f"Unknown status {status!r}; expected one of {', '.join(BOOKING_STATUS.codes)}")
+    return status
+
+
+# --- Responses ---
+
+@bp.after_request
+def _compress(response):
+    config = current_app.config
+    if (response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.content_length is None or response.content_length < config['API_GZIP_MIN_BYTES']):
+        return response
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=config['API_GZIP_LEVEL']))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@bp.errorhandler(HTTPException)
+def _http_error(error):
+    response = error.get_response()  # keeps headers such as Retry-After
+    response.set_data(orjson.dumps({'error': error.description}))
+    response.mimetype = 'application/json'
+    return response
+
+
+@jwt.unauthorized_loader
+@jwt.invalid_token_loader
+def _token_missing_or_invalid(reason):
+    return json_response({'error': reason}, 401)
+
+
+@jwt.expired_token_loader
+def _token_expired(jwt_header, jwt_payload):
+    return json_response({'error': 'Token has expired'}, 401)
+
+
+# --- Authentication ---
+
+@bp.route('/tokens', methods=['POST'])
+@query_budget(2)
+@rate_limit('login')
+def create_token():
+    data = request.get_json(silent=True) or request.form
+    username, password = data.get('username'), data.get('password')
+    if not isinstance(username, str) or not isinstance(password, str):
+        raise BadRequest('username and password are required')
+    user = db.session.scalar(db.select(User).filter_by(username=username))
+    if user is None or not user.check_password(password):
+        return json_response({'error': 'Invalid username or password'}, 401)
+    refund()  # only failed attempts count towards the login limits
+    if user.upgrade_password_hash(password):
+        db.session.commit()
+    token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+    return json_response({'access_token': token, 'token_type': 'Bearer',
+                          'expires_in': int(current_app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())}, 201)
+
+
+# --- Public catalogue: approved events, halls and buses ---
+
+@bp.route('/events')
+@query_budget(1)
+@use_replica
+def list_events():
+    def statement(select):
+        select = select.where(Event.status == 'Approved')
+        if request.args.get('upcoming') == '1':
+            select = select.where(Event.date >= datetime.now())
+        return select
+    return _list(EVENT, statement)
+
+@bp.route('/events/<int:event_id>')
+@query_budget(1)
+@use_replica
+def event_details(event_id):
+    names = EVENT.requested_fields()
+    return json_response(EVENT.one(EVENT.select(names).where(Event.id == event_id, Event.status == 'Approved'), names))
+
+@bp.route('/halls')
+@query_budget(1)
+@use_replica
+def list_halls():
+    return _list(HALL, lambda select: select)
+
+@bp.route('/buses')
+@query_budget(1)
+@use_replica
+def list_buses():
+    return _list(BUS, lambda select: select)
+
+
+# --- The caller's own records (admins: everyone's) ---
+# Not on the replica: API clients have no session to pin their reads to the primary after a write.
+
+@bp.route('/registrations')
+@query_budget(1)
+@jwt_required()
+def list_registrations():
+    def statement(select):
+        if not _is_admin():
+            return select.where(Registration.user_id == _user_id())
+        # Kiosk check-in: look a ticket up, or list an event's attendees
+        if request.args.get('ticket_id'):
+            select = select.where(Registration.ticket_id == request.args['ticket_id'])
+        if request.args.get('event_id', type=int):
+            select = select.where(Registration.event_id == request.args.get('event_id', type=int))
+        return select
+    return _list(REGISTRATION, statement)
+
+@bp.route('/bookings/halls')
+@query_budget(1)
+@jwt_required()
+def list_hall_bookings():
+    status = _booking_status()
+
+    def statement(select):
+        if not _is_admin():
+            select = select.where(HallBooking.student_id == _user_id())
+        return select.where(HallBooking.status == status) if status else select
+    return _list(HALL_BOOKING, statement)
+
+@bp.route('/bookings/buses')
+@query_budget(1)
+@jwt_required()
+def list_bus_bookings():
+    status = _booking_status()
+
+    def statement(select):
+        if not _is_admin():
+            select = select.where(BusBooking.student_id == _user_id())
+        return select.where(BusBooking.status == status) if status else select
+    return _list(BUS_BOOKING, statement)
+
+@bp.route('/notifications')
+@query_budget(1)
+@jwt_required()
+def list_notifications():
+    def statement(select):
+        select = select.where(Notification.user_id == _user_id())
+        return select.where(Notification.is_read.is_(False)) if request.args.get('unread') == '1' else select
+    return _list(NOTIFICATION, statement)
+
+@bp.route('/notifications/read', methods=['POST'])
+@query_budget(1)
+@jwt_required()
+def mark_notifications_read():
+    user_id = _user_id()
+    updated = Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True}, synchronize_session=False)
+    db.session.commit()
+    dashboard.invalidate(user_id)  # the bulk UPDATE bypasses its session hooks
+    return json_response({'updated': updated})
+
+@bp.route('/dashboard')
+@query_budget(2)
+@jwt_required()
+def dashboard_summary():
+    return json_response(dashboard.get_summary(_user_id()).as_dict())
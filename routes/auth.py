@@ -0,0 +1,105 @@
+# routes/auth.py
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, g, jsonify
+from flask_login import login_user, logout_user, login_required, current_user
+
+import dashboard as summaries
+from accounts import DuplicateUserError, create_user, show_duplicate_errors
+from extensions import db, login_manager
+from query_budget import query_budget
+from ratelimit import rate_limit, refund
+from forms import RegistrationForm, LoginForm
+from models import User
+
+bp = Blueprint('auth', __name__)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return db.session.get(User, int(user_id))
+
+
+# --- Authentication and General Routes ---
+@bp.route('/')
+@login_required
+def index():
+    if current_user.role == 'student':
+        return redirect(url_for('auth.dashboard'))
+    elif current_user.role == 'dsa':
+        return redirect(url_for('events.dsa_dashboard'))
+    elif current_user.role == 'vc_office':
+        return redirect(url_for('events.vc_dashboard'))
+    elif current_user.role == 'admin':
+        return redirect(url_for('admin.admin_dashboard'))
+    else:
+        abort(403)
+
+@bp.route('/register', methods=['GET', 'POST'])
+@query_budget(2)
+@rate_limit('register')
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('auth.index'))
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        try:
+            create_user(form.username.data, form.email.data, form.password.data, form.role.data)
+        except DuplicateUserError as e:
+            show_duplicate_errors(form, e)
+        else:
+            flash('Registration successful! Please log in.', 'success')
+            return redirect(url_for('auth.login'))
+    return render_template('register.html', title='Register', form=form)
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('login')
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('auth.index'))
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        if user and user.check_password(form.password.data):
+            refund()  # only failed attempts count towards the login limits
+            if user.upgrade_password_hash(form.password.data):
+                db.session.commit()
+            login_user(user)
+            flash('Login successful!', 'success')
+            if user.role == 'admin':
+                return redirect(url_for('admin.admin_dashboard'))
+            elif user.role == 'dsa':
+                return redirect(url_for('events.dsa_dashboard'))
+            elif user.role == 'vc_office':
+                return redirect(url_for('events.vc_dashboard'))
+            return redirect(url_for('auth.dashboard'))
+        else:
+            flash('Invalid username or password. Please try again.', 'danger')
+    return render_template('login.html', title='Login', form=form)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('auth.login'))
+
+@bp.route('/dashboard')
+@query_budget(3)
+@login_required
+def dashboard():
+    if current_user.role == 'admin':
+        return redirect(url_for('admin.admin_dashboard'))
+    elif current_user.role == 'dsa':
+        return redirect(url_for('events.dsa_dashboard'))
+    elif current_user.role == 'vc_office':
+        return redirect(url_for('events.vc_dashboard'))
+    summary = summaries.get_summary(current_user.id)
+    g.unread_notifications_count = summary.unread_notifications  # saves the navigation bar its own COUNT
+    return render_template('dashboard.html', name=current_user.username, summary=summary)
+
+@bp.route('/dashboard.json')
+@query_budget(3)
+@login_required
+def dashboard_summary():
+    # The same summary for the mobile app, for any role
+    return jsonify(summaries.get_summary(current_user.id).as_dict())
@@ -0,0 +1,168 @@
+# routes/bookings.py
+import logging
+import os
+import re
+from datetime import datetime, UTC
+
+from flask import Blueprint, render_template, redirect, url_for, flash, send_file, abort, current_app
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from query_budget import query_budget
+from ratelimit import rate_limit
+from replica import use_replica
+from forms import HallBookingForm, BusBookingForm
+from models import Event, Registration, Hall, HallBooking, Bus, BusBooking
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('bookings', __name__)
+
+
+# --- Student Resource Viewing & Booking Routes ---
+@bp.route('/halls')
+@query_budget(3)
+@use_replica
+@login_required
+def list_halls():
+    halls = Hall.query.order_by(Hall.name).all()
+    return render_template('list_halls.html', halls=halls)
+
+@bp.route('/hall/book/<int:hall_id>', methods=['GET', 'POST'])
+@rate_limit('booking')
+@login_required
+def book_hall_request(hall_id):
+    hall = Hall.query.get_or_404(hall_id)
+    form = HallBookingForm()
+
+    # Fetch approved events for the dropdown
+    approved_events = Event.query.filter_by(status='Approved').order_by(Event.date.desc()).all()
+    # Use an empty string for the "None" option value to work with the Optional() validator
+    form.event_id.choices = [('', '-- None --')] + [(e.id, f'{e.name} ({e.date.strftime("%Y-%m-%d")})') for e in approved_events]
+
+    if form.validate_on_submit():
+        # Validation (e.g., end_time > start_time) is now handled by the form.
+        new_booking = HallBooking(
+            hall_id=hall.id,
+            student_id=current_user.id,
+            requested_date=form.requested_date.data,
+            start_time=form.start_time.data,
+            end_time=form.end_time.data,
+            purpose=form.purpose.data,
+            event_id=form.event_id.data, # Will be None if '-- None --' is selected
+            status='Pending',
+            timestamp=datetime.now(UTC)
+        )
+        db.session.add(new_booking)
+        db.session.commit()
+        flash(f"Booking request for '{hall.name}' submitted successfully!", 'success')
+        # Redirecting to their own bookings page is better UX
+        return redirect(url_for('bookings.my_hall_bookings'))
+
+    # If validation fails, the template will be re-rendered with errors.
+    return render_template('book_hall_form.html', form=form, hall=hall)
+
+
+@bp.route('/my_hall_bookings')
+@query_budget(4)
+@use_replica
+@login_required
+def my_hall_bookings():
+    bookings = HallBooking.query.options(joinedload(HallBooking.hall).load_only(Hall.name)).filter_by(student_id=current_user.id).order_by(HallBooking.timestamp.desc()).all()
+    return render_template('my_hall_bookings.html', bookings=bookings)
+
+@bp.route('/buses')
+@query_budget(3)
+@use_replica
+@login_required
+def list_buses():
+    buses = Bus.query.order_by(Bus.identifier).all()
+    return render_template('list_buses.html', buses=buses)
+
+@bp.route('/bus/book/<int:bus_id>', methods=['GET', 'POST'])
+@rate_limit('booking')
+@login_required
+def book_bus_request(bus_id):
+    bus = Bus.query.get_or_404(bus_id)
+    form = BusBookingForm()
+
+    # Populate event choices
+    approved_events = Event.query.filter_by(status='Approved').order_by(Event.date.desc()).all()
+    form.event_id.choices = [('', '-- None --')] + [(e.id, f'{e.name} ({e.date.strftime("%Y-%m-%d")})') for e in approved_events]
+
+    if form.validate_on_submit():
+        # Custom validation for passenger count against bus capacity
+        if form.number_of_passengers.data and form.number_of_passengers.data > bus.capacity:
+            flash(f'Number of passengers ({form.number_of_passengers.data}) exceeds bus capacity ({bus.capacity}).', 'danger')
+            return render_template('book_bus_form.html', bus=bus, form=form)
+
+        new_booking = BusBooking(
+            bus_id=bus.id,
+            student_id=current_user.id,
+            requested_date=form.requested_date.data,
+            pickup_time=form.pickup_time.data,
+            pickup_location=form.pickup_location.data,
+            destination=form.destination.data,
+            number_of_passengers=form.number_of_passengers.data,
+            purpose=form.purpose.data,
+            event_id=form.event_id.data,
+            status='Pending',
+            timestamp=datetime.now(UTC)
+        )
+        db.session.add(new_booking)
+        db.session.commit()
+        flash(f"Bus booking request for '{bus.identifier}' submitted successfully!", 'success')
+        return redirect(url_for('bookings.my_bus_bookings'))
+
+    return render_template('book_bus_form.html', bus=bus, form=form)
+
+@bp.route('/my_bus_bookings')
+@query_budget(4)
+@use_replica
+@login_required
+def my_bus_bookings():
+    bookings = BusBooking.query.options(joinedload(BusBooking.bus).load_only(Bus.identifier)).filter_by(student_id=current_user.id).order_by(BusBooking.timestamp.desc()).all()
+    return render_template('my_bus_bookings.html', bookings=bookings)
+
+# Route to download the generated PDF certificate/ticket
+@bp.route('/download/certificate/<string:file_path>')
+@login_required
+def download_certificate(file_path):
+    # Ensure the file path is safe and within the CERTIFICATES_FOLDER
+    abs_path = os.path.join(current_app.root_path, file_path)
+    if not os.path.exists(abs_path) or not abs_path.startswith(current_app.config['CERTIFICATES_FOLDER']):
+        abort(404, description="File not found or unauthorized access.")
+
+    # Check if the current user is authorized to download this specific certificate
+    # For event certificates:
+    if 'event_certificate' in file_path:
+        # Extract registration ID from filename or query database
+        try:
+            # Assuming filename format: event_certificate_{registration.id}_{ticket_id}.pdf
+            reg_id_match = re.search(r'event_certificate_(\d+)_', os.path.basename(file_path))
+            if reg_id_match:
+                registration_id = int(reg_id_match.group(1))
+                registration = Registration.query.get(registration_id)
+                if registration and (registration.user_id == current_user.id or current_user.role == 'admin'): # Admin can download
+                    return send_file(abs_path, as_attachment=True)
+        except Exception as e:
+            logger.warning("Error checking event certificate authorization: %s", e)
+            abort(403, description="Unauthorized to access this certificate.")
+
+    # For bus tickets:
+    elif 'bus_ticket' in file_path:
+        # Extract booking ID from filename or query database
+        try:
+            # Assuming filename format: bus_ticket_{booking.id}.pdf
+            booking_id_match = re.search(r'bus_ticket_(\d+).pdf', os.path.basename(file_path))
+            if booking_id_match:
+                booking_id = int(booking_id_match.group(1))
+                booking = BusBooking.query.get(booking_id)
+                if booking and (booking.student_id == current_user.id or current_user.role == 'admin'): # Admin can download
+                    return send_file(abs_path, as_attachment=True)
+        except Exception as e:
+            logger.warning("Error checking bus ticket authorization: %s", e)
+            abort(403, description="Unauthorized to access this ticket.")
+
+    abort(403, description="Unauthorized to access this document.")
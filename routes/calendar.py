@@ -0,0 +1,67 @@
+# routes/calendar.py
+from flask import Blueprint, Response, abort, current_app, flash, redirect, request, url_for
+from flask_login import current_user, login_required
+from itsdangerous import BadSignature, URLSafeSerializer
+
+import calendar_feeds
+from extensions import db
+from models import User
+from query_budget import query_budget
+from replica import use_replica
+
+bp = Blueprint('calendar', __name__)
+
+# Calendar apps can't log in, so personal feeds are addressed by a signed, unguessable token.
+# It carries the user's calendar_feed_version, which reset_feed() bumps to revoke a leaked URL.
+FEED_TOKEN_SALT = 'calendar-feed'
+FEED_MAX_AGE = 300
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=FEED_TOKEN_SALT)
+
+
+@bp.app_template_global()
+def calendar_feed_url(user):
+    token = _serializer().dumps([user.id, user.calendar_feed_version])
+    return url_for('calendar.user_feed', token=token, _external=True)
+
+
+def _ics_response(name, statement, cache_control):
+    etag, body = calendar_feeds.build_feed(name, statement)
+    response = Response(body, mimetype='text/calendar')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'{cache_control}, max-age={FEED_MAX_AGE}'
+    return response.make_conditional(request)
+
+
+@bp.route('/calendar/events.ics')
+@query_budget(2)
+@use_replica
+def public_feed():
+    return _ics_response('Campus events', calendar_feeds.public_versions(), 'public')
+
+
+@bp.route('/calendar/<token>.ics')
+@query_budget(5)
+@use_replica
+def user_feed(token):
+    try:
+        payload = _serializer().loads(token)
+    except BadSignature:
+        abort(404)
+    # URLs issued before feed versions existed sign the bare user id; they stay valid until the first reset
+    user_id, version = (payload, 0) if isinstance(payload, int) else payload
+    if db.session.scalar(db.select(User.calendar_feed_version).where(User.id == user_id)) != version:
+        abort(404)
+    return _ics_response('My campus calendar', calendar_feeds.user_versions(user_id), 'private')
+
+
+@bp.route('/calendar/reset', methods=['POST'])
+@login_required
+def reset_feed():
+    current_user.calendar_feed_version = User.calendar_feed_version + 1
+    db.session.commit()
+    flash('Your calendar feed has a new link and the old one no longer works. '
+          'Subscribe to the new link in your calendar app.', 'success')
+    return redirect(url_for('events.my_event_registrations'))
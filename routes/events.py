@@ -0,0 +1,313 @@
+# routes/events.py
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app, request, abort
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+import approvals
+import tickets
+from extensions import db
+from query_budget import query_budget
+from ratelimit import rate_limit
+from replica import use_replica
+from decorators import admin_required, dsa_required, vc_office_required
+from forms import EventForm, RegisterForEventForm
+from models import User, Event, Registration
+from search import search_events
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('events', __name__)
+
+
+# --- Event Routes (Creation, Approval, RSVP) ---
+@bp.route("/events")
+@query_budget(4)
+@use_replica
+def list_events():
+    events = Event.query.order_by(Event.date.asc()).all()
+    # One grouped COUNT instead of loading every event's registrations to take their length
+    registration_counts = dict(db.session.query(Registration.event_id, func.count(Registration.id)).group_by(Registration.event_id).all())
+    return render_template('list_events.html', title='Available Events', events=events, registration_counts=registration_counts)
+
+@bp.route("/events/search")
+@query_budget(3)
+@use_replica
+def event_search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    date_from = date_to = None
+    try:
+        if request.args.get('from'):
+            date_from = datetime.strptime(request.args['from'], '%Y-%m-%d')
+        if request.args.get('to'):
+            # Inclusive end date
+            date_to = datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format; the date filter was ignored.', 'warning')
+        date_from = date_to = None
+
+    results = search_events(query, date_from, date_to, page=max(page, 1), per_page=current_app.config['PER_PAGE'])
+    search_args = {'q': query, 'from': request.args.get('from', ''), 'to': request.args.get('to', '')}
+    return render_template('search_events.html', title='Search Events', query=query, results=results,
+                           date_from=search_args['from'], date_to=search_args['to'], search_args=search_args)
+
+@bp.route('/create_event', methods=['GET', 'POST'])
+@admin_required
+def create_event():
+    form = EventForm()
+    if form.validate_on_submit():
+        event = Event(
+            name=form.name.data,
+            description=form.description.data,
+            date=form.date.data,
+            location=form.location.data,
+            price=form.price.data,
+            capacity=form.capacity.data,
+            created_by=current_user.id,
+            status=approvals.PENDING_DSA
+        )
+        db.session.add(event)
+        db.session.commit()
+        flash('Your event has been created and is awaiting DSA approval!', 'success')
+        return redirect(url_for('admin.admin_dashboard'))
+    return render_template('create_event.html', title='New Event', form=form)
+
+@bp.route('/dsa/dashboard')
+@query_budget(4)
+@use_replica
+@login_required
+@dsa_required
+def dsa_dashboard():
+    pending_events = Event.query.options(joinedload(Event.creator).load_only(User.username)).filter_by(status=approvals.PENDING_DSA).order_by(Event.date).all()
+    return render_template('dsa_dashboard.html', pending_events=pending_events)
+
+@bp.route('/dsa/approve_event/<int:event_id>', methods=['POST'])
+@login_required
+@dsa_required
+def dsa_approve_event(event_id):
+    return _transition_one('dsa_approve', event_id, 'approved', 'events.dsa_dashboard')
+
+@bp.route('/dsa/reject_event/<int:event_id>', methods=['POST'])
+@login_required
+@dsa_required
+def dsa_reject_event(event_id):
+    return _transition_one('dsa_reject', event_id, 'rejected', 'events.dsa_dashboard')
+
+@bp.route('/dsa/events/batch', methods=['POST'])
+@login_required
+@dsa_required
+def dsa_batch_events():
+    return _transition_batch('dsa', 'events.dsa_dashboard')
+
+@bp.route('/vc/dashboard')
+@query_budget(5)
+@use_replica
+@login_required
+@vc_office_required
+def vc_dashboard():
+    target_status = approvals.PENDING_VC
+    pending_events = Event.query.options(
+        joinedload(Event.creator).load_only(User.username),
+        joinedload(Event.dsa_approver).load_only(User.username)
+    ).filter_by(status=target_status).order_by(Event.date).all()
+    return render_template('vc_dashboard.html', pending_events=pending_events)
+
+@bp.route('/vc/approve_event/<int:event_id>', methods=['POST'])
+@login_required
+@vc_office_required
+def vc_approve_event(event_id):
+    return _transition_one('vc_approve', event_id, 'approved', 'events.vc_dashboard')
+
+@bp.route('/vc/reject_event/<int:event_id>', methods=['POST'])
+@login_required
+@vc_office_required
+def vc_reject_event(event_id):
+    return _transition_one('vc_reject', event_id, 'rejected', 'events.vc_dashboard')
+
+@bp.route('/vc/events/batch', methods=['POST'])
+@login_required
+@vc_office_required
+def vc_batch_events():
+    return _transition_batch('vc', 'events.vc_dashboard')
+
+def _transition_one(name, event_id, verb, dashboard):
+    result = approvals.apply(name, [event_id], current_user)
+    if result.moved:
+        flash(result.transition.flash.format(name=result.moved[0].name), 'success')
+    else:
+        event = Event.query.get_or_404(event_id)
+        flash(f"Event '{event.name}' could not be {verb} at this stage.", 'warning')
+    return redirect(url_for(dashboard))
+
+def _transition_batch(prefix, dashboard):
+    # The dashboards' checkboxes post event_ids, and the clicked button posts action=approve|reject
+    name = f"{prefix}_{request.form.get('action')}"
+    if name not in approvals.TRANSITIONS:
+        abort(400)
+    event_ids = request.form.getlist('event_ids', type=int)
+    if not event_ids:
+        flash('Select at least one event.', 'warning')
+        return redirect(url_for(dashboard))
+    result = approvals.apply(name, event_ids, current_user)
+    if result.moved:
+        flash(f"{len(result.moved)} event(s) moved to '{result.transition.target}'.", 'success')
+    if result.skipped:
+        flash(f"{len(result.skipped)} event(s) were no longer '{result.transition.source}' and were left unchanged.", 'warning')
+    return redirect(url_for(dashboard))
+
+@bp.route('/rsvp/<int:event_id>', methods=['POST'])
+@rate_limit('rsvp')
+@login_required
+def rsvp_event(event_id):
+    if current_user.role != 'student':
+        flash('Only students can RSVP for events.', 'danger')
+        return redirect(url_for('auth.dashboard'))
+
+    event = Event.query.get_or_404(event_id)
+
+    if event.status != 'Approved':
+        flash('This event is not currently open for RSVPs or has not been approved.', 'warning')
+        return redirect(url_for('events.list_events'))
+
+    if Registration.query.filter_by(user_id=current_user.id, event_id=event.id).first():
+        flash('You have already RSVP\'d for this event.', 'info')
+    else:
+        try:
+            free = event.price == 0
+            new_registration = Registration(user_id=current_user.id, event_id=event.id,
+                                            payment_status='N/A' if free else 'pending',
+                                            ticket_id=str(uuid.uuid4()) if free else None)
+            db.session.add(new_registration)
+            db.session.commit()
+
+            if free:
+                # The certificate and confirmation email are issued in the background
+                tickets.enqueue([new_registration.id])
+                flash(f'Successfully registered for {event.name}! Your ticket ID is: {new_registration.ticket_id}', 'success')
+            else:
+                flash(f'Your registration for {event.name} is pending payment. Use "Pay now" below to complete it.', 'warning')
+            return redirect(url_for('events.my_event_registrations'))
+
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Could not process your RSVP. An error occurred: {e}', 'danger')
+    return redirect(url_for('auth.dashboard'))
+
+@bp.route('/cancel_rsvp/<int:event_id>', methods=['POST'])
+@rate_limit('rsvp')
+@login_required
+def cancel_rsvp_event(event_id):
+    if current_user.role != 'student':
+        flash('Only students can manage RSVPs.', 'danger')
+        return redirect(url_for('auth.dashboard'))
+
+    event = Event.query.get_or_404(event_id)
+    registration_record = Registration.query.filter_by(user_id=current_user.id, event_id=event.id).first()
+
+    if registration_record:
+        # Optional: Delete the generated certificate file if it exists
+        if registration_record.certificate_path and os.path.exists(os.path.join(current_app.root_path, registration_record.certificate_path)):
+            os.remove(os.path.join(current_app.root_path, registration_record.certificate_path))
+            logger.info("Deleted certificate file: %s", registration_record.certificate_path)
+
+        db.session.delete(registration_record)
+        db.session.commit()
+        flash('Your RSVP has been cancelled.', 'success')
+    else:
+        flash('You were not RSVP\'d for this event.', 'info')
+    return redirect(url_for('auth.dashboard'))
+
+
+# --- Event Details and Registration Routes ---
+@bp.route("/event/<int:event_id>")
+@query_budget(6)
+@use_replica
+def event_details(event_id):
+    event = Event.query.get_or_404(event_id)
+    registration_form = RegisterForEventForm()
+
+    is_registered = False
+    if current_user.is_authenticated:
+        existing_registration = Registration.query.filter_by(
+            user_id=current_user.id,
+            event_id=event.id
+        ).first()
+        if existing_registration:
+            is_registered = True
+
+    current_registrations = Registration.query.filter_by(event_id=event.id).count()
+    remaining_capacity = None
+    if event.capacity is not None:
+        remaining_capacity = event.capacity - current_registrations
+
+    return render_template(
+        'event_details.html',
+        title=event.name,
+        event=event,
+        registration_form=registration_form,
+        is_registered=is_registered,
+        remaining_capacity=remaining_capacity
+    )
+
+
+@bp.route("/event/<int:event_id>/register", methods=['POST'])
+@rate_limit('rsvp')
+@login_required
+def register_for_event(event_id):
+    event = Event.query.get_or_404(event_id)
+    form = RegisterForEventForm()
+
+    if form.validate_on_submit():
+        existing_registration = Registration.query.filter_by(
+            user_id=current_user.id,
+            event_id=event.id
+        ).first()
+
+        if existing_registration:
+            flash('You are already registered for this event!', 'warning')
+            return redirect(url_for('events.event_details', event_id=event.id))
+
+        if event.capacity is not None:
+            current_registrations = Registration.query.filter_by(event_id=event.id).count()
+            if current_registrations >= event.capacity:
+                flash('Sorry, this event is at full capacity!', 'danger')
+                return redirect(url_for('events.event_details', event_id=event.id))
+
+        free = event.price == 0
+        new_registration = Registration(
+            user_id=current_user.id,
+            event_id=event.id,
+            ticket_id=str(uuid.uuid4()) if free else None,
+            payment_status='N/A' if free else 'pending'
+        )
+        db.session.add(new_registration)
+        db.session.commit()
+
+        if free:
+            # The certificate and confirmation email are issued in the background
+            tickets.enqueue([new_registration.id])
+            flash(f'Successfully registered for {event.name}! Your ticket ID is: {new_registration.ticket_id}', 'success')
+        else:
+            flash(f'Your registration for {event.name} is pending payment. Use "Pay now" below to complete it.', 'warning')
+        return redirect(url_for('events.my_event_registrations'))
+    else:
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(f"Error in {field}: {error}", 'danger')
+        return redirect(url_for('events.event_details', event_id=event.id))
+
+@bp.route("/my_event_registrations")
+@query_budget(4)
+@use_replica
+@login_required
+def my_event_registrations():
+    registrations = Registration.query.options(
+        joinedload(Registration.event).load_only(Event.name, Event.date, Event.location, Event.price)
+    ).filter_by(user_id=current_user.id).all()
+    return render_template('my_event_registrations.html', title='My Event Registrations', registrations=registrations)
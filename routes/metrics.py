@@ -0,0 +1,22 @@
+# routes/metrics.py
+import hmac
+
+from flask import Blueprint, Response, request, current_app, abort
+
+from extensions import csrf
+from instrumentation import render_metrics
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics')
+@csrf.exempt
+def prometheus_metrics():
+    # Per-route latency and SQL counts are only for the scraper: outside debug mode a token is required
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        if not current_app.debug:
+            abort(404)
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        abort(403)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,84 @@
+# routes/notifications.py
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, current_app, request, Response, g
+from flask_login import login_required, current_user
+from sqlalchemy import func
+
+import dashboard
+import push
+import retention
+from extensions import db
+from query_budget import query_budget
+from models import Notification
+
+bp = Blueprint('notifications', __name__)
+
+
+# New routes for viewing and managing notifications
+@bp.route('/notifications')
+@query_budget(6)
+@login_required
+def notifications():
+    before = request.args.get('before', type=int)
+    if before is None:
+        # Mark all unread notifications as read when viewed, in one UPDATE, before
+        # loading the list so the commit doesn't expire (and re-fetch) every row
+        Notification.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True}, synchronize_session=False)
+        db.session.commit()
+        dashboard.invalidate(current_user.id)  # the bulk UPDATE bypasses its session hooks
+    page = retention.notification_history(current_user.id, before, current_app.config['NOTIFICATIONS_PER_PAGE'])
+    return render_template('notifications.html', notifications=page.items, next_before=page.next_before)
+
+@bp.route('/notifications/stream')
+@query_budget(2)
+@login_required
+def notification_stream():
+    config = current_app.config
+    if not config['PUSH_ENABLED']:
+        abort(404)
+    user_id = current_user.id
+    # Sent by EventSource on reconnect; ?after= lets a page start from what it already rendered
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('after', type=int)
+
+    broker = push.get_broker()
+    # Subscribe before reading the backlog so nothing committed in between is missed
+    subscription = broker.subscribe(user_id)
+    try:
+        if last_id is None:
+            backlog = []
+            cursor = db.session.scalar(db.select(func.coalesce(func.max(Notification.id), 0)).filter_by(user_id=user_id))
+        else:
+            rows = db.session.scalars(db.select(Notification).filter_by(user_id=user_id)
+                                      .where(Notification.id > last_id).order_by(Notification.id)
+                                      .limit(config['PUSH_BACKLOG_LIMIT'])).all()
+            backlog = [push.notification_message(row) for row in rows]
+            cursor = last_id
+    except Exception:
+        broker.unsubscribe(user_id, subscription)
+        raise
+
+    # The generator outlives the request (and its database session) and uses neither
+    stream = push.event_stream(user_id, subscription, backlog, cursor, config['PUSH_HEARTBEAT_SECONDS'],
+                               config['PUSH_MAX_STREAM_SECONDS'],
+                               backlog_complete=len(backlog) < config['PUSH_BACKLOG_LIMIT'])
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/mark_notification_read/<int:notification_id>', methods=['POST'])
+@login_required
+def mark_notification_read(notification_id):
+    notification = Notification.query.filter_by(id=notification_id, user_id=current_user.id).first_or_404()
+    notification.is_read = True
+    db.session.commit()
+    flash('Notification marked as read.', 'info')
+    return redirect(url_for('notifications.notifications'))
+
+@bp.app_context_processor
+def inject_unread_notifications_count():
+    if 'unread_notifications_count' in g:  # already counted by the view
+        return dict(unread_notifications_count=g.unread_notifications_count)
+    if current_user.is_authenticated:
+        unread_count = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
+        return dict(unread_notifications_count=unread_count)
+    return dict(unread_notifications_count=0)
@@ -0,0 +1,65 @@
+# routes/payments.py
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask_login import login_required, current_user
+
+import payments
+from extensions import csrf
+from models import Payment, Registration
+
+bp = Blueprint('payments', __name__)
+# Registered only when payments.FakeProvider is the active provider; see routes/__init__.py
+fake_bp = Blueprint('fake_payments', __name__)
+
+
+@bp.route('/payments/checkout/<int:registration_id>', methods=['POST'])
+@login_required
+def checkout(registration_id):
+    registration = Registration.query.get_or_404(registration_id)
+    if registration.user_id != current_user.id:
+        abort(403)
+    if registration.payment_status not in ('pending', 'failed'):
+        flash('There is nothing left to pay for this registration.', 'info')
+        return redirect(url_for('events.my_event_registrations'))
+    if payments.provider() is None:
+        flash('Online payment is not available. Please contact the event organiser.', 'warning')
+        return redirect(url_for('events.my_event_registrations'))
+    return redirect(payments.start_checkout(registration, url_for('events.my_event_registrations', _external=True)))
+
+
+@bp.route('/payments/webhook/<provider>', methods=['POST'])
+@csrf.exempt
+def webhook(provider):
+    active = payments.provider()
+    if active is None or provider != active.name:
+        abort(404)
+    try:
+        processed = payments.handle_webhook(active, request.get_data(), request.headers.get(active.signature_header))
+    except payments.InvalidWebhook:
+        abort(400)
+    # Redeliveries are acknowledged too, or the provider keeps retrying
+    return {'processed': processed}
+
+
+# Stands in for the provider's hosted checkout page; see payments.FakeProvider
+@fake_bp.route('/payments/fake/<ref>', methods=['GET', 'POST'])
+@login_required
+def fake_checkout(ref):
+    active = payments.provider()
+    # Only the student who started the checkout may complete it
+    owned = (Payment.query.join(Registration, Registration.id == Payment.registration_id)
+             .filter(Payment.provider == active.name, Payment.provider_ref == ref,
+                     Registration.user_id == current_user.id).first())
+    if owned is None or ref not in active.checkouts:
+        abort(404)
+    checkout = active.checkouts[ref]
+    if request.method == 'POST':
+        outcome = request.form.get('outcome')
+        if outcome not in payments.OUTCOMES:
+            abort(400)
+        payments.handle_webhook(active, *active.complete(ref, outcome))
+        if outcome == 'paid':
+            flash('Payment received. Your ticket and confirmation email are on their way.', 'success')
+        else:
+            flash('Your payment was declined.', 'danger')
+        return redirect(checkout['return_url'])
+    return render_template('payment_fake_checkout.html', title='Checkout', ref=ref, checkout=checkout)
@@ -0,0 +1,138 @@
+# search.py
+"""Full-text event search over Event.name, description and location.
+
+SQLite: an external-content FTS5 table (event_fts) kept in sync by triggers on
+the event table. PostgreSQL: a generated tsvector column with a GIN index.
+Both are created automatically after `db.create_all()` creates the event table
+and by the matching Alembic migration for existing databases.
+
+Every event is indexed; the Approved/date filters are applied in the query, so
+approving an event (a status-only UPDATE) does not touch the index.
+
+Ranking cost grows with the number of matches, so only the newest
+SEARCH_RANK_WINDOW matches are scored; a query matching most of the table
+stays a few milliseconds instead of scoring every row. The status and date
+filters are applied inside that window, so matches that are unapproved or
+out of range don't use it up.
+"""
+import re
+from dataclasses import dataclass
+
+from flask import current_app
+from sqlalchemy import DDL, event, func, literal_column, table, column
+
+from extensions import db
+from models import Event
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5("
+    "name, description, location, content='event', content_rowid='id', tokenize='porter unicode61', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_ai AFTER INSERT ON event BEGIN "
+    "INSERT INTO event_fts(rowid, name, description, location) VALUES (new.id, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_ad AFTER DELETE ON event BEGIN "
+    "INSERT INTO event_fts(event_fts, rowid, name, description, location) VALUES ('delete', old.id, old.name, old.description, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS event_fts_au AFTER UPDATE OF name, description, location ON event BEGIN "
+    "INSERT INTO event_fts(event_fts, rowid, name, description, location) VALUES ('delete', old.id, old.name, old.description, old.location); "
+    "INSERT INTO event_fts(rowid, name, description, location) VALUES (new.id, new.name, new.description, new.location); END",
+)
+
+POSTGRES_DDL = (
+    "ALTER TABLE event ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_event_search_vector ON event USING GIN (search_vector)",
+)
+
+for _statement in SQLITE_DDL:
+    event.listen(Event.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in POSTGRES_DDL:
+    event.listen(Event.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+
+# Lightweight handle on the FTS5 table (not part of the ORM metadata)
+event_fts = table('event_fts', column('rowid'))
+
+# bm25 column weights: name, description, location
+_BM25_WEIGHTS = (10.0, 1.0, 3.0)
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+@dataclass
+class SearchPage:
+    items: list
+    page: int
+    per_page: int
+    has_next: bool
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+
+def _fts5_query(terms, prefix=False):
+    # Each term quoted so user input cannot inject FTS syntax
+    quoted = [f'"{term}"' for term in terms]
+    if prefix:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _sqlite_search(terms, filters, window, prefix):
+    # bm25() is lower-is-better
+    hits = (db.select(event_fts.c.rowid.label('id'),
+                      func.bm25(literal_column('event_fts'), *_BM25_WEIGHTS).label('score'))
+            .join(Event, Event.id == event_fts.c.rowid)
+            .where(literal_column('event_fts').op('MATCH')(_fts5_query(terms, prefix)), *filters)
+            .order_by(event_fts.c.rowid.desc()).limit(window).subquery())
+    return db.select(Event).join(hits, hits.c.id == Event.id).order_by(hits.c.score)
+
+
+def _postgres_search(terms, filters, window):
+    tsquery = func.websearch_to_tsquery('english', ' '.join(terms))
+    vector = literal_column('event.search_vector')
+    hits = (db.select(Event.id.label('id'), func.ts_rank(vector, tsquery).label('score'))
+            .where(vector.op('@@')(tsquery), *filters)
+            .order_by(Event.id.desc()).limit(window).subquery())
+    return db.select(Event).join(hits, hits.c.id == Event.id).order_by(hits.c.score.desc())
+
+
+def _like_search(terms, filters):
+    pattern = f"%{' '.join(terms)}%"
+    return db.select(Event).where(
+        Event.name.ilike(pattern) | Event.description.ilike(pattern) | Event.location.ilike(pattern), *filters)
+
+
+def search_events(query, date_from=None, date_to=None, page=1, per_page=10):
+    """Returns a SearchPage of Approved events matching `query`, best match first.
+
+    Fetches one extra row to decide `has_next` instead of counting all matches.
+    On SQLite a query with no whole-word matches is retried with the last term
+    prefix-matched, so partially typed words still find events; prefix queries
+    cannot stream the index in rowid order and are several times slower on
+    common terms, hence not the default.
+    """
+    terms = _token_re.findall(query or '')
+    if not terms:
+        return SearchPage([], page, per_page, False)
+
+    filters = [Event.status == 'Approved']
+    if date_from is not None:
+        filters.append(Event.date >= date_from)
+    if date_to is not None:
+        filters.append(Event.date < date_to)
+
+    def fetch(stmt):
+        stmt = stmt.order_by(Event.date).limit(per_page + 1).offset((page - 1) * per_page)
+        return db.session.execute(stmt).scalars().all()
+
+    window = current_app.config.get('SEARCH_RANK_WINDOW', 1000)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        rows = fetch(_sqlite_search(terms, filters, window, prefix=False))
+        if not rows:
+            rows = fetch(_sqlite_search(terms, filters, window, prefix=True))
+    elif dialect == 'postgresql':
+        rows = fetch(_postgres_search(terms, filters, window))
+    else:
+        rows = fetch(_like_search(terms, filters))
+    return SearchPage(rows[:per_page], page, per_page, len(rows) > per_page)
@@ -0,0 +1,116 @@
+# serializers.py
+"""Schema-driven JSON serialization for the API (routes/api.py).
+
+A Schema names the fields a resource exposes and the SQL expression behind
+each one. A request picks fields with ?fields=a,b,c (otherwise the schema's
+defaults), and only those columns are selected: rows come back as plain
+tuples rather than ORM objects, so nothing is identity-mapped or
+instrumented per row, and orjson writes the dicts, datetimes included,
+straight to bytes. Fields from related tables are correlated scalar
+subqueries, so a list only pays for the joins its client asked for.
+
+Lists are paged by cursor. The schema's `order` is a unique key, e.g.
+(Event.date, Event.id); a page is the next `limit` rows after the cursor in
+that order, found with a row-value comparison on an index, and the cursor
+is the last row's key values, base64url-encoded. Unlike OFFSET, the cost of
+a page doesn't grow with its depth, and rows inserted meanwhile don't shift
+later pages.
+"""
+import base64
+import binascii
+from collections import namedtuple
+from datetime import date, datetime
+
+import orjson
+from flask import abort, current_app, request
+from sqlalchemy import literal, tuple_
+
+from extensions import db
+
+Page = namedtuple('Page', 'items next_cursor')
+
+
+def json_response(payload, status=200):
+    return current_app.response_class(orjson.dumps(payload), status=status, mimetype='application/json')
+
+
+def page_limit():
+    """?limit=, clamped to API_MAX_PAGE_SIZE; API_PAGE_SIZE by default."""
+    config = current_app.config
+    limit = request.args.get('limit', config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, config['API_MAX_PAGE_SIZE']))
+
+
+class Schema:
+    """The fields of one API resource and the unique key its lists are ordered by."""
+
+    def __init__(self, fields, order, default=None, descending=False):
+        self.fields = dict(fields)  # name -> SQL expression
+        self.order = tuple(order)
+        self.default = tuple(default or self.fields)
+        self.descending = descending
+
+    def requested_fields(self):
+        """The field names in ?fields=, or the defaults. Aborts with 400 on an unknown name."""
+        raw = request.args.get('fields')
+        if not raw:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            abort(400, f"Unknown field(s) {', '.join(unknown) or '(none given)'}; "
+                       f"available: {', '.join(self.fields)}")
+        return names
+
+    def select(self, names):
+        """SELECT of the named fields, followed by the key columns a page needs for its cursor."""
+        return db.select(*(self.fields[name].label(name) for name in names),
+                         *(column.label(f'_key{i}') for i, column in enumerate(self.order)))
+
+    def one(self, statement, names):
+        """The only row of `statement` as a dict; aborts with 404 if there is none."""
+        row = db.session.execute(statement.limit(1)).first()
+        if row is None:
+            abort(404)
+        return dict(zip(names, row))
+
+    def page(self, statement, names, limit):
+        """The page of `statement` after ?cursor=, in key order."""
+        cursor = request.args.get('cursor')
+        if cursor:
+            key = tuple_(*self.order)
+            after = tuple_(*(literal(value, column.type) for column, value in zip(self.order, self._decode(cursor))))
+            statement = statement.where(key < after if self.descending else key > after)
+        ordering = [column.desc() for column in self.order] if self.descending else self.order
+        rows = db.session.execute(statement.order_by(*ordering).limit(limit + 1)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode(rows[-1][len(names):])
+        # zip() stops at the named fields, leaving out the key columns
+        return Page([dict(zip(names, row)) for row in rows], next_cursor)
+
+    # --- Cursors ---
+
+    def _encode(self, values):
+        return base64.urlsafe_b64encode(orjson.dumps(list(values))).rstrip(b'=').decode()
+
+    def _decode(self, cursor):
+        try:
+            values = orjson.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if not isinstance(values, list) or len(values) != len(self.order):
+                raise ValueError(cursor)
+            return [self._parse(column, value) for column, value in zip(self.order, values)]
+        except (ValueError, TypeError, binascii.Error, orjson.JSONDecodeError):
+            abort(400, 'Invalid cursor')
+
+    @staticmethod
+    def _parse(column, value):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if not isinstance(value, python_type):
+            raise TypeError(value)
+        return value
@@ -0,0 +1,18 @@
+// static/js/notification_stream.js
+// Keeps the Notifications badge current over Server-Sent Events (see push.py).
+// EventSource reconnects by itself and sends Last-Event-ID, so nothing is missed.
+document.addEventListener('DOMContentLoaded', () => {
+    const link = document.getElementById('notifications-link');
+    const badge = document.getElementById('notifications-badge');
+    if (!link || !badge || !link.dataset.streamUrl || !window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource(link.dataset.streamUrl);
+    source.addEventListener('notification', (event) => {
+        const notification = JSON.parse(event.data);
+        badge.textContent = (parseInt(badge.textContent, 10) || 0) + 1;
+        badge.style.display = '';
+        link.title = notification.message;
+    });
+});
@@ -0,0 +1,11 @@
+// static/js/select_all.js
+// The "select all" checkbox in the approval dashboards' table header.
+document.addEventListener('DOMContentLoaded', () => {
+    const selectAll = document.getElementById('select-all');
+    if (!selectAll) {
+        return;
+    }
+    selectAll.addEventListener('change', () => {
+        document.querySelectorAll('.select-event').forEach(box => { box.checked = selectAll.checked; });
+    });
+});
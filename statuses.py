@@ -0,0 +1,108 @@
+# statuses.py
+"""Status columns stored as small-integer codes, read and written as strings.
+
+Event.status, HallBooking.status, BusBooking.status,
+Registration.payment_status and Payment.status are SMALLINT columns. The
+registries below map each code to the label the rest of the app uses, and
+the StatusCode column type translates at the database boundary: values bound into statements
+(ORM attributes, filter_by(status='Approved'), Core insert() dicts) are
+turned into codes and results are turned back into labels. Templates,
+views and queries keep using the strings, and the indexes and comparisons
+work on two-byte integers.
+
+Codes are stored data: never renumber or reuse one, only append. The
+status_lookup table holds the same mapping for people reading the database
+directly; it is filled when the table is created and by the migration.
+Binding an unknown label raises ValueError instead of storing garbage.
+"""
+from sqlalchemy import SmallInteger, event, insert
+from sqlalchemy.types import TypeDecorator
+
+
+class StatusRegistry:
+    """The codes of one status column and their labels."""
+
+    def __init__(self, domain, labels):
+        self.domain = domain
+        self.labels = dict(labels)  # code -> label
+        self.codes = {label: code for code, label in self.labels.items()}
+
+    def code(self, label):
+        try:
+            return self.codes[label]
+        except KeyError:
+            raise ValueError(f"Unknown {self.domain} status {label!r}") from None
+
+    def label(self, code):
+        return self.labels[code]
+
+    def __repr__(self):
+        return f'StatusRegistry({self.domain!r})'
+
+
+EVENT_STATUS = StatusRegistry('event', {
+    1: 'Pending DSA Approval',
+    2: 'Pending VC Office Approval',
+    3: 'Approved',
+    4: 'DSA Rejected',
+    5: 'VC Rejected',
+})
+
+BOOKING_STATUS = StatusRegistry('booking', {
+    1: 'Pending',
+    2: 'Approved',
+    3: 'Rejected',
+    4: 'Cancelled by Admin',
+    5: 'Cancelled by Student',
+})
+
+PAYMENT_STATUS = StatusRegistry('payment', {
+    1: 'N/A',
+    2: 'pending',
+    3: 'paid',
+    4: 'failed',
+})
+
+# Payment.status: one checkout attempt at the payment provider
+CHECKOUT_STATUS = StatusRegistry('checkout', {
+    1: 'pending',
+    2: 'paid',
+    3: 'failed',
+})
+
+REGISTRIES = (EVENT_STATUS, BOOKING_STATUS, PAYMENT_STATUS, CHECKOUT_STATUS)
+
+
+class StatusCode(TypeDecorator):
+    """A SMALLINT column holding codes from `registry`, exposed as their labels."""
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self.registry.code(value)
+
+    def process_literal_param(self, value, dialect):
+        return 'NULL' if value is None else str(self.registry.code(value))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.registry.label(value)
+
+    @property
+    def python_type(self):
+        return str
+
+
+def lookup_rows():
+    return [dict(domain=registry.domain, code=code, name=label)
+            for registry in REGISTRIES for code, label in registry.labels.items()]
+
+
+def fill_lookup_table(table):
+    """Fills status_lookup right after db.create_all() creates it."""
+    @event.listens_for(table, 'after_create')
+    def _fill(target, connection, **kw):
+        connection.execute(insert(target), lookup_rows())
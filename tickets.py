@@ -0,0 +1,153 @@
+# tickets.py
+"""Ticket issuance, off the request path.
+
+A registration that is free ('N/A') or has been paid gets a ticket: a
+ticket id, the certificate PDF with its QR code, and the confirmation
+email. Rendering the PDF takes far longer than the rest of an RSVP, so
+views and payments.settle() only enqueue() the registration ids once their
+transaction has committed; a small per-process thread pool
+(TICKET_WORKERS) issues them. With TICKET_WORKERS=0 they are issued inline.
+
+issue_ticket() can run any number of times for the same registration: the
+certificate is only rendered while certificate_path is unset, and the email
+is claimed with a conditional UPDATE of confirmation_sent_at, so it is sent
+at most once even when a worker and the sweep race. A send that fails
+releases the claim again. The queue is in memory, so the scheduler leader
+runs sweep() every TICKET_SWEEP_SECONDS to issue whatever a restart dropped
+or the mail server refused.
+"""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC, timedelta
+
+from flask import current_app
+from sqlalchemy import exists, update
+from sqlalchemy.orm import joinedload
+
+from extensions import db, scheduler
+from helpers import generate_pdf_from_template, generate_qr_code_base64, send_confirmation_email
+from instrumentation import metrics
+from models import Payment, Registration
+
+logger = logging.getLogger(__name__)
+
+# Registrations that are entitled to a ticket
+ISSUED_STATUSES = ('N/A', 'paid')
+SWEEP_BATCH_SIZE = 500
+
+
+def render_certificate(registration):
+    """Renders the certificate PDF and records its path; returns False if rendering failed."""
+    user, event = registration.user, registration.event
+    qr_data = f"Event: {event.name}\nAttendee: {user.username}\nTicket ID: {registration.ticket_id}"
+    path = generate_pdf_from_template(
+        'event_certificate_template.html',
+        f"event_certificate_{registration.id}_{registration.ticket_id}.pdf",
+        context={
+            'user': user,
+            'event': event,
+            'registration': registration,
+            'qr_code_base64': generate_qr_code_base64(qr_data),
+            'now': datetime.now(UTC),
+        })
+    if not path:
+        return False
+    registration.certificate_path = os.path.relpath(path, current_app.root_path)
+    registration.certificate_generated_at = datetime.now(UTC)
+    return True
+
+
+def issue_ticket(registration_id, now=None):
+    """Completes the ticket of a free or paid registration; returns False if it is not entitled to one."""
+    registration = db.session.get(Registration, registration_id,
+                                  options=[joinedload(Registration.user), joinedload(Registration.event)])
+    if registration is None or registration.payment_status not in ISSUED_STATUSES:
+        return False
+    if registration.ticket_id is None:
+        registration.ticket_id = str(uuid.uuid4())
+    if not registration.certificate_path and not render_certificate(registration):
+        logger.warning("No certificate for registration %s; sending the confirmation without it", registration_id)
+    db.session.commit()
+
+    claimed_at = now or datetime.utcnow()
+    claimed = db.session.execute(
+        update(Registration)
+        .where(Registration.id == registration_id, Registration.confirmation_sent_at.is_(None))
+        .values(confirmation_sent_at=claimed_at)
+        .execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    if not claimed:
+        return True
+    if send_confirmation_email(registration.user.email, registration.event, registration):
+        metrics.inc('campus_tickets_issued_total', help_text='Tickets issued (confirmation emails sent).')
+    else:
+        # Unsent again, so the next sweep() retries it
+        db.session.execute(
+            update(Registration)
+            .where(Registration.id == registration_id, Registration.confirmation_sent_at == claimed_at)
+            .values(confirmation_sent_at=None)
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        logger.warning("Confirmation for registration %s not sent; the ticket sweep will retry it", registration_id)
+    return True
+
+
+def _issue(app, registration_id):
+    # A request context of its own: the certificate template calls url_for()
+    with app.app_context(), app.test_request_context():
+        try:
+            issue_ticket(registration_id)
+        except Exception:
+            logger.exception("Issuing the ticket of registration %s failed", registration_id)
+            db.session.rollback()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(workers, thread_name_prefix='tickets')
+    return _executor
+
+
+def enqueue(registration_ids):
+    """Issues the tickets of committed registrations in the background (inline with TICKET_WORKERS=0)."""
+    app = current_app._get_current_object()
+    workers = app.config['TICKET_WORKERS']
+    for registration_id in registration_ids:
+        if workers:
+            _pool(workers).submit(_issue, app, registration_id)
+        else:
+            _issue(app, registration_id)
+
+
+def sweep(grace_seconds=None, batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Issues tickets still unsent a grace period after registration or payment; returns how many."""
+    now = now or datetime.utcnow()
+    grace_seconds = current_app.config['TICKET_SWEEP_SECONDS'] if grace_seconds is None else grace_seconds
+    cutoff = now - timedelta(seconds=grace_seconds)
+    # Leave recent ones to the workers they were queued on
+    recently_paid = exists().where(Payment.registration_id == Registration.id, Payment.paid_at >= cutoff)
+    ids = db.session.scalars(
+        db.select(Registration.id)
+        .where(Registration.confirmation_sent_at.is_(None), Registration.payment_status.in_(ISSUED_STATUSES),
+               Registration.registration_date < cutoff, ~recently_paid)
+        .order_by(Registration.id).limit(batch_size)).all()
+    app = current_app._get_current_object()
+    for registration_id in ids:
+        _issue(app, registration_id)
+    return len(ids)
+
+
+def scheduled_sweep():
+    with scheduler.app.app_context():
+        issued = sweep()
+        if issued:
+            logger.info("Issued %d tickets that were never sent", issued)